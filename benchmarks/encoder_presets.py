@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编码档位基准测试
+
+对给定图片按 档位 x 格式 在内存中编码，输出耗时与体积对比（Markdown 表格），
+用于记录 快速 / 均衡 / 极致 三个档位之间的速度与体积取舍。
+
+用法：
+    python benchmarks/encoder_presets.py 图片1 [图片2 ...] [--repeat 3] [--quality 85]
+"""
+
+import os
+import sys
+import time
+import argparse
+from statistics import median
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.encoder_profiles import ENCODER_PRESETS, DEFAULT_ENCODER_PRESET  # noqa: E402
+from src.core.image_processor import encode_image  # noqa: E402
+
+FORMATS = ['JPEG', 'PNG', 'WEBP']
+
+
+def run_benchmark(paths, quality, repeat):
+    """返回 {(档位, 格式): (总耗时秒, 总字节数)}"""
+    images = []
+    for path in paths:
+        with Image.open(path) as img:
+            img.load()
+            images.append(img)
+
+    results = {}
+    for fmt in FORMATS:
+        for preset in ENCODER_PRESETS:
+            total_time = 0.0
+            total_bytes = 0
+            for img in images:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    data = encode_image(img, fmt, quality, preset=preset)
+                    timings.append(time.perf_counter() - start)
+                total_time += median(timings)
+                total_bytes += len(data)
+            results[(preset, fmt)] = (total_time, total_bytes)
+    return results
+
+
+def format_table(results):
+    lines = [
+        "| 格式 | 档位 | 耗时 (ms) | 体积 (KB) | 相对均衡体积 |",
+        "| --- | --- | ---: | ---: | ---: |",
+    ]
+    for fmt in FORMATS:
+        base_bytes = results[(DEFAULT_ENCODER_PRESET, fmt)][1]
+        for preset in ENCODER_PRESETS:
+            seconds, size = results[(preset, fmt)]
+            lines.append(
+                f"| {fmt} | {preset} | {seconds * 1000:.0f} | {size / 1024:.1f} | {size / base_bytes * 100:.1f}% |"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编码档位基准测试")
+    parser.add_argument('images', nargs='+', help="测试图片")
+    parser.add_argument('--quality', type=int, default=85, help="JPEG/WEBP 质量")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数（取中位数）")
+    args = parser.parse_args()
+
+    print(format_table(run_benchmark(args.images, args.quality, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
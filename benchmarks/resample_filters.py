@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩放算法基准测试
+
+对给定图片按 缩放策略 x 缩放比例 执行 解码 + 缩放，输出吞吐量与质量对比（Markdown 表格），
+用于记录 最近邻 / 双线性 / 双三次 / Lanczos / 自动 之间的速度与质量取舍。
+
+- 缩小：以不使用 draft、不使用 reducing_gap 的完整 Lanczos 结果为参考计算 SSIM
+- 放大：先用 Lanczos 把原图缩小到 1/比例，再放大回原尺寸，以原图为参考计算 SSIM
+- 吞吐量按源图百万像素计算，耗时包含解码（自动策略对 JPEG 使用 draft 时解码更快）
+
+用法：
+    python benchmarks/resample_filters.py 图片1 [图片2 ...] [--scales 0.25 0.5 0.8 1.5] [--repeat 3]
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+from statistics import median
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.resampling import RESAMPLE_POLICIES, apply_draft, resize_image  # noqa: E402
+from src.core.quality_metrics import compute_ssim  # noqa: E402
+
+DEFAULT_SCALES = [0.25, 0.5, 0.8, 1.5]
+
+
+def _target_size(size, scale):
+    return max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+
+
+def _load_case(path, scale):
+    """返回 (源图字节, 目标尺寸, 参考图)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert('RGB')
+    if scale <= 1:
+        size = _target_size(img.size, scale)
+        return data, size, img.resize(size, Image.Resampling.LANCZOS)
+
+    # 放大：源图为缩小后的图片（无损保存为 PNG），参考为原图
+    small = img.resize(_target_size(img.size, 1 / scale), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    small.save(buffer, 'PNG')
+    return buffer.getvalue(), img.size, img
+
+
+def _decode_and_resize(data, size, policy):
+    with Image.open(io.BytesIO(data)) as img:
+        apply_draft(img, size, policy)
+        img = img.convert('RGB')
+        return resize_image(img, size, policy)
+
+
+def run_benchmark(paths, scales, repeat):
+    """返回 {(比例, 策略): (总源图百万像素, 总耗时秒, 平均 SSIM)}"""
+    results = {}
+    for scale in scales:
+        cases = [_load_case(path, scale) for path in paths]
+        for policy in RESAMPLE_POLICIES:
+            megapixels = 0.0
+            total_time = 0.0
+            ssims = []
+            for data, size, reference in cases:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    result = _decode_and_resize(data, size, policy)
+                    timings.append(time.perf_counter() - start)
+                with Image.open(io.BytesIO(data)) as img:
+                    megapixels += img.width * img.height / 1e6
+                total_time += median(timings)
+                ssims.append(compute_ssim(reference, result, max_side=None))
+            results[(scale, policy)] = (megapixels, total_time, sum(ssims) / len(ssims))
+    return results
+
+
+def format_table(results, scales):
+    lines = [
+        "| 比例 | 策略 | 耗时 (ms) | 吞吐量 (MP/s) | SSIM |",
+        "| ---: | --- | ---: | ---: | ---: |",
+    ]
+    for scale in scales:
+        for policy in RESAMPLE_POLICIES:
+            megapixels, seconds, ssim = results[(scale, policy)]
+            lines.append(
+                f"| {scale * 100:.0f}% | {policy} | {seconds * 1000:.1f} | "
+                f"{megapixels / seconds:.1f} | {ssim:.4f} |"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缩放算法基准测试")
+    parser.add_argument('images', nargs='+', help="测试图片")
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES, help="缩放比例（大于 1 为放大）")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数（取中位数）")
+    args = parser.parse_args()
+
+    print(format_table(run_benchmark(args.images, args.scales, args.repeat), args.scales))
+
+
+if __name__ == '__main__':
+    main()
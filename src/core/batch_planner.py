@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务试运行（dry-run）模块
+
+在真正开始压缩 / 尺寸统一之前预估耗时、输出体积与内存占用，不写出任何文件：
+1. 并行读取全部文件头（不解码），得到格式、尺寸与通道数，解码后内存 = 宽 x 高 x 通道数；
+   压缩任务开启低质量 JPEG 检测时，同样在线程池中读取 JPEG 的量化表估算源质量
+2. 按 (源格式, 输出格式, 编码质量上限) 分层随机抽取约 1% 的文件（5-20 张，限定总时长），按实际参数完整执行一次解码、缩放、编码，
+   记录每种源格式每百万像素的解码耗时、每百万像素（源图 + 输出）的缩放耗时、
+   每个分层每百万像素的编码耗时（压缩任务包含 SSIM 计算）与每像素字节数
+3. 用上述单位成本乘以每个文件的像素数，得到总输出体积，再按并行数换算为预计耗时；
+   压缩任务按与 CompressThread 相同的规则（low_quality_jpeg_rule）处理低质量 JPEG：不缩放时复制或跳过，
+   缩放时按源质量封顶编码；体积变大的文件同样按 larger_policy 处理（复制的按原文件大小、跳过的按 0 计）
+"""
+
+import os
+import time
+import random
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Dict, Any, Tuple
+from PIL import Image
+from PySide6.QtCore import QThread, Signal
+
+from .image_processor import get_output_format, fit_image, larger_file_action, low_quality_jpeg_rule
+from .quality_metrics import compute_ssim
+from .jpeg_analyzer import estimate_jpeg_quality
+from .compress_preview import encode_compressed, output_size
+from .encoder_profiles import DEFAULT_ENCODER_PRESET
+from .resampling import DEFAULT_RESAMPLE, DEFAULT_FIT_MODE, apply_draft, compute_geometry
+
+logger = logging.getLogger('ImageStitcher.batch_planner')
+
+PLAN_OPERATIONS = ('compress', 'resize')
+# 抽样比例与数量上下限
+PLAN_SAMPLE_FRACTION = 0.01
+PLAN_MIN_SAMPLES = 5
+PLAN_MAX_SAMPLES = 20
+# 抽样编码的总时长上限（秒），至少完成一张
+PLAN_SAMPLE_BUDGET = 2.0
+# 读取文件头的线程数（主要是 I/O 等待）
+HEADER_READ_WORKERS = 8
+
+
+def read_header(filepath: str) -> Optional[Dict[str, Any]]:
+    """只读取文件头获得图片信息
+
+    Returns:
+        包含 path、format、width、height、bands、file_size 的字典；无法识别时返回 None
+    """
+    try:
+        with Image.open(filepath) as img:
+            return {
+                'path': filepath,
+                'format': img.format or os.path.splitext(filepath)[1][1:].upper(),
+                'width': img.width,
+                'height': img.height,
+                'bands': len(img.getbands()),
+                'file_size': os.path.getsize(filepath)
+            }
+    except Exception:
+        return None
+
+
+class CostModel:
+    """由抽样结果得到的单位成本（秒/百万像素、字节/像素）
+
+    解码耗时按源格式统计；编码耗时与每像素字节数按 (源格式, 输出格式, 编码质量上限) 分层统计，与抽样的分层方式一致。
+    """
+
+    def __init__(self):
+        self.decode: Dict[str, List[float]] = {}
+        self.resize: List[float] = []
+        self.encode: Dict[Tuple[str, str, Optional[int]], List[float]] = {}
+        self.bytes_per_pixel: Dict[Tuple[str, str, Optional[int]], List[float]] = {}
+
+    def add_sample(
+        self,
+        source_format: str,
+        out_format: str,
+        source_pixels: int,
+        out_pixels: int,
+        timings: Tuple[float, float, float],
+        out_bytes: int,
+        resize_pixels: Optional[int] = None,
+        quality: Optional[int] = None
+    ) -> None:
+        """记录一次抽样
+
+        Args:
+            source_format: 源格式
+            out_format: 输出格式（按任务参数，AUTO 不展开）
+            source_pixels: 源图像素数
+            out_pixels: 输出像素数
+            timings: (解码, 缩放, 编码) 耗时，秒；未缩放时缩放耗时为 None
+            out_bytes: 编码后的字节数
+            resize_pixels: 参与缩放的源图像素数（填充裁剪时小于源图），None 表示整张源图
+            quality: 编码质量上限（低质量源 JPEG 按源质量封顶）
+        """
+        decode_time, resize_time, encode_time = timings
+        source_mp = source_pixels / 1e6
+        out_mp = out_pixels / 1e6
+        self.decode.setdefault(source_format, []).append(decode_time / source_mp)
+        if resize_time is not None:
+            # 缩小时耗时主要取决于源图像素数，放大时取决于输出像素数
+            resize_mp = (source_pixels if resize_pixels is None else resize_pixels) / 1e6
+            self.resize.append(resize_time / (resize_mp + out_mp))
+        stratum = (source_format, out_format, quality)
+        self.encode.setdefault(stratum, []).append(encode_time / out_mp)
+        self.bytes_per_pixel.setdefault(stratum, []).append(out_bytes / out_pixels)
+
+    @staticmethod
+    def _rate(table: Dict[Any, List[float]], key: Any) -> float:
+        """取某一类的平均值，没有样本时退回所有样本的平均值"""
+        values = table.get(key) or [v for group in table.values() for v in group]
+        return sum(values) / len(values) if values else 0.0
+
+    @classmethod
+    def _stratum_rate(
+        cls,
+        table: Dict[Tuple[str, str, Optional[int]], List[float]],
+        source_format: str,
+        out_format: str,
+        quality: Optional[int] = None
+    ) -> float:
+        """取 (源格式, 输出格式, 质量上限) 分层的平均值，没有样本时依次退回同源格式与输出格式、同输出格式、所有样本"""
+        values = (
+            table.get((source_format, out_format, quality))
+            or [v for (src, out, _), group in table.items() if (src, out) == (source_format, out_format) for v in group]
+            or [v for (_, out, _), group in table.items() if out == out_format for v in group]
+        )
+        return sum(values) / len(values) if values else cls._rate(table, None)
+
+    def predict(
+        self,
+        source_format: str,
+        out_format: str,
+        source_pixels: int,
+        out_pixels: int,
+        resized: bool,
+        resize_pixels: Optional[int] = None,
+        quality: Optional[int] = None
+    ) -> Tuple[float, int]:
+        """预测单个文件的 (耗时秒, 输出字节)"""
+        seconds = self._rate(self.decode, source_format) * source_pixels / 1e6
+        if resized and self.resize:
+            resize_pixels = source_pixels if resize_pixels is None else resize_pixels
+            seconds += sum(self.resize) / len(self.resize) * (resize_pixels + out_pixels) / 1e6
+        seconds += self._stratum_rate(self.encode, source_format, out_format, quality) * out_pixels / 1e6
+        return seconds, int(self._stratum_rate(self.bytes_per_pixel, source_format, out_format, quality) * out_pixels)
+
+
+def stratified_sample(keys: List[Any], count: int, seed: int = 0) -> List[int]:
+    """按类别分层随机抽样，每个类别至少一个
+
+    等间隔抽样在文件按规律排列时（如照片与截图交替）会只抽到同一类，改为分层后在类别内随机抽取。
+
+    Args:
+        keys: 每个文件的类别
+        count: 期望的样本数
+        seed: 随机种子，保证同一批文件的结果可复现
+
+    Returns:
+        抽中的文件下标，各类别轮流排列（抽样时长用尽提前结束时每类仍有样本）
+    """
+    groups: Dict[Any, List[int]] = {}
+    for index, key in enumerate(keys):
+        groups.setdefault(key, []).append(index)
+    rng = random.Random(seed)
+    per_group = []
+    for members in groups.values():
+        quota = max(1, round(count * len(members) / len(keys)))
+        per_group.append(rng.sample(members, min(quota, len(members))))
+
+    picked = []
+    for round_index in range(max(len(group) for group in per_group)):
+        picked.extend(group[round_index] for group in per_group if round_index < len(group))
+    return picked
+
+
+def resize_target(headers: List[Dict[str, Any]], resize_mode: str, target_size: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """按 ResizeThread 的规则计算统一后的尺寸"""
+    if resize_mode == "max":
+        return max(h['width'] for h in headers), max(h['height'] for h in headers)
+    if resize_mode == "min":
+        return min(h['width'] for h in headers), min(h['height'] for h in headers)
+    return target_size or (800, 600)
+
+
+def plan_batch(
+    image_files: List[str],
+    operation: str = 'compress',
+    scale: int = 100,
+    quality: int = 80,
+    output_format: Optional[str] = None,
+    target_ssim: Optional[float] = None,
+    png_mode: str = 'lossless',
+    png_effort: int = 0,
+    encoder_preset: str = DEFAULT_ENCODER_PRESET,
+    resize_mode: str = "max",
+    target_size: Optional[Tuple[int, int]] = None,
+    resample: str = DEFAULT_RESAMPLE,
+    fit_mode: str = DEFAULT_FIT_MODE,
+    larger_policy: str = "keep",
+    skip_low_quality_jpeg: bool = False,
+    workers: int = 1,
+    sample_budget: float = PLAN_SAMPLE_BUDGET,
+    progress_callback: Optional[Callable[[int, str], None]] = None
+) -> Dict[str, Any]:
+    """预估批量任务的耗时、输出体积与内存占用
+
+    Args:
+        image_files: 图片路径列表
+        operation: "compress" 或 "resize"
+        scale: 压缩时的缩放比例
+        quality: 输出质量
+        output_format: 输出格式，None 表示保持原格式
+        target_ssim: 压缩时的目标 SSIM
+        png_mode: PNG 输出模式
+        png_effort: PNG 无损优化力度
+        encoder_preset: 编码档位
+        resize_mode: 尺寸统一模式（max / min / custom）
+        target_size: custom 模式下的目标尺寸
+        resample: 缩放策略
+        fit_mode: 尺寸统一的缩放方式（见 resampling.FIT_MODES）
+        larger_policy: 压缩后体积不小于原文件时的处理方式（见 CompressThread）
+        skip_low_quality_jpeg: 压缩时是否不再重新编码质量不高于目标质量的 JPEG（见 CompressThread）
+        workers: 任务的并行数
+        sample_budget: 抽样编码的总时长上限（秒）
+        progress_callback: 进度回调，参数为 (百分比, 状态文字)
+
+    Returns:
+        预估结果字典
+    """
+    def report(percent: int, text: str) -> None:
+        if progress_callback:
+            progress_callback(percent, text)
+
+    started = time.perf_counter()
+    report(0, f"读取 {len(image_files)} 个文件头...")
+    with ThreadPoolExecutor(max_workers=HEADER_READ_WORKERS) as executor:
+        headers_or_none = list(executor.map(read_header, image_files))
+        headers = [h for h in headers_or_none if h is not None]
+        # 与 CompressThread 相同：只有开启检测且输出仍为 JPEG 时才需要源质量，量化表同样并行读取
+        check_low_quality = operation == 'compress' and skip_low_quality_jpeg
+        jpeg_paths = [
+            h['path'] for h in headers
+            if check_low_quality and h['format'] in ('JPEG', 'JPG') and get_output_format(h['format'], output_format) == 'JPEG'
+        ]
+        source_qualities = dict(zip(jpeg_paths, executor.map(estimate_jpeg_quality, jpeg_paths)))
+    unreadable = [path for path, h in zip(image_files, headers_or_none) if h is None]
+    if not headers:
+        raise ValueError("没有可读取的图片")
+
+    if operation == 'resize':
+        target = resize_target(headers, resize_mode, target_size)
+
+    def plan_entry(header: Dict[str, Any]) -> Dict[str, Any]:
+        src_size = (header['width'], header['height'])
+        if operation == 'resize':
+            geometry = compute_geometry(src_size, target, fit_mode)
+        else:
+            out = output_size(header['width'], header['height'], scale)
+            geometry = {'box': (0, 0) + src_size, 'size': out, 'canvas': out, 'offset': (0, 0)}
+        box = geometry['box']
+        source_format = 'JPEG' if header['format'] == 'JPG' else header['format']
+        out_format = get_output_format(header['format'], output_format)
+        resized = geometry['size'] != src_size or geometry['canvas'] != src_size
+        # 与 CompressThread 相同：未缩放的低质量源 JPEG 不解码，直接按 larger_policy 复制或跳过；缩放时按源质量封顶编码
+        action, max_quality = low_quality_jpeg_rule(
+            source_qualities.get(header['path']), quality, out_format, scale, larger_policy, check_low_quality
+        )
+        return {
+            'source_format': source_format,
+            'out_format': out_format,
+            'source_pixels': header['width'] * header['height'],
+            'resize_pixels': int((box[2] - box[0]) * (box[3] - box[1])),
+            'geometry': geometry,
+            'out_size': geometry['canvas'],
+            'resized': resized,
+            'max_quality': max_quality,
+            'action': action
+        }
+
+    entries = [plan_entry(h) for h in headers]
+
+    # 抽样编码，建立成本模型
+    count = min(PLAN_MAX_SAMPLES, max(PLAN_MIN_SAMPLES, round(len(headers) * PLAN_SAMPLE_FRACTION)))
+    sample_indices = stratified_sample([(e['source_format'], e['out_format'], e['max_quality']) for e in entries], count)
+    # 不会被重新编码的文件不参与抽样（全部如此时仍保留抽样，以便给出单位成本）
+    sample_indices = [i for i in sample_indices if entries[i]['action'] is None] or sample_indices
+    model = CostModel()
+    sampled = 0
+    sample_started = time.perf_counter()
+    for index in sample_indices:
+        header, entry = headers[index], entries[index]
+        if sampled and time.perf_counter() - sample_started > sample_budget:
+            break
+        report(10 + int(sampled / len(sample_indices) * 80), f"抽样编码 {sampled + 1}/{len(sample_indices)}...")
+
+        t0 = time.perf_counter()
+        with Image.open(header['path']) as img:
+            if entry['resized']:
+                apply_draft(img, entry['geometry']['size'], resample)
+            img.load()
+            t1 = time.perf_counter()
+            resize_time = None
+            if entry['resized']:
+                img = fit_image(img, (header['width'], header['height']), entry['geometry'], resample)
+                resize_time = time.perf_counter() - t1
+            t2 = time.perf_counter()
+            _, data = encode_compressed(
+                img, entry['out_format'], entry['max_quality'],
+                target_ssim if operation == 'compress' else None,
+                png_mode, png_effort if operation == 'compress' else 0, encoder_preset
+            )
+            if operation == 'compress':
+                # CompressThread 会为每个输出计算 SSIM
+                compute_ssim(img, data)
+            t3 = time.perf_counter()
+
+        out_pixels = entry['out_size'][0] * entry['out_size'][1]
+        model.add_sample(
+            entry['source_format'], entry['out_format'], entry['source_pixels'], out_pixels,
+            (t1 - t0, resize_time, t3 - t2), len(data), entry['resize_pixels'], entry['max_quality']
+        )
+        sampled += 1
+
+    report(95, "汇总预估结果...")
+    total_seconds = 0.0
+    total_bytes = 0
+    peak_memory = 0
+    actions: Dict[str, int] = {}
+    for header, entry in zip(headers, entries):
+        action = entry['action']
+        if action is not None:
+            # 不解码，复制的文件按原大小计，跳过的不产生输出
+            actions[action] = actions.get(action, 0) + 1
+            total_bytes += header['file_size'] if action == 'copied' else 0
+            continue
+
+        out_pixels = entry['out_size'][0] * entry['out_size'][1]
+        seconds, out_bytes = model.predict(
+            entry['source_format'], entry['out_format'], entry['source_pixels'], out_pixels,
+            entry['resized'], entry['resize_pixels'], entry['max_quality']
+        )
+        if operation == 'compress':
+            action = larger_file_action(
+                out_bytes, header['file_size'], larger_policy, scale, entry['source_format'], entry['out_format']
+            )
+            if action != 'encoded':
+                actions[action] = actions.get(action, 0) + 1
+                out_bytes = header['file_size'] if action == 'copied' else 0
+        total_seconds += seconds
+        total_bytes += out_bytes
+        # 解码后的源图 + 缩放结果 + 编码缓冲区
+        memory = entry['source_pixels'] * header['bands']
+        if entry['resized']:
+            memory += out_pixels * header['bands']
+        peak_memory = max(peak_memory, memory + out_bytes)
+
+    workers = max(1, workers)
+    return {
+        'operation': operation,
+        'files': len(image_files),
+        'unreadable': unreadable,
+        'sampled': sampled,
+        'input_bytes': sum(h['file_size'] for h in headers),
+        'output_bytes': total_bytes,
+        'actions': actions,
+        'seconds': total_seconds / workers,
+        'workers': workers,
+        'peak_memory': peak_memory * workers,
+        'planning_seconds': time.perf_counter() - started
+    }
+
+
+def format_duration(seconds: float) -> str:
+    """格式化时长"""
+    if seconds < 60:
+        return f"{seconds:.1f} 秒"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} 分 {int(seconds % 60)} 秒"
+    return f"{int(seconds // 3600)} 小时 {int(seconds % 3600 // 60)} 分"
+
+
+def summarize_plan(plan: Dict[str, Any], format_size: Callable[[int], str]) -> str:
+    """生成试运行结果的说明文字
+
+    Args:
+        plan: plan_batch 的结果（含 BatchPlanThread 补充的 disk_free）
+        format_size: 文件大小格式化函数
+
+    Returns:
+        多行说明文字
+    """
+    lines = [
+        f"共 {plan['files']} 张，抽样编码 {plan['sampled']} 张，用时 {plan['planning_seconds']:.1f} 秒",
+        f"预计耗时 {format_duration(plan['seconds'])}（并行数 {plan['workers']}）",
+        f"预计输出 {format_size(plan['output_bytes'])}（原 {format_size(plan['input_bytes'])}）",
+        f"峰值内存约 {format_size(plan['peak_memory'])}"
+    ]
+    actions = plan.get('actions') or {}
+    if actions:
+        lines.append(f"其中预计复制原图 {actions.get('copied', 0)} 张，跳过 {actions.get('skipped', 0)} 张")
+    if plan.get('disk_free') is not None:
+        lines.append(f"输出目录剩余空间 {format_size(plan['disk_free'])}")
+    if plan['unreadable']:
+        lines.append(f"{len(plan['unreadable'])} 个文件无法读取")
+    return "\n".join(lines)
+
+
+class BatchPlanThread(QThread):
+    """批量任务试运行线程"""
+    progress = Signal(int)
+    status = Signal(str)
+    finished = Signal(dict)
+    error = Signal(str)
+
+    def __init__(self, image_files: List[str], output_dir: str, **plan_options):
+        """
+        Args:
+            image_files: 图片路径列表
+            output_dir: 输出目录（用于检查剩余磁盘空间）
+            plan_options: 传给 plan_batch 的参数
+        """
+        super().__init__()
+        self.image_files = image_files
+        self.output_dir = output_dir
+        self.plan_options = plan_options
+
+    def run(self) -> None:
+        try:
+            def on_progress(percent: int, text: str) -> None:
+                self.progress.emit(percent)
+                self.status.emit(text)
+
+            plan = plan_batch(self.image_files, progress_callback=on_progress, **self.plan_options)
+            plan['output_dir'] = self.output_dir
+            try:
+                plan['disk_free'] = shutil.disk_usage(self.output_dir).free
+            except OSError:
+                plan['disk_free'] = None
+            logger.info(
+                f"Batch plan: {plan['files']} files, ~{plan['output_bytes']} bytes, "
+                f"~{plan['seconds']:.1f}s, planned in {plan['planning_seconds']:.2f}s"
+            )
+
+            self.progress.emit(100)
+            self.finished.emit(plan)
+
+        except Exception as e:
+            logger.error(f"BatchPlanThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩预览模块
+
+在不写出任何文件的前提下估算批量压缩的输出体积：
+- 最多抽取 PREVIEW_MAX_FILES 张有代表性的图片：按 (源格式, 输出格式, 模式, 是否有透明色) 分层抽样，每类至少一张
+- 每张只编码网格抽样、按输出比例缩放后拼成的一小块预览图（小图直接编码整张），
+  用每像素字节数乘以输出像素数得到估算体积
+- 未抽到的图片只读取文件头获得尺寸，按同一类样本的平均每像素字节数估算（没有同类样本时逐级放宽到同源格式与输出格式、
+  同输出格式、全部样本）
+- 估算体积不小于原文件时按 larger_policy 处理：复制或跳过的文件按原文件大小计
+- 低质量源 JPEG 与 CompressThread 使用同一规则（low_quality_jpeg_rule）：不缩放时直接复制或跳过，不参与抽样；
+  缩放时按源质量封顶编码，封顶质量计入分层抽样的类别
+- 第一张图片另外编码中心区域，编码前后的区域一并返回，供界面对比放大查看
+"""
+
+import io
+import os
+import logging
+from collections import Counter
+from typing import List, Optional, Dict, Any, Tuple
+from PIL import Image
+from PySide6.QtCore import QThread, Signal
+
+from .image_processor import (
+    encode_image, prepare_png, get_output_format, choose_auto_format, larger_file_action,
+    low_quality_jpeg_rule, AUTO_FORMAT
+)
+from .jpeg_analyzer import estimate_jpeg_quality
+from .quality_metrics import find_quality_for_ssim
+from .png_encoder import optimize_png
+from .encoder_profiles import DEFAULT_ENCODER_PRESET, get_encoder_profile
+from .resampling import DEFAULT_RESAMPLE, resize_image
+
+logger = logging.getLogger('ImageStitcher.compress_preview')
+
+# 参与实际编码的图片数上限
+PREVIEW_MAX_FILES = 6
+# 预览图的边长（输出像素）
+PREVIEW_CROP_SIZE = 512
+# 每个方向抽取的小块数
+PREVIEW_GRID = 8
+# 编码前后对比区域的边长（输出像素）
+PREVIEW_VIEW_SIZE = 256
+
+
+def pick_sample_files(files: List[str], max_files: int = PREVIEW_MAX_FILES, keys: Optional[List[Any]] = None) -> List[str]:
+    """抽取样本文件（总是包含第一张）
+
+    Args:
+        files: 文件列表
+        max_files: 样本数上限
+        keys: 每个文件的类别；给出时按类别分层抽样（见 batch_planner.stratified_sample），否则在列表中均匀抽样
+
+    Returns:
+        样本文件，第一张排在最前
+    """
+    if len(files) <= max_files:
+        return list(files)
+    if keys is None:
+        step = len(files) / max_files
+        return [files[int(i * step)] for i in range(max_files)]
+
+    # batch_planner 依赖本模块，在函数内导入
+    from .batch_planner import stratified_sample
+    indices = [0] + [i for i in stratified_sample(keys, max_files) if i != 0]
+    return [files[i] for i in indices[:max_files]]
+
+
+def output_size(width: int, height: int, scale: int) -> Tuple[int, int]:
+    """按缩放比例计算输出尺寸（与 CompressThread 的计算方式一致）"""
+    if scale >= 100:
+        return width, height
+    return max(1, int(width * scale / 100)), max(1, int(height * scale / 100))
+
+
+def preview_region(
+    img: Image.Image,
+    scale: int,
+    crop_size: int = PREVIEW_CROP_SIZE,
+    resample: str = DEFAULT_RESAMPLE
+) -> Image.Image:
+    """从图片中均匀取 PREVIEW_GRID x PREVIEW_GRID 个小块，按输出比例缩放后拼成边长不超过 crop_size 的预览图
+
+    只取中心一块时，估算结果受画面中心内容影响很大；网格抽样覆盖整张图片，
+    小块边长是 8 的倍数，JPEG 的 8x8 块不会跨越两个小块。输出尺寸不超过 crop_size 时直接返回整张缩放后的图片。
+
+    Args:
+        img: 原图
+        scale: 缩放比例（百分比）
+        crop_size: 预览图边长（输出像素）
+        resample: 缩放策略
+
+    Returns:
+        预览图
+    """
+    factor = min(scale, 100) / 100
+    out_w, out_h = output_size(img.width, img.height, scale)
+    if out_w <= crop_size and out_h <= crop_size:
+        return resize_image(img, (out_w, out_h), resample) if factor < 1 else img.copy()
+
+    patch = crop_size // PREVIEW_GRID
+    cols = max(1, min(PREVIEW_GRID, out_w // patch))
+    rows = max(1, min(PREVIEW_GRID, out_h // patch))
+    src_patch_w = min(img.width, round(patch / factor))
+    src_patch_h = min(img.height, round(patch / factor))
+
+    mosaic = Image.new(img.mode, (cols * patch, rows * patch))
+    for row in range(rows):
+        # 起点对齐到 8 像素，源 JPEG 的 8x8 块与重新编码时的块保持一致
+        top = (img.height - src_patch_h) * (2 * row + 1) // (2 * rows) // 8 * 8
+        for col in range(cols):
+            left = (img.width - src_patch_w) * (2 * col + 1) // (2 * cols) // 8 * 8
+            piece = img.crop((left, top, left + src_patch_w, top + src_patch_h))
+            piece = resize_image(piece, (patch, patch), resample)
+            mosaic.paste(piece, (col * patch, row * patch))
+    if img.mode == 'P':
+        mosaic.putpalette(img.getpalette())
+        if 'transparency' in img.info:
+            mosaic.info['transparency'] = img.info['transparency']
+    return mosaic
+
+
+def center_region(
+    img: Image.Image,
+    scale: int,
+    size: int = PREVIEW_VIEW_SIZE,
+    resample: str = DEFAULT_RESAMPLE
+) -> Image.Image:
+    """取图片中心按输出比例缩放后边长不超过 size 的区域"""
+    factor = min(scale, 100) / 100
+    src_w = min(img.width, max(1, round(size / factor)))
+    src_h = min(img.height, max(1, round(size / factor)))
+    left = (img.width - src_w) // 2 // 8 * 8
+    top = (img.height - src_h) // 2 // 8 * 8
+    region = img.crop((left, top, left + src_w, top + src_h))
+    if factor < 1:
+        region = resize_image(region, (max(1, int(src_w * factor)), max(1, int(src_h * factor))), resample)
+    return region
+
+
+def encode_compressed(
+    img: Image.Image,
+    out_format: str,
+    quality: int,
+    target_ssim: Optional[float] = None,
+    png_mode: str = 'lossless',
+    png_effort: int = 0,
+    preset: str = DEFAULT_ENCODER_PRESET
+) -> Tuple[str, bytes]:
+    """按压缩参数在内存中编码（与 CompressThread 的编码分支一致）
+
+    Args:
+        img: 已缩放的图片
+        out_format: 输出格式，可为 AUTO
+        quality: 输出质量（目标 SSIM 模式下为质量上限）
+        target_ssim: 目标 SSIM，仅对 JPEG/WEBP 生效
+        png_mode: PNG 输出模式
+        png_effort: PNG 无损优化力度，0 表示使用编码档位的默认设置
+        preset: 编码档位
+
+    Returns:
+        (实际格式, 编码字节)
+    """
+    if out_format == AUTO_FORMAT:
+        choice = choose_auto_format(img, quality, preset, max_trial_pixels=None)
+        return choice['format'], choice['data']
+    if target_ssim and out_format in ('JPEG', 'WEBP'):
+        _, data, _ = find_quality_for_ssim(
+            img,
+            lambda im, q: encode_image(im, out_format, q, preset=preset),
+            target_ssim,
+            max_quality=quality
+        )
+        return out_format, data
+    png_effort = png_effort or get_encoder_profile(preset).png_effort
+    if out_format == 'PNG' and png_effort:
+        data, _ = optimize_png(prepare_png(img, png_mode), png_effort)
+        return out_format, data
+    return out_format, encode_image(img, out_format, quality, png_mode, preset=preset)
+
+
+class CompressPreviewThread(QThread):
+    """压缩预览线程
+
+    参数变化时界面会创建新的线程并对旧线程调用 cancel()；
+    线程在处理每张图片之前检查取消标志，无论是否取消都会以 request_id 发出 finished，
+    界面只采用最新请求的结果。
+    """
+    finished = Signal(dict)
+    error = Signal(str)
+
+    def __init__(
+        self,
+        request_id: int,
+        image_files: List[str],
+        scale: int = 80,
+        quality: int = 80,
+        output_format: Optional[str] = None,
+        target_ssim: Optional[float] = None,
+        png_mode: str = 'lossless',
+        png_effort: int = 0,
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        resample: str = DEFAULT_RESAMPLE,
+        larger_policy: str = "keep",
+        skip_low_quality_jpeg: bool = True
+    ):
+        super().__init__()
+        self.request_id = request_id
+        self.image_files = image_files
+        self.scale = scale
+        self.quality = quality
+        self.output_format = output_format
+        self.target_ssim = target_ssim
+        self.png_mode = png_mode
+        self.png_effort = png_effort
+        self.encoder_preset = encoder_preset
+        self.resample = resample
+        # 与 CompressThread 相同，估算体积不小于原文件时复制或跳过的文件按原文件大小计
+        self.larger_policy = larger_policy
+        self.skip_low_quality_jpeg = skip_low_quality_jpeg  # 与 CompressThread 相同的低质量源 JPEG 规则
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """请求取消（在处理下一张图片前生效）"""
+        self._cancelled = True
+
+    def run(self) -> None:
+        try:
+            headers = {filepath: self._read_header(filepath) for filepath in self.image_files}
+            # 直接复制或跳过的低质量源不需要编码，也不参与抽样
+            fixed = {
+                filepath: self._unchanged(header)
+                for filepath, header in headers.items() if header['action']
+            }
+            candidates = [filepath for filepath in self.image_files if filepath not in fixed]
+            samples = pick_sample_files(
+                candidates, keys=[headers[filepath]['key'] for filepath in candidates]
+            )
+            sampled: Dict[str, Dict[str, Any]] = {}
+            before = after = view_format = None
+
+            for filepath in samples:
+                if self._cancelled:
+                    self.finished.emit({'request_id': self.request_id, 'cancelled': True})
+                    return
+                sampled[filepath] = self._preview_file(headers[filepath])
+
+            if samples and not self._cancelled:
+                view_format = sampled[samples[0]]['format']
+                before, after = self._preview_view(headers[samples[0]], view_format)
+
+            if self._cancelled:
+                self.finished.emit({'request_id': self.request_id, 'cancelled': True})
+                return
+
+            files = [
+                fixed.get(filepath) or sampled.get(filepath) or self._extrapolate(headers[filepath], sampled)
+                for filepath in self.image_files
+            ]
+
+            self.finished.emit({
+                'request_id': self.request_id,
+                'cancelled': False,
+                'files': files,
+                'total_original': sum(f['original_size'] for f in files),
+                'total_estimated': sum(f['estimated_size'] for f in files),
+                'sampled': len(sampled),
+                'before': before,
+                'after': after,
+                'view_format': view_format
+            })
+
+        except Exception as e:
+            logger.error(f"CompressPreviewThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
+
+    def _read_header(self, filepath: str) -> Dict[str, Any]:
+        """只读取文件头，得到输出尺寸与分层抽样的类别"""
+        with Image.open(filepath) as img:
+            source_format = img.format or os.path.splitext(filepath)[1][1:].upper()
+            if source_format == 'JPG':
+                source_format = 'JPEG'
+            out_format = get_output_format(source_format, self.output_format)
+            source_quality = None
+            if self.skip_low_quality_jpeg and source_format == 'JPEG' and out_format == 'JPEG':
+                source_quality = estimate_jpeg_quality(filepath)
+            action, max_quality = low_quality_jpeg_rule(
+                source_quality, self.quality, out_format, self.scale,
+                self.larger_policy, self.skip_low_quality_jpeg
+            )
+            key = (source_format, out_format, img.mode, 'transparency' in img.info, max_quality)
+            return {
+                'path': filepath,
+                'source_format': source_format,
+                'out_format': out_format,
+                'out_size': output_size(img.width, img.height, self.scale),
+                'original_size': os.path.getsize(filepath),
+                'action': action,
+                'max_quality': max_quality,
+                'key': key
+            }
+
+    def _unchanged(self, header: Dict[str, Any]) -> Dict[str, Any]:
+        """低质量源按 larger_policy 直接复制或跳过时的结果（按原文件大小计）"""
+        return {
+            'input': header['path'],
+            'format': header['source_format'],
+            'original_size': header['original_size'],
+            'estimated_size': header['original_size'],
+            'bytes_per_pixel': 0.0,
+            'action': header['action'],
+            'key': header['key'],
+            'exact': True,
+            'sampled': False
+        }
+
+    def _estimate(
+        self,
+        header: Dict[str, Any],
+        out_format: str,
+        estimated: int,
+        bytes_per_pixel: float,
+        exact: bool,
+        sampled: bool
+    ) -> Dict[str, Any]:
+        """组装单个文件的估算结果，按 larger_policy 修正体积"""
+        action = larger_file_action(
+            estimated, header['original_size'], self.larger_policy, self.scale, header['source_format'], out_format
+        )
+        return {
+            'input': header['path'],
+            'format': out_format,
+            'original_size': header['original_size'],
+            'estimated_size': estimated if action == 'encoded' else header['original_size'],
+            'bytes_per_pixel': bytes_per_pixel,
+            'action': action,
+            'key': header['key'],
+            'exact': exact,
+            'sampled': sampled
+        }
+
+    def _preview_file(self, header: Dict[str, Any]) -> Dict[str, Any]:
+        """编码单张图片的预览图并估算输出体积"""
+        with Image.open(header['path']) as img:
+            region = preview_region(img, self.scale, resample=self.resample)
+
+        out_format, data = encode_compressed(
+            region, header['out_format'], header['max_quality'], self.target_ssim,
+            self.png_mode, self.png_effort, self.encoder_preset
+        )
+        out_w, out_h = header['out_size']
+        exact = region.size == (out_w, out_h)
+        bytes_per_pixel = len(data) / (region.width * region.height)
+        estimated = len(data) if exact else int(bytes_per_pixel * out_w * out_h)
+        return self._estimate(header, out_format, estimated, bytes_per_pixel, exact, True)
+
+    def _preview_view(self, header: Dict[str, Any], out_format: str) -> Tuple[Image.Image, Image.Image]:
+        """编码中心区域，返回 (编码前, 编码后) 用于对比显示"""
+        with Image.open(header['path']) as img:
+            region = center_region(img, self.scale, resample=self.resample)
+        _, data = encode_compressed(
+            region, out_format, header['max_quality'], self.target_ssim,
+            self.png_mode, self.png_effort, self.encoder_preset
+        )
+        with Image.open(io.BytesIO(data)) as decoded:
+            decoded.load()
+            return region, decoded.copy()
+
+    def _extrapolate(self, header: Dict[str, Any], sampled: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """按同类样本的平均每像素字节数估算未编码图片的输出体积"""
+        key = header['key']
+        entries = list(sampled.values())
+        # 依次放宽：同一类、同源格式与输出格式、同输出格式、全部样本
+        similar = (
+            [e for e in entries if e['key'] == key]
+            or [e for e in entries if e['key'][:2] == key[:2]]
+            or [e for e in entries if e['key'][1] == key[1]]
+            or entries
+        )
+        bytes_per_pixel = sum(e['bytes_per_pixel'] for e in similar) / len(similar)
+        out_format = header['out_format']
+        if out_format == AUTO_FORMAT:
+            # 自动格式按同类样本中最常选中的格式计
+            out_format = Counter(e['format'] for e in similar).most_common(1)[0][0]
+        out_w, out_h = header['out_size']
+        return self._estimate(header, out_format, int(bytes_per_pixel * out_w * out_h), bytes_per_pixel, False, False)
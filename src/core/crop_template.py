@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分割区域模板
+
+把自定义分割区域保存为 JSON 模板，供版式相同的一批图片（如同一套商品图）重复使用。
+区域坐标是相对于图片宽高的比例（见 region_mask），模板与具体的图片尺寸无关；
+同时记录保存时的图片尺寸，套用到宽高比不同的图片时可以提示用户。
+"""
+
+import json
+import logging
+from typing import List, Optional, Dict, Any, Tuple
+
+from .region_mask import Region, normalize_region
+
+logger = logging.getLogger('ImageStitcher.crop_template')
+
+# 模板文件格式版本
+CROP_TEMPLATE_VERSION = 1
+
+
+def save_crop_template(path: str, regions: List[Region], source_size: Optional[Tuple[int, int]] = None) -> None:
+    """保存分割区域模板
+
+    Args:
+        path: 模板路径
+        regions: 分割区域
+        source_size: 绘制区域时的图片尺寸
+    """
+    entries = []
+    for region in regions:
+        region = normalize_region(region)
+        entry: Dict[str, Any] = {'shape': region['shape'], 'box': [round(v, 6) for v in region['box']]}
+        if region['shape'] == 'polygon':
+            entry['points'] = [[round(x, 6), round(y, 6)] for x, y in region['points']]
+        entries.append(entry)
+
+    template = {
+        'version': CROP_TEMPLATE_VERSION,
+        'source_size': list(source_size) if source_size else None,
+        'regions': entries
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(template, f, ensure_ascii=False, indent=2)
+    logger.info(f"保存分割模板 {path}: {len(entries)} 个区域")
+
+
+def load_crop_template(path: str) -> Dict[str, Any]:
+    """读取分割区域模板
+
+    Args:
+        path: 模板路径
+
+    Returns:
+        {'regions': 区域列表, 'source_size': 保存时的图片尺寸或 None}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        template = json.load(f)
+    if not isinstance(template, dict) or not isinstance(template.get('regions'), list):
+        raise ValueError("不是有效的分割模板")
+    if template.get('version', CROP_TEMPLATE_VERSION) > CROP_TEMPLATE_VERSION:
+        raise ValueError(f"模板版本 {template['version']} 高于当前支持的版本 {CROP_TEMPLATE_VERSION}")
+
+    regions = []
+    for entry in template['regions']:
+        region = normalize_region(entry if isinstance(entry, dict) else tuple(entry))
+        if len(region['box']) != 4:
+            raise ValueError("分割模板中的区域格式不正确")
+        region = dict(region, box=tuple(float(v) for v in region['box']))
+        if region['shape'] == 'polygon':
+            region['points'] = [(float(x), float(y)) for x, y in region['points']]
+        regions.append(region)
+    if not regions:
+        raise ValueError("分割模板中没有区域")
+
+    source_size = template.get('source_size')
+    return {
+        'regions': regions,
+        'source_size': tuple(source_size) if source_size else None
+    }
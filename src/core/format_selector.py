@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输出格式自动选择模块
+
+根据图片内容在 JPEG / PNG / WEBP 之间自动选择体积最小且满足质量要求的格式：
+1. 检查透明通道是否真正被使用（只看通道极值，不复制像素）；使用了透明度时排除 JPEG
+2. 统计颜色数，颜色少的图片（截图、图标）转为调色板 PNG 是无损的；
+   颜色数适中（如带抗锯齿的截图）时才尝试有损调色板，照片直接跳过量化
+3. 在线程池中并行试编码全部候选格式，取体积最小的一个；
+   有损的调色板 PNG 只有在 SSIM 不低于按当前质量编码的 JPEG/WEBP 时才参与比较
+4. 超大图片只在缩小后的代理图上试编码，以选出格式，不保留编码结果
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+from .quality_metrics import compute_ssim, to_luminance
+from .resampling import reducible_image
+
+logger = logging.getLogger('ImageStitcher.format_selector')
+
+AUTO_FORMAT = 'AUTO'
+
+# 调色板 PNG 的颜色数上限
+PALETTE_COLORS = 256
+# 颜色数不超过该值时才尝试有损调色板 PNG
+PALETTE_TRIAL_MAX_COLORS = 8192
+# 超过该像素数的图片改为在代理图上试编码
+AUTO_TRIAL_MAX_PIXELS = 4_000_000
+# 代理图的最长边
+AUTO_TRIAL_MAX_SIDE = 2048
+
+
+def uses_alpha(img: Image.Image) -> bool:
+    """判断图片是否真正使用了透明度（存在不完全不透明的像素）
+
+    Args:
+        img: PIL Image 对象
+
+    Returns:
+        是否存在 alpha < 255 的像素
+    """
+    if img.mode in ('RGBA', 'LA', 'PA'):
+        return img.getextrema()[-1][0] < 255
+    if img.mode == 'P' and 'transparency' in img.info:
+        transparency = img.info['transparency']
+        lut = np.full(256, 255, dtype=np.uint8)
+        if isinstance(transparency, int):
+            lut[transparency] = 0
+        else:
+            alpha = np.frombuffer(transparency, dtype=np.uint8)[:256]
+            lut[:len(alpha)] = alpha
+        return bool(lut[np.asarray(img)].min() < 255)
+    if img.mode in ('L', 'RGB') and 'transparency' in img.info:
+        return True
+    return False
+
+
+def count_colors(img: Image.Image, limit: int = PALETTE_COLORS) -> Optional[int]:
+    """统计图片颜色数
+
+    Args:
+        img: PIL Image 对象
+        limit: 统计上限
+
+    Returns:
+        颜色数；超过 limit 时返回 None
+    """
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    elif img.mode.startswith('I;16'):
+        # getcolors() 不支持 16 位打包模式
+        img = img.convert('I')
+    colors = img.getcolors(limit)
+    return len(colors) if colors is not None else None
+
+
+def _trial_image(img: Image.Image, max_pixels: Optional[int]) -> Tuple[Image.Image, bool]:
+    """返回用于试编码的图片以及是否为缩小后的代理图"""
+    if not max_pixels or img.width * img.height <= max_pixels:
+        return img, False
+    factor = -(-max(img.size) // AUTO_TRIAL_MAX_SIDE)
+    return reducible_image(img).reduce(factor), True
+
+
+def choose_output_format(
+    img: Image.Image,
+    encode: Callable[[Image.Image, str, str], bytes],
+    max_workers: Optional[int] = None,
+    max_trial_pixels: Optional[int] = AUTO_TRIAL_MAX_PIXELS
+) -> Dict[str, Any]:
+    """通过并行试编码为图片选择输出格式
+
+    Args:
+        img: 待编码的图片（已完成缩放等处理）
+        encode: 编码回调，参数为 (图片, 格式, PNG 模式)，返回编码后的字节；
+            JPEG/WEBP 应按用户设置的质量编码
+        max_workers: 线程池大小，默认为 CPU 核心数（最多 8）
+        max_trial_pixels: 超过该像素数时在代理图上试编码，None 表示总是使用原图
+
+    Returns:
+        包含 format、png_mode、data（代理图试编码时为 None）、sizes（各候选的字节数）、
+        alpha、colors（超过 PALETTE_TRIAL_MAX_COLORS 时为 None）的字典
+    """
+    alpha = uses_alpha(img)
+    colors = count_colors(img, PALETTE_TRIAL_MAX_COLORS)
+    lossless_palette = colors is not None and colors <= PALETTE_COLORS
+
+    candidates: List[Tuple[str, str, str]] = []
+    if lossless_palette:
+        # 颜色数不超过调色板大小时，调色板 PNG 是无损的
+        candidates.append(('PNG (palette)', 'PNG', 'palette'))
+    else:
+        if alpha:
+            candidates.append(('PNG', 'PNG', 'lossless'))
+        else:
+            candidates.append(('JPEG', 'JPEG', 'lossless'))
+        if colors is not None:
+            candidates.append(('PNG (palette)', 'PNG', 'palette'))
+    candidates.append(('WEBP', 'WEBP', 'lossless'))
+
+    trial, is_proxy = _trial_image(img, max_trial_pixels)
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            name: executor.submit(encode, trial, fmt, png_mode)
+            for name, fmt, png_mode in candidates
+        }
+        encoded = {name: future.result() for name, future in futures.items()}
+
+    sizes = {name: len(data) for name, data in encoded.items()}
+    eligible = dict(sizes)
+
+    if 'PNG (palette)' in encoded and not lossless_palette:
+        # 有损调色板须达到按当前质量编码的 JPEG/WEBP 的 SSIM 才能入选
+        reference = to_luminance(trial)
+        lossy = [name for name in ('JPEG', 'WEBP') if name in encoded]
+        threshold = min(compute_ssim(reference, encoded[name]) for name in lossy)
+        palette_ssim = compute_ssim(reference, encoded['PNG (palette)'])
+        if palette_ssim < threshold:
+            del eligible['PNG (palette)']
+        logger.debug(f"Palette SSIM {palette_ssim:.4f}, threshold {threshold:.4f}")
+
+    best = min(eligible, key=eligible.get)
+    _, out_format, png_mode = next(c for c in candidates if c[0] == best)
+    logger.debug(f"Auto format: {best} (alpha={alpha}, colors={colors}, sizes={sizes}, proxy={is_proxy})")
+
+    return {
+        'format': out_format,
+        'png_mode': png_mode,
+        'data': None if is_proxy else encoded[best],
+        'sizes': sizes,
+        'alpha': alpha,
+        'colors': colors
+    }
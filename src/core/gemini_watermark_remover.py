@@ -20,6 +20,9 @@ import numpy as np
 from PIL import Image
 from PySide6.QtCore import QObject, Signal, QThread, QMutex, QWaitCondition
 
+from .image_processor import save_image
+from .encoder_profiles import DEFAULT_ENCODER_PRESET
+
 logger = logging.getLogger('ImageStitcher.gemini_watermark_remover')
 
 
@@ -355,13 +358,15 @@ class GeminiWatermarkThread(QThread):
         image_files: list,
         output_dir: str,
         output_format: Optional[str] = None,
-        quality: int = 95
+        quality: int = 95,
+        encoder_preset: str = DEFAULT_ENCODER_PRESET
     ):
         super().__init__()
         self.image_files = image_files
         self.output_dir = output_dir
         self.output_format = output_format
         self.quality = quality
+        self.encoder_preset = encoder_preset
 
         self.mutex = QMutex()
         self.wait_condition = QWaitCondition()
@@ -451,30 +456,13 @@ class GeminiWatermarkThread(QThread):
                     # 关闭原始图片
                     img.close()
 
-                    # 计算压缩级别（针对 PNG）
-                    # 质量 100 → compress_level 0（无压缩）
-                    # 质量 1 → compress_level 9（最大压缩）
-                    compress_level = max(0, min(9, int((100 - self.quality) / 10)))
-
-                    # 保存结果
-                    if self.output_format == 'JPEG':
-                        result_img.save(output_path, 'JPEG', quality=self.quality, optimize=True)
-                    elif self.output_format == 'PNG':
-                        # compress_level: 0=无压缩(最大质量), 9=最大压缩(最小文件)
-                        result_img.save(output_path, 'PNG', compress_level=compress_level)
-                    elif self.output_format == 'WEBP':
-                        result_img.save(output_path, 'WEBP', quality=self.quality, method=6)
+                    # 保存结果，编码参数（PNG 压缩级别、WEBP method 等）由编码档位决定
+                    ext_format_map = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+                    out_format = self.output_format or ext_format_map.get(ext.lower())
+                    if out_format:
+                        save_image(result_img, output_path, out_format, self.quality, preset=self.encoder_preset)
                     else:
-                        # 保持原格式时也需要设置质量参数
-                        ext_lower = ext.lower()
-                        if ext_lower in ('.jpg', '.jpeg'):
-                            result_img.save(output_path, 'JPEG', quality=self.quality, optimize=True)
-                        elif ext_lower == '.png':
-                            result_img.save(output_path, 'PNG', compress_level=compress_level)
-                        elif ext_lower == '.webp':
-                            result_img.save(output_path, 'WEBP', quality=self.quality, method=6)
-                        else:
-                            result_img.save(output_path)
+                        result_img.save(output_path)
 
                     results.append({
                         'input': filepath,
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按分隔带自动分割模块
+
+漫画页、界面设计稿等图片由大小不一的格子组成，格子之间是颜色一致的分隔带，按行列等分会切到内容。
+本模块在缩小后的灰度代理图上检测分隔带并沿分隔带切分：
+- 代理图最长边不超过 PROXY_MAX_SIDE，JPEG 用 draft() 在解码时直接缩小，其余格式用 reduce() 缩小
+- 以代理图四周像素的中位数作为分隔带颜色，与其差异超过容差的像素视为内容
+- 对内容掩码做行 / 列投影，内容占比不超过 CONTENT_FRACTION 的连续行（列）即为分隔带；
+  先按行切分，再在每一行内按列切分，递归进行（XY-cut），可以处理每行格子数不同的页面
+- 检测只涉及代理图上的向量化运算，与原图尺寸无关，通常只需几毫秒；只有输出时才完整解码原图
+"""
+
+import os
+import math
+import time
+import logging
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple, Callable
+import numpy as np
+from PIL import Image
+from PySide6.QtCore import QThread, Signal, QMutex, QWaitCondition
+
+from .image_processor import (
+    get_output_format, get_file_extension, save_image, choose_auto_format, convert_to_rgb, AUTO_FORMAT
+)
+from .encoder_profiles import DEFAULT_ENCODER_PRESET
+
+logger = logging.getLogger('ImageStitcher.gutter_split')
+
+# 分隔带颜色的默认容差（灰度差，0-255）
+DEFAULT_GUTTER_TOLERANCE = 16
+
+# 分隔带的默认最小宽度（原图像素）
+DEFAULT_MIN_GUTTER = 8
+
+# 代理图最长边
+PROXY_MAX_SIDE = 1024
+
+# 一行（列）中内容像素的占比不超过该值时仍视为分隔带，容忍少量噪点
+CONTENT_FRACTION = 0.002
+
+# 面积小于整页该比例的格子视为噪点，不输出
+MIN_PANEL_FRACTION = 0.002
+
+# XY-cut 的最大递归深度
+MAX_CUT_DEPTH = 6
+
+
+def make_proxy(image_file: str, max_side: int = PROXY_MAX_SIDE) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """读取图片的灰度代理图
+
+    Args:
+        image_file: 图片路径
+        max_side: 代理图最长边
+
+    Returns:
+        (代理图灰度数组, 原图尺寸)
+    """
+    with Image.open(image_file) as img:
+        size = img.size
+        factor = max(1, math.ceil(max(size) / max_side))
+        if img.format == 'JPEG' and factor > 1:
+            # 解码时按 1/2、1/4、1/8 缩小，大幅减少解码耗时
+            img.draft('RGB', (size[0] // factor, size[1] // factor))
+            factor = max(1, math.ceil(max(img.size) / max_side))
+        if img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+        proxy = img.reduce(factor) if factor > 1 else img
+        # 透明区域合成到白色背景上再转为灰度
+        proxy = convert_to_rgb(proxy).convert('L')
+        return np.asarray(proxy, dtype=np.int16), size
+
+
+def _gutter_runs(content: np.ndarray, min_gutter: int) -> List[Tuple[int, int]]:
+    """找出一维投影中所有长度不小于 min_gutter 的空白段（不含两端）"""
+    empty = np.concatenate(([0], (content <= CONTENT_FRACTION).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(empty))
+    runs = zip(edges[::2], edges[1::2])
+    return [(int(s), int(e)) for s, e in runs if e - s >= min_gutter and s > 0 and e < len(content)]
+
+
+def _xy_cut(
+    mask: np.ndarray,
+    box: Tuple[int, int, int, int],
+    min_gutter: int,
+    depth: int = 0
+) -> List[Tuple[int, int, int, int]]:
+    """在 box 内沿分隔带递归切分，返回按阅读顺序排列的格子"""
+    x0, y0, x1, y1 = box
+    region = mask[y0:y1, x0:x1]
+    rows = region.mean(axis=1) > CONTENT_FRACTION
+    cols = region.mean(axis=0) > CONTENT_FRACTION
+    if not rows.any() or not cols.any():
+        return []
+
+    # 去掉四周的空白
+    top, bottom = int(np.argmax(rows)), len(rows) - int(np.argmax(rows[::-1]))
+    left, right = int(np.argmax(cols)), len(cols) - int(np.argmax(cols[::-1]))
+    x0, y0, x1, y1 = x0 + left, y0 + top, x0 + right, y0 + bottom
+    if depth >= MAX_CUT_DEPTH:
+        return [(x0, y0, x1, y1)]
+
+    region = mask[y0:y1, x0:x1]
+    # 先按行切分，找不到横向分隔带时再按列切分
+    for axis in (1, 0):
+        runs = _gutter_runs(region.mean(axis=axis), min_gutter)
+        if not runs:
+            continue
+        length = region.shape[0] if axis == 1 else region.shape[1]
+        bounds = [0] + [p for run in runs for p in run] + [length]
+        panels = []
+        for start, end in zip(bounds[::2], bounds[1::2]):
+            sub = (x0, y0 + start, x1, y0 + end) if axis == 1 else (x0 + start, y0, x0 + end, y1)
+            panels.extend(_xy_cut(mask, sub, min_gutter, depth + 1))
+        return panels
+
+    return [(x0, y0, x1, y1)]
+
+
+def detect_gutters(
+    image_file: str,
+    tolerance: int = DEFAULT_GUTTER_TOLERANCE,
+    min_gutter: int = DEFAULT_MIN_GUTTER,
+    max_side: int = PROXY_MAX_SIDE
+) -> Dict[str, Any]:
+    """检测分隔带并返回各格子在原图中的区域
+
+    Args:
+        image_file: 图片路径
+        tolerance: 与分隔带颜色的灰度差不超过该值的像素视为分隔带
+        min_gutter: 分隔带的最小宽度（原图像素）
+        max_side: 代理图最长边
+
+    Returns:
+        包含 panels（按阅读顺序排列的 (left, top, right, bottom) 列表）、background、elapsed_ms 的字典
+    """
+    start = time.perf_counter()
+    gray, (width, height) = make_proxy(image_file, max_side)
+    proxy_h, proxy_w = gray.shape
+    scale_x = width / proxy_w
+    scale_y = height / proxy_h
+
+    border = np.concatenate((gray[0], gray[-1], gray[:, 0], gray[:, -1]))
+    background = int(np.median(border))
+    mask = np.abs(gray - background) > tolerance
+
+    min_run = max(1, round(min_gutter / max(scale_x, scale_y)))
+    boxes = _xy_cut(mask, (0, 0, proxy_w, proxy_h), min_run)
+
+    panels = []
+    min_area = proxy_w * proxy_h * MIN_PANEL_FRACTION
+    for x0, y0, x1, y1 in boxes:
+        if (x1 - x0) * (y1 - y0) < min_area:
+            continue
+        # 代理图的一个像素对应原图的多个像素，向外扩展一个代理像素以免裁掉格子边框
+        panels.append((
+            max(0, math.floor((x0 - 1) * scale_x)),
+            max(0, math.floor((y0 - 1) * scale_y)),
+            min(width, math.ceil((x1 + 1) * scale_x)),
+            min(height, math.ceil((y1 + 1) * scale_y))
+        ))
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"检测到 {len(panels)} 个格子，耗时 {elapsed_ms:.1f} ms: {image_file}")
+    return {'panels': panels, 'background': background, 'elapsed_ms': elapsed_ms}
+
+
+def split_image_gutters(
+    image_file: str,
+    output_dir: str,
+    tolerance: int = DEFAULT_GUTTER_TOLERANCE,
+    min_gutter: int = DEFAULT_MIN_GUTTER,
+    quality: int = 95,
+    output_format: Optional[str] = None,
+    png_mode: str = 'lossless',
+    encoder_preset: str = DEFAULT_ENCODER_PRESET,
+    confirm_overwrite: Optional[Callable[[str], bool]] = None,
+    progress_callback: Optional[Callable[[int, int, str], None]] = None
+) -> List[Dict[str, Any]]:
+    """沿分隔带分割一张图片，保存到 {name}_panels 文件夹
+
+    Args:
+        image_file: 图片路径
+        output_dir: 输出目录
+        tolerance: 分隔带颜色容差
+        min_gutter: 分隔带的最小宽度（原图像素）
+        quality: 输出质量
+        output_format: 输出格式
+        png_mode: PNG 输出模式
+        encoder_preset: 编码档位
+        confirm_overwrite: 输出文件已存在时调用，返回是否覆盖；None 表示直接覆盖
+        progress_callback: 进度回调，参数为 (已处理格子数, 总格子数, 状态文字)
+
+    Returns:
+        每个格子的结果列表
+    """
+    detection = detect_gutters(image_file, tolerance, min_gutter)
+    panels = detection['panels']
+    total = len(panels)
+
+    def report(done: int, text: str) -> None:
+        if progress_callback:
+            progress_callback(done, total, text)
+
+    report(0, f"检测到 {total} 个格子（{detection['elapsed_ms']:.0f} ms）")
+    results: List[Dict[str, Any]] = []
+    if not panels:
+        return results
+
+    with Image.open(image_file) as img:
+        original_format = img.format or os.path.splitext(image_file)[1][1:].upper()
+        out_format = get_output_format(original_format, output_format)
+        if out_format == AUTO_FORMAT:
+            report(0, "正在选择输出格式...")
+            choice = choose_auto_format(img, quality, encoder_preset)
+            out_format, png_mode = choice['format'], choice['png_mode']
+        if out_format == 'JPEG':
+            img = convert_to_rgb(img)
+
+        name, _ = os.path.splitext(os.path.basename(image_file))
+        panel_output_dir = os.path.join(output_dir, f"{name}_panels")
+        os.makedirs(panel_output_dir, exist_ok=True)
+        ext = get_file_extension(out_format)
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+
+        for i, box in enumerate(panels, 1):
+            report(i - 1, f"处理第 {i}/{total} 格...")
+            output_path = os.path.join(panel_output_dir, f"{name}_panel_{timestamp}_{i}{ext}")
+            if os.path.exists(output_path) and confirm_overwrite and not confirm_overwrite(output_path):
+                report(i, f"跳过第 {i}/{total} 格")
+                continue
+
+            panel = img.crop(box)
+            save_image(panel, output_path, out_format, quality, png_mode, preset=encoder_preset)
+            results.append({
+                'input': image_file,
+                'output': output_path,
+                'output_folder': panel_output_dir,
+                'position': f"第{i}格",
+                'box': list(box),
+                'size': f"{panel.width}x{panel.height}",
+                'file_size': os.path.getsize(output_path)
+            })
+            report(i, f"已完成第 {i}/{total} 格")
+
+    return results
+
+
+class GutterSplitThread(QThread):
+    """按分隔带分割线程（多张图片依次处理）"""
+    progress = Signal(int)
+    status = Signal(str)
+    finished = Signal(list)
+    error = Signal(str)
+    overwrite_request = Signal(str)
+
+    def __init__(
+        self,
+        image_files: List[str],
+        output_dir: Optional[str],
+        tolerance: int = DEFAULT_GUTTER_TOLERANCE,
+        min_gutter: int = DEFAULT_MIN_GUTTER,
+        quality: int = 95,
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET
+    ):
+        super().__init__()
+        self.image_files = image_files
+        # 为空时输出到每张图片所在的目录
+        self.output_dir = output_dir
+        self.tolerance = tolerance
+        self.min_gutter = min_gutter
+        self.quality = quality
+        self.output_format = output_format
+        self.png_mode = png_mode
+        self.encoder_preset = encoder_preset
+
+        self.mutex = QMutex()
+        self.wait_condition = QWaitCondition()
+        self.overwrite_allowed = True
+        self.waiting_for_response = False
+
+    def set_overwrite_allowed(self, allowed: bool) -> None:
+        """设置是否允许覆盖文件"""
+        self.mutex.lock()
+        self.overwrite_allowed = allowed
+        if self.waiting_for_response:
+            self.wait_condition.wakeAll()
+        self.mutex.unlock()
+
+    def confirm_overwrite(self, output_path: str) -> bool:
+        """请求界面确认是否覆盖，阻塞到用户回答"""
+        self.mutex.lock()
+        self.waiting_for_response = True
+        self.overwrite_request.emit(output_path)
+        self.wait_condition.wait(self.mutex)
+        self.waiting_for_response = False
+        allowed = self.overwrite_allowed
+        self.mutex.unlock()
+        return allowed
+
+    def run(self) -> None:
+        try:
+            results: List[Dict[str, Any]] = []
+            total = len(self.image_files)
+
+            for i, filepath in enumerate(self.image_files):
+                prefix = f"[{i+1}/{total}] " if total > 1 else ""
+
+                def on_progress(done: int, panels: int, text: str) -> None:
+                    fraction = done / panels if panels else 0
+                    self.status.emit(prefix + text)
+                    self.progress.emit(int((i + fraction) / total * 100))
+
+                results.extend(split_image_gutters(
+                    filepath,
+                    self.output_dir or os.path.dirname(filepath),
+                    self.tolerance,
+                    self.min_gutter,
+                    self.quality,
+                    self.output_format,
+                    self.png_mode,
+                    self.encoder_preset,
+                    confirm_overwrite=self.confirm_overwrite,
+                    progress_callback=on_progress
+                ))
+
+            self.progress.emit(100)
+            self.finished.emit(results)
+
+        except Exception as e:
+            logger.error(f"GutterSplitThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
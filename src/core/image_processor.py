@@ -4,50 +4,134 @@
 图片处理核心逻辑
 """
 
+import io
 import os
+import shutil
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Callable, Union
 from PIL import Image
 from PySide6.QtCore import QThread, Signal, QMutex, QWaitCondition
 
+from .quality_metrics import compute_ssim, find_quality_for_ssim
+from .jpeg_analyzer import estimate_jpeg_quality
+from .png_quantizer import quantize_image
+from .png_encoder import optimize_png, write_png_parallel, PARALLEL_PNG_MIN_PIXELS
+from .encoder_profiles import DEFAULT_ENCODER_PRESET, get_encoder_profile
+from .format_selector import AUTO_FORMAT, AUTO_TRIAL_MAX_PIXELS, choose_output_format
+from .resampling import (
+    DEFAULT_RESAMPLE, DEFAULT_FIT_MODE, apply_draft, resize_image, compute_geometry, scale_box
+)
+from .tile_analysis import DEFAULT_BLANK_THRESHOLD, blank_blocks, tile_hash, write_split_manifest
+from .raw_mapping import MappedImage, open_for_crop
+from .region_mask import Region, normalize_region, region_pixel_box, region_mask, apply_mask
+
 logger = logging.getLogger('ImageStitcher.image_processor')
 
+# PNG 输出模式："lossless" 真彩色无损；"palette" 量化为 256 色调色板；"palette_dither" 量化并使用有序抖动
+PNG_MODES = ('lossless', 'palette', 'palette_dither')
+
+# 去除透明度时使用的默认背景色
+DEFAULT_BACKGROUND = (255, 255, 255)
+
+
+def flatten_alpha(img: Image.Image, background: Tuple[int, int, int] = DEFAULT_BACKGROUND) -> Image.Image:
+    """将带透明度的图片合成到纯色背景上
+
+    alpha 全部为 255 时跳过合成，只去掉透明通道；否则以图片自身作为遮罩粘贴，
+    直接读取 RGBA 缓冲区中的 alpha，在一次 C 循环中完成混合，不再用 split() 复制全部通道。
+
+    Args:
+        img: PIL Image 对象
+        background: 背景色 (R, G, B)
+
+    Returns:
+        RGB 格式图片
+    """
+    if img.mode == 'RGB':
+        return img
+    if img.mode not in ('RGBA', 'LA'):
+        img = img.convert('RGBA')
+    if img.getchannel('A').getextrema()[0] == 255:
+        return img.convert('RGB')
+
+    result = Image.new('RGB', img.size, tuple(background[:3]))
+    result.paste(img, mask=img)
+    return result
+
 
-def convert_to_rgb(img: Image.Image) -> Image.Image:
+def convert_to_rgb(img: Image.Image, background: Tuple[int, int, int] = DEFAULT_BACKGROUND) -> Image.Image:
     """将图片转换为 RGB 格式
     
     Args:
         img: PIL Image 对象
+        background: 透明区域使用的背景色
         
     Returns:
         转换后的 RGB 格式图片
     """
-    if img.mode in ('RGBA', 'LA', 'P'):
-        bg = Image.new('RGB', img.size, (255, 255, 255))
-        if img.mode == 'P':
-            img = img.convert('RGBA')
-        if img.mode == 'RGBA':
-            bg.paste(img, mask=img.split()[3])
-        else:
-            bg.paste(img)
-        return bg
+    if img.mode in ('RGBA', 'LA', 'P', 'PA'):
+        return flatten_alpha(img, background)
     return img
 
 
+def fit_image(
+    img: Image.Image,
+    src_size: Tuple[int, int],
+    geometry: Dict[str, Any],
+    resample: str = DEFAULT_RESAMPLE,
+    background: Tuple[int, int, int] = DEFAULT_BACKGROUND
+) -> Image.Image:
+    """按 compute_geometry 的结果缩放图片
+
+    填充模式只缩放裁剪区域内的像素；补边模式把缩放结果居中放到画布上，
+    带透明度的图片以透明补边，其余以背景色补边。
+
+    Args:
+        img: PIL Image 对象（可以已调用过 draft()）
+        src_size: 计算几何参数时使用的原图尺寸
+        geometry: compute_geometry 的结果
+        resample: 缩放策略
+        background: 补边颜色
+
+    Returns:
+        尺寸为 geometry['canvas'] 的图片
+    """
+    box = scale_box(geometry['box'], src_size, img.size)
+    resized = resize_image(img, geometry['size'], resample, box)
+    if geometry['canvas'] == geometry['size']:
+        return resized
+
+    if resized.mode in ('RGBA', 'LA', 'PA') or 'transparency' in resized.info:
+        resized = resized.convert('RGBA')
+        canvas = Image.new('RGBA', geometry['canvas'], (0, 0, 0, 0))
+    elif resized.mode == 'L':
+        canvas = Image.new('L', geometry['canvas'], 255)
+    else:
+        resized = resized.convert('RGB')
+        canvas = Image.new('RGB', geometry['canvas'], tuple(background[:3]))
+    canvas.paste(resized, geometry['offset'])
+    return canvas
+
+
 def get_output_format(original_format: Optional[str], output_format: Optional[str]) -> str:
     """确定输出格式
     
     Args:
         original_format: 原始格式
-        output_format: 指定的输出格式
+        output_format: 指定的输出格式（AUTO 表示保存前按内容自动选择）
         
     Returns:
         最终的输出格式
     """
     if original_format == 'JPG':
         original_format = 'JPEG'
-    return output_format or original_format or 'JPEG'
+    # 其他格式（BMP、MPO 等）一律按 JPEG 输出，与 get_file_extension 的默认扩展名保持一致
+    if original_format not in ('JPEG', 'PNG', 'WEBP'):
+        original_format = 'JPEG'
+    return output_format or original_format
 
 
 def get_file_extension(format_name: str) -> str:
@@ -67,6 +151,151 @@ def get_file_extension(format_name: str) -> str:
     return ext_map.get(format_name, '.jpg')
 
 
+def unique_output_stems(image_files: List[str]) -> List[str]:
+    """为一批输入文件生成互不重复的输出文件名前缀
+
+    文件名（不含扩展名）与其他输入重复时（如 photo.jpg 与 photo.png、a/x.jpg 与 b/x.jpg），
+    先加上源文件扩展名区分，仍然重复时再加序号；不重复的文件保持原文件名。
+
+    Args:
+        image_files: 输入文件路径列表
+
+    Returns:
+        与输入一一对应的文件名前缀
+    """
+    names = [os.path.splitext(os.path.basename(path)) for path in image_files]
+    counts: Dict[str, int] = {}
+    for stem, _ in names:
+        counts[stem.lower()] = counts.get(stem.lower(), 0) + 1
+
+    stems: List[str] = []
+    # 按小写比较，避免在不区分大小写的文件系统上互相覆盖
+    used = {stem.lower() for stem, _ in names if counts[stem.lower()] == 1}
+    for stem, ext in names:
+        if counts[stem.lower()] == 1:
+            stems.append(stem)
+            continue
+        base = f"{stem}_{ext[1:].lower()}" if ext else stem
+        candidate, index = base, 2
+        while candidate.lower() in used:
+            candidate = f"{base}_{index}"
+            index += 1
+        used.add(candidate.lower())
+        stems.append(candidate)
+    return stems
+
+
+def prepare_png(img: Image.Image, png_mode: str = 'lossless') -> Image.Image:
+    """按 PNG 输出模式预处理图片（调色板模式下进行量化）
+
+    Args:
+        img: PIL Image 对象
+        png_mode: PNG 输出模式，见 PNG_MODES
+
+    Returns:
+        待写出的图片
+    """
+    if png_mode == 'lossless':
+        return img
+    return quantize_image(img, dither=png_mode == 'palette_dither')
+
+
+def save_image(
+    img: Image.Image,
+    output: Any,
+    out_format: str,
+    quality: int,
+    png_mode: str = 'lossless',
+    png_effort: int = 0,
+    preset: str = DEFAULT_ENCODER_PRESET
+) -> None:
+    """按输出格式保存图片
+
+    Args:
+        img: PIL Image 对象
+        output: 输出文件路径或可写的文件对象
+        out_format: 输出格式
+        quality: 输出质量
+        png_mode: PNG 输出模式，见 PNG_MODES
+        png_effort: PNG 无损优化力度，0 表示使用编码档位的默认设置
+        preset: 编码档位，见 encoder_profiles.ENCODER_PRESETS
+    """
+    profile = get_encoder_profile(preset)
+    options = profile.save_options(out_format, quality)
+    if out_format == 'JPEG':
+        img = convert_to_rgb(img)
+        img.save(output, 'JPEG', **options)
+    elif out_format == 'PNG':
+        img = prepare_png(img, png_mode)
+        png_effort = png_effort or profile.png_effort
+        if png_effort:
+            data, _ = optimize_png(img, png_effort)
+            write_bytes(output, data)
+        else:
+            img.save(output, 'PNG', **options)
+    else:
+        img.save(output, out_format, **options)
+
+
+def write_bytes(output: Any, data: bytes) -> None:
+    """将已编码的字节写入文件路径或可写的文件对象"""
+    if hasattr(output, 'write'):
+        output.write(data)
+    else:
+        with open(output, 'wb') as f:
+            f.write(data)
+
+
+def encode_image(
+    img: Image.Image,
+    out_format: str,
+    quality: int,
+    png_mode: str = 'lossless',
+    png_effort: int = 0,
+    preset: str = DEFAULT_ENCODER_PRESET
+) -> bytes:
+    """在内存中编码图片
+
+    Args:
+        img: PIL Image 对象
+        out_format: 输出格式
+        quality: 输出质量
+        png_mode: PNG 输出模式，见 PNG_MODES
+        png_effort: PNG 无损优化力度
+        preset: 编码档位
+
+    Returns:
+        编码后的字节
+    """
+    buffer = io.BytesIO()
+    save_image(img, buffer, out_format, quality, png_mode, png_effort, preset)
+    return buffer.getvalue()
+
+
+def choose_auto_format(
+    img: Image.Image,
+    quality: int,
+    preset: str = DEFAULT_ENCODER_PRESET,
+    max_trial_pixels: Optional[int] = AUTO_TRIAL_MAX_PIXELS
+) -> Dict[str, Any]:
+    """为 AUTO 输出格式选择实际格式
+
+    Args:
+        img: PIL Image 对象
+        quality: JPEG/WEBP 试编码使用的质量
+        preset: 编码档位
+        max_trial_pixels: 超过该像素数时在代理图上试编码，None 表示总是使用原图
+
+    Returns:
+        format_selector.choose_output_format 的结果（format、png_mode、data 等）
+    """
+    return choose_output_format(
+        img,
+        lambda im, fmt, png_mode: encode_image(im, fmt, quality, png_mode, preset=preset),
+        max_trial_pixels=max_trial_pixels
+    )
+
+
 class ResizeThread(QThread):
     """尺寸统一线程"""
     progress = Signal(int)
@@ -81,7 +310,12 @@ class ResizeThread(QThread):
         output_dir: str,
         resize_mode: str = "max",
         quality: int = 95,
-        output_format: Optional[str] = None
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        resample: str = DEFAULT_RESAMPLE,
+        fit_mode: str = DEFAULT_FIT_MODE,
+        container: str = 'files'
     ):
         super().__init__()
         self.image_files = image_files
@@ -89,6 +323,14 @@ class ResizeThread(QThread):
         self.resize_mode = resize_mode
         self.quality = quality
         self.output_format = output_format
+        self.png_mode = png_mode
+        self.encoder_preset = encoder_preset
+        # 缩放策略，见 resampling.RESAMPLE_POLICIES
+        self.resample = resample
+        # 缩放到目标尺寸的方式，见 resampling.FIT_MODES
+        self.fit_mode = fit_mode
+        # 输出方式，见 tensor_shards.OUTPUT_CONTAINERS
+        self.container = container
         self.target_width: Optional[int] = None
         self.target_height: Optional[int] = None
         
@@ -135,18 +377,37 @@ class ResizeThread(QThread):
                 target_width = self.target_width or 800
                 target_height = self.target_height or 600
             
+            # 按文件头中的尺寸预先算好每张图片的裁剪区域与输出尺寸
+            for info in images_info:
+                info['geometry'] = compute_geometry(
+                    (info['width'], info['height']), (target_width, target_height), self.fit_mode
+                )
+            
             self.progress.emit(10)
             
+            if self.container == 'npy':
+                self.finished.emit(self._write_shards(images_info, (target_width, target_height)))
+                return
+            
             for i, info in enumerate(images_info):
                 self.status.emit(f"处理 {i+1}/{total}: {os.path.basename(info['path'])}")
                 
                 with Image.open(info['path']) as img:
                     original_size = os.path.getsize(info['path'])
+                    geometry = info['geometry']
                     
-                    img_resized = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+                    apply_draft(img, geometry['size'], self.resample)
+                    img_resized = fit_image(
+                        img, (info['width'], info['height']), geometry, self.resample
+                    )
                     
                     original_format = img.format or os.path.splitext(info['path'])[1][1:].upper()
                     out_format = get_output_format(original_format, self.output_format)
+                    png_mode = self.png_mode
+                    data = None
+                    if out_format == AUTO_FORMAT:
+                        choice = choose_auto_format(img_resized, self.quality, self.encoder_preset)
+                        out_format, png_mode, data = choice['format'], choice['png_mode'], choice['data']
                     
                     filename = os.path.basename(info['path'])
                     name, _ = os.path.splitext(filename)
@@ -164,22 +425,17 @@ class ResizeThread(QThread):
                         if not self.overwrite_allowed:
                             continue
                     
-                    if out_format == 'JPEG':
-                        img_resized = convert_to_rgb(img_resized)
-                        img_resized.save(output_path, 'JPEG', quality=self.quality, optimize=True)
-                    elif out_format == 'PNG':
-                        img_resized.save(output_path, 'PNG', optimize=True)
-                    elif out_format == 'WEBP':
-                        img_resized.save(output_path, 'WEBP', quality=self.quality)
+                    if data is not None:
+                        write_bytes(output_path, data)
                     else:
-                        img_resized.save(output_path, quality=self.quality)
+                        save_image(img_resized, output_path, out_format, self.quality, png_mode, preset=self.encoder_preset)
                     
                     new_size = os.path.getsize(output_path)
                     results.append({
                         'input': info['path'],
                         'output': output_path,
                         'original_size': f"{info['width']}x{info['height']}",
-                        'new_size': f"{target_width}x{target_height}",
+                        'new_size': f"{img_resized.width}x{img_resized.height}",
                         'file_size': new_size
                     })
                     
@@ -191,6 +447,123 @@ class ResizeThread(QThread):
             logger.error(f"ResizeThread error: {e}", exc_info=True)
             self.error.emit(str(e))
 
+    def _write_shards(self, images_info: List[Dict[str, Any]], target_size: Tuple[int, int]) -> List[Dict[str, Any]]:
+        """把缩放结果写入 (N, H, W, C) 的 .npy 分片，返回每张图片的结果"""
+        from .tensor_shards import TensorShardWriter, choose_channels, source_mode, to_channels
+
+        sizes = {info['geometry']['canvas'] for info in images_info}
+        if len(sizes) > 1:
+            raise ValueError("NumPy 数组要求所有输出尺寸一致，请使用补边、填充裁剪或拉伸方式")
+        width, height = sizes.pop()
+
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        folder = os.path.join(self.output_dir, f"resized_{width}x{height}_npy_{timestamp}")
+        if os.path.exists(os.path.join(folder, 'index.json')):
+            self.mutex.lock()
+            self.waiting_for_response = True
+            self.overwrite_request.emit(folder)
+            self.wait_condition.wait(self.mutex)
+            self.waiting_for_response = False
+            self.mutex.unlock()
+            if not self.overwrite_allowed:
+                return []
+
+        modes = []
+        for info in images_info:
+            with Image.open(info['path']) as img:
+                modes.append(source_mode(img))
+        channels = choose_channels(modes)
+        writer = TensorShardWriter(folder, 'resized', len(images_info), (height, width), channels)
+        total = len(images_info)
+        for i, info in enumerate(images_info):
+            self.status.emit(f"处理 {i+1}/{total}: {os.path.basename(info['path'])}")
+            with Image.open(info['path']) as img:
+                geometry = info['geometry']
+                apply_draft(img, geometry['size'], self.resample)
+                img_resized = fit_image(img, (info['width'], info['height']), geometry, self.resample)
+                writer.add(to_channels(img_resized, channels), {
+                    'source': info['path'],
+                    'original_width': info['width'],
+                    'original_height': info['height']
+                })
+            self.progress.emit(10 + int((i + 1) / total * 89))
+
+        paths = writer.close({
+            'target_size': list(target_size),
+            'fit_mode': self.fit_mode,
+            'resample': self.resample
+        }, ['original_width', 'original_height'])
+
+        return [{
+            'input': info['path'],
+            'output': os.path.join(folder, entry['shard']),
+            'output_folder': folder,
+            'index': paths['json'],
+            'original_size': f"{info['width']}x{info['height']}",
+            'new_size': f"{width}x{height}",
+            'file_size': 0
+        } for info, entry in zip(images_info, writer.entries)]
+
+
+def larger_file_action(
+    encoded_size: int,
+    original_size: int,
+    larger_policy: str,
+    scale: int,
+    source_format: str,
+    out_format: str
+) -> str:
+    """根据编码后体积决定压缩输出方式（CompressThread 与预估共用）
+
+    Args:
+        encoded_size: 编码后（或估算）的字节数
+        original_size: 原文件字节数
+        larger_policy: 编码结果不小于原文件时的处理方式，"keep" / "copy" / "skip"
+        scale: 缩放比例
+        source_format: 源格式
+        out_format: 实际输出格式
+
+    Returns:
+        "encoded" 写入编码结果，"copied" 原样复制原文件，"skipped" 跳过该文件
+    """
+    if encoded_size < original_size or larger_policy == "keep":
+        return 'encoded'
+    if larger_policy == "skip":
+        return 'skipped'
+    # 缩放或格式转换后无法用原文件代替，只能保留编码结果
+    if scale >= 100 and source_format == out_format:
+        return 'copied'
+    return 'encoded'
+
+
+def low_quality_jpeg_rule(
+    source_quality: Optional[int],
+    quality: int,
+    out_format: str,
+    scale: int,
+    larger_policy: str,
+    enabled: bool = True
+) -> Tuple[Optional[str], int]:
+    """源 JPEG 质量已不高于目标质量时的处理（CompressThread 与预估共用）
+
+    Args:
+        source_quality: 由量化表估算的源 JPEG 质量，非 JPEG 为 None
+        quality: 目标输出质量
+        out_format: 输出格式
+        scale: 缩放比例
+        larger_policy: 编码结果不小于原文件时的处理方式，"keep" / "copy" / "skip"
+        enabled: 是否启用低质量源检测
+
+    Returns:
+        (action, max_quality)：不缩放且 larger_policy 不为 "keep" 时 action 为 "copied" / "skipped"，
+        无需解码和重新编码；否则 action 为 None，max_quality 为编码质量上限（低质量源不超过源质量）
+    """
+    if not (enabled and out_format == 'JPEG' and source_quality is not None and source_quality <= quality):
+        return None, quality
+    if scale >= 100 and larger_policy != "keep":
+        return ('skipped' if larger_policy == "skip" else 'copied'), quality
+    return None, source_quality
+
 
 class CompressThread(QThread):
     """图片压缩线程"""
@@ -206,7 +579,14 @@ class CompressThread(QThread):
         output_dir: str,
         scale: int = 80,
         quality: int = 80,
-        output_format: Optional[str] = None
+        output_format: Optional[str] = None,
+        target_ssim: Optional[float] = None,
+        larger_policy: str = "copy",
+        skip_low_quality_jpeg: bool = True,
+        png_mode: str = 'lossless',
+        png_effort: int = 0,
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        resample: str = DEFAULT_RESAMPLE
     ):
         super().__init__()
         self.image_files = image_files
@@ -214,6 +594,19 @@ class CompressThread(QThread):
         self.scale = scale
         self.quality = quality
         self.output_format = output_format
+        # 设置后对 JPEG/WEBP 输出按目标 SSIM 搜索最低质量，quality 作为质量上限
+        self.target_ssim = target_ssim
+        # 重新编码后体积不小于原文件时的处理方式：
+        # "keep" 仍然输出编码结果；"copy" 原样复制原文件（仅在未缩放且格式不变时）；"skip" 跳过该文件
+        self.larger_policy = larger_policy
+        # 源 JPEG 的估算质量不高于 quality 时，不再以更高质量重新编码：
+        # 未缩放时直接按 larger_policy 复制或跳过（"keep" 时仍以源质量重新编码），缩放时把输出质量限制在源质量以内
+        self.skip_low_quality_jpeg = skip_low_quality_jpeg
+        self.png_mode = png_mode
+        # PNG 无损优化力度（0-3），大于 0 时并行尝试多种过滤方式与压缩策略并保留最小结果
+        self.png_effort = png_effort
+        self.encoder_preset = encoder_preset
+        self.resample = resample
         
         self.mutex = QMutex()
         self.wait_condition = QWaitCondition()
@@ -232,20 +625,80 @@ class CompressThread(QThread):
         try:
             results: List[Dict[str, Any]] = []
             total = len(self.image_files)
+            png_effort = self.png_effort or get_encoder_profile(self.encoder_preset).png_effort
             
             for i, filepath in enumerate(self.image_files):
                 self.status.emit(f"正在处理 {i+1}/{total}: {os.path.basename(filepath)}")
                 
                 with Image.open(filepath) as img:
                     original_size = os.path.getsize(filepath)
-                    
-                    if self.scale < 100:
-                        new_width = int(img.width * self.scale / 100)
-                        new_height = int(img.height * self.scale / 100)
-                        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    
                     original_format = img.format or os.path.splitext(filepath)[1][1:].upper()
+                    if original_format == 'JPG':
+                        original_format = 'JPEG'
                     out_format = get_output_format(original_format, self.output_format)
+                    source_quality = estimate_jpeg_quality(filepath) if original_format == 'JPEG' else None
+                    
+                    low_quality_action, max_quality = low_quality_jpeg_rule(
+                        source_quality, self.quality, out_format, self.scale,
+                        self.larger_policy, self.skip_low_quality_jpeg
+                    )
+                    
+                    if low_quality_action:
+                        # 源文件质量已不高于目标质量，按 larger_policy 复制或跳过，无需解码和重新编码
+                        data = None
+                        quality = None
+                        ssim = None
+                        png_saved = 0
+                        action = low_quality_action
+                    else:
+                        png_saved = 0
+                        
+                        if self.scale < 100:
+                            new_width = int(img.width * self.scale / 100)
+                            new_height = int(img.height * self.scale / 100)
+                            apply_draft(img, (new_width, new_height), self.resample)
+                            img = resize_image(img, (new_width, new_height), self.resample)
+                        
+                        if self.target_ssim and out_format in ('JPEG', 'WEBP'):
+                            quality, data, ssim = find_quality_for_ssim(
+                                img,
+                                lambda im, q: encode_image(im, out_format, q, preset=self.encoder_preset),
+                                self.target_ssim,
+                                max_quality=max_quality
+                            )
+                        elif out_format == 'PNG' and png_effort:
+                            quality = max_quality
+                            data, png_report = optimize_png(prepare_png(img, self.png_mode), png_effort)
+                            png_saved = png_report['saved']
+                            ssim = compute_ssim(img, data)
+                        elif out_format == AUTO_FORMAT:
+                            quality = max_quality
+                            choice = choose_auto_format(img, quality, self.encoder_preset, max_trial_pixels=None)
+                            out_format, data = choice['format'], choice['data']
+                            ssim = compute_ssim(img, data)
+                        else:
+                            quality = max_quality
+                            data = encode_image(img, out_format, quality, self.png_mode, preset=self.encoder_preset)
+                            ssim = compute_ssim(img, data)
+                        
+                        action = self._choose_action(len(data), original_size, original_format, out_format)
+                    
+                    if action == 'skipped':
+                        logger.info(f"Skipped {filepath}: re-encoding would not help")
+                        results.append({
+                            'input': filepath,
+                            'output': None,
+                            'original_size': original_size,
+                            'new_size': original_size,
+                            'ratio': 0,
+                            'ssim': None,
+                            'quality': None,
+                            'source_quality': source_quality,
+                            'png_saved': 0,
+                            'action': action
+                        })
+                        self.progress.emit(int((i + 1) / total * 100))
+                        continue
                     
                     filename = os.path.basename(filepath)
                     name, _ = os.path.splitext(filename)
@@ -263,23 +716,28 @@ class CompressThread(QThread):
                         if not self.overwrite_allowed:
                             continue
                     
-                    if out_format == 'JPEG':
-                        img = convert_to_rgb(img)
-                        img.save(output_path, 'JPEG', quality=self.quality, optimize=True)
-                    elif out_format == 'PNG':
-                        img.save(output_path, 'PNG', optimize=True)
-                    elif out_format == 'WEBP':
-                        img.save(output_path, 'WEBP', quality=self.quality)
+                    if action == 'copied':
+                        shutil.copyfile(filepath, output_path)
+                        new_size = original_size
+                        quality = None
+                        ssim = 1.0
+                        png_saved = 0
                     else:
-                        img.save(output_path, quality=self.quality)
+                        with open(output_path, 'wb') as f:
+                            f.write(data)
+                        new_size = len(data)
                     
-                    new_size = os.path.getsize(output_path)
                     results.append({
                         'input': filepath,
                         'output': output_path,
                         'original_size': original_size,
                         'new_size': new_size,
-                        'ratio': (1 - new_size / original_size) * 100 if original_size > 0 else 0
+                        'ratio': (1 - new_size / original_size) * 100 if original_size > 0 else 0,
+                        'ssim': ssim,
+                        'quality': quality,
+                        'source_quality': source_quality,
+                        'png_saved': png_saved,
+                        'action': action
                     })
                     
                     self.progress.emit(int((i + 1) / total * 100))
@@ -290,6 +748,10 @@ class CompressThread(QThread):
             logger.error(f"CompressThread error: {e}", exc_info=True)
             self.error.emit(str(e))
 
+    def _choose_action(self, encoded_size: int, original_size: int, source_format: str, out_format: str) -> str:
+        """根据编码后体积决定输出方式，见 larger_file_action"""
+        return larger_file_action(encoded_size, original_size, self.larger_policy, self.scale, source_format, out_format)
+
 
 class StitchThread(QThread):
     """图片拼接线程"""
@@ -307,7 +769,10 @@ class StitchThread(QThread):
         output_dir: Optional[str] = None,
         output_name: Optional[str] = None,
         is_horizontal: bool = True,
-        align_mode: str = "center"
+        align_mode: str = "center",
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        output_format: Optional[str] = None
     ):
         super().__init__()
         self.image_files = image_files
@@ -317,6 +782,10 @@ class StitchThread(QThread):
         self.output_name = output_name
         self.is_horizontal = is_horizontal
         self.align_mode = align_mode
+        self.png_mode = png_mode
+        self.encoder_preset = encoder_preset
+        # None 按输入格式决定（全部为同一格式时沿用，否则 JPEG）；AUTO 按拼接结果的内容自动选择
+        self.output_format = output_format
         
         self.mutex = QMutex()
         self.wait_condition = QWaitCondition()
@@ -346,11 +815,19 @@ class StitchThread(QThread):
             self.progress.emit(30)
             self.status.emit("正在计算尺寸...")
 
-            if len(formats) > 1:
+            if self.output_format == AUTO_FORMAT:
+                output_format = AUTO_FORMAT
+                has_transparency = any(
+                    img.mode in ('RGBA', 'LA') or
+                    (img.mode == 'P' and 'transparency' in img.info)
+                    for img in images
+                )
+            elif len(formats) > 1:
                 output_format = "JPEG"
                 has_transparency = False
             else:
-                output_format = list(formats)[0]
+                # BMP 等格式与 get_file_extension 一样按 JPEG 输出，保证扩展名与内容一致
+                output_format = get_output_format(list(formats)[0], None)
                 has_transparency = any(
                     img.mode in ('RGBA', 'LA') or
                     (img.mode == 'P' and 'transparency' in img.info)
@@ -362,10 +839,10 @@ class StitchThread(QThread):
             self.progress.emit(50)
             self.status.emit("正在拼接图片...")
 
-            if has_transparency and output_format == "PNG":
+            if has_transparency and output_format in ("PNG", AUTO_FORMAT):
                 result = Image.new('RGBA', canvas_size, (0, 0, 0, 0))
             else:
-                result = Image.new('RGB', canvas_size, (255, 255, 255))
+                result = Image.new('RGB', canvas_size, DEFAULT_BACKGROUND)
 
             self._stitch_images(images, result, canvas_size)
 
@@ -463,15 +940,8 @@ class StitchThread(QThread):
                 new_height = int(target_width * aspect_ratio)
                 img = img.resize((target_width, new_height), Image.Resampling.LANCZOS)
 
-            if result.mode == 'RGB' and img.mode in ('RGBA', 'LA', 'P'):
-                if img.mode == 'P' and 'transparency' in img.info:
-                    img = img.convert('RGBA')
-                bg = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'RGBA':
-                    bg.paste(img, mask=img.split()[3])
-                else:
-                    bg.paste(img)
-                img = bg
+            if result.mode == 'RGB' and img.mode in ('RGBA', 'LA', 'P', 'PA'):
+                img = flatten_alpha(img)
             elif result.mode == 'RGBA' and img.mode == 'RGB':
                 img = img.convert('RGBA')
 
@@ -516,7 +986,13 @@ class StitchThread(QThread):
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
             self.output_name = f"{first_name}_stitched_{timestamp}"
 
-        ext = ".png" if output_format == "PNG" else ".jpg"
+        png_mode = self.png_mode
+        data = None
+        if output_format == AUTO_FORMAT:
+            self.status.emit("正在选择输出格式...")
+            choice = choose_auto_format(result, 95, self.encoder_preset)
+            output_format, png_mode, data = choice['format'], choice['png_mode'], choice['data']
+        ext = get_file_extension(output_format)
         output_path = os.path.join(self.output_dir, self.output_name + ext)
 
         if os.path.exists(output_path):
@@ -529,15 +1005,228 @@ class StitchThread(QThread):
             if not self.overwrite_allowed:
                 return None
 
-        if output_format == "JPEG":
-            result = result.convert('RGB')
-            result.save(output_path, "JPEG", quality=95)
+        if data is not None:
+            write_bytes(output_path, data)
+        elif output_format == "JPEG":
+            save_image(result.convert('RGB'), output_path, "JPEG", 95, preset=self.encoder_preset)
+        elif output_format == "PNG":
+            result = prepare_png(result, png_mode)
+            profile = get_encoder_profile(self.encoder_preset)
+            # 拼接结果此前按 Pillow 默认参数保存（压缩级别 6、不 optimize），各档位只改变压缩级别，
+            # 极致档位仍使用无损优化器
+            level = profile.png_compress_level
+            # 大图的 deflate 按行分块多线程进行，耗时随核心数缩短
+            large = result.width * result.height >= PARALLEL_PNG_MIN_PIXELS
+            if not (large and write_png_parallel(result, output_path, level=level)):
+                if profile.png_effort:
+                    save_image(result, output_path, "PNG", 95, preset=self.encoder_preset)
+                else:
+                    result.save(output_path, "PNG", compress_level=level)
         else:
-            result.save(output_path, output_format)
+            save_image(result, output_path, output_format, 95, preset=self.encoder_preset)
 
         return output_path
 
 
+def _prepare_crop_source(
+    img: Union[Image.Image, MappedImage],
+    image_file: str,
+    quality: int,
+    output_format: Optional[str],
+    png_mode: str,
+    encoder_preset: str,
+    on_auto: Optional[Callable[[], None]] = None
+) -> Tuple[str, str, Union[Image.Image, MappedImage]]:
+    """确定分块的输出格式，返回 (输出格式, PNG 模式, 用于裁剪的图片)
+
+    所有分块使用同一格式，自动格式只按整张图片选择一次（内存映射的图片按采样缩略图选择）。
+    输出 JPEG 时整张图片只去除一次透明度；内存映射的图片保持不变，由 save_image 逐块转换。
+    """
+    original_format = img.format or os.path.splitext(image_file)[1][1:].upper()
+    out_format = get_output_format(original_format, output_format)
+    if out_format == AUTO_FORMAT:
+        if on_auto:
+            on_auto()
+        sample = img.proxy() if isinstance(img, MappedImage) else img
+        choice = choose_auto_format(sample, quality, encoder_preset)
+        out_format, png_mode = choice['format'], choice['png_mode']
+    if out_format == 'JPEG' and not isinstance(img, MappedImage):
+        img = convert_to_rgb(img)
+    return out_format, png_mode, img
+
+
+def split_image_grid(
+    image_file: str,
+    output_dir: str,
+    x_splits: int = 2,
+    y_splits: int = 2,
+    quality: int = 95,
+    output_format: Optional[str] = None,
+    png_mode: str = 'lossless',
+    encoder_preset: str = DEFAULT_ENCODER_PRESET,
+    skip_blank: bool = False,
+    blank_threshold: float = DEFAULT_BLANK_THRESHOLD,
+    dedupe: bool = False,
+    confirm_overwrite: Optional[Callable[[str], bool]] = None,
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    output_name: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """将一张图片等分为 x_splits x y_splits 块，保存到 {name}_split_{x}x{y} 文件夹
+
+    开启 skip_blank 或 dedupe 时，空白块不写出、与前面的块像素完全相同的块只写出一次，
+    并在文件夹中写出 manifest.json，记录每个位置对应的文件（重复块指向第一次出现的文件）。
+
+    Args:
+        image_file: 图片路径
+        output_dir: 输出目录
+        x_splits: 宽度等分数
+        y_splits: 高度等分数
+        quality: 输出质量
+        output_format: 输出格式
+        png_mode: PNG 输出模式
+        encoder_preset: 编码档位
+        skip_blank: 是否跳过空白块
+        blank_threshold: 空白判定阈值（各通道标准差）
+        dedupe: 是否合并重复块
+        confirm_overwrite: 输出文件已存在时调用，返回是否覆盖；None 表示直接覆盖
+        progress_callback: 进度回调，参数为 (已处理块数, 总块数, 状态文字)
+        output_name: 输出文件夹与分块文件名的前缀，默认为原文件名（批量时见 unique_output_stems）
+
+    Returns:
+        每个分块的结果列表；跳过的空白块与重复块带有 status 字段，output 为对应的文件（空白块为 None）
+    """
+    def report(done: int, text: str) -> None:
+        if progress_callback:
+            progress_callback(done, total_blocks, text)
+
+    total_blocks = x_splits * y_splits
+    results: List[Dict[str, Any]] = []
+
+    # 未压缩的 BMP/TIFF/PPM 以内存映射方式读取，每块只读取自身覆盖的像素
+    with open_for_crop(image_file) as img:
+        original_width = img.width
+        original_height = img.height
+
+        block_width = original_width // x_splits
+        block_height = original_height // y_splits
+
+        report(0, f"开始等分 {x_splits}x{y_splits} = {total_blocks} 块...")
+
+        out_format, png_mode, img = _prepare_crop_source(
+            img, image_file, quality, output_format, png_mode, encoder_preset,
+            lambda: report(0, "正在选择输出格式...")
+        )
+
+        name = output_name or os.path.splitext(os.path.basename(image_file))[0]
+
+        split_folder_name = f"{name}_split_{x_splits}x{y_splits}"
+        split_output_dir = os.path.join(output_dir, split_folder_name)
+        os.makedirs(split_output_dir, exist_ok=True)
+
+        blanks = None
+        if skip_blank:
+            report(0, "正在检测空白块...")
+            blanks = blank_blocks(
+                img,
+                [x * block_width for x in range(x_splits)],
+                [y * block_height for y in range(y_splits)],
+                blank_threshold
+            )
+        # 像素哈希 -> 第一次出现该内容的文件
+        canonical: Dict[str, str] = {}
+        manifest: List[Dict[str, Any]] = []
+
+        for y in range(y_splits):
+            for x in range(x_splits):
+                block_index = y * x_splits + x + 1
+                report(block_index - 1, f"处理第 {block_index}/{total_blocks} 块...")
+
+                left = x * block_width
+                top = y * block_height
+                right = left + block_width
+                bottom = top + block_height
+
+                if x == x_splits - 1:
+                    right = original_width
+                if y == y_splits - 1:
+                    bottom = original_height
+
+                entry = {
+                    'row': y + 1,
+                    'col': x + 1,
+                    'x': left,
+                    'y': top,
+                    'width': right - left,
+                    'height': bottom - top
+                }
+                manifest.append(entry)
+                position = f"第{y+1}行第{x+1}列"
+
+                if blanks is not None and blanks[y][x] is not None:
+                    entry.update(status='blank', file=None, color=blanks[y][x])
+                    results.append({
+                        'input': image_file,
+                        'output': None,
+                        'output_folder': split_output_dir,
+                        'position': position,
+                        'status': 'blank'
+                    })
+                    report(block_index, f"跳过空白块 {block_index}/{total_blocks}")
+                    continue
+
+                cropped_img = img.crop((left, top, right, bottom))
+
+                digest = tile_hash(cropped_img) if dedupe else None
+                if digest in canonical:
+                    entry.update(status='duplicate', file=canonical[digest])
+                    results.append({
+                        'input': image_file,
+                        'output': os.path.join(split_output_dir, canonical[digest]),
+                        'output_folder': split_output_dir,
+                        'position': position,
+                        'status': 'duplicate'
+                    })
+                    report(block_index, f"跳过重复块 {block_index}/{total_blocks}")
+                    continue
+
+                ext = get_file_extension(out_format)
+                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+                output_filename = f"{name}_split_{timestamp}_{y+1}_{x+1}{ext}"
+                output_path = os.path.join(split_output_dir, output_filename)
+                if digest is not None:
+                    canonical[digest] = output_filename
+
+                if os.path.exists(output_path) and confirm_overwrite and not confirm_overwrite(output_path):
+                    # 保留已有文件，后续的重复块仍然指向它
+                    entry.update(status='skipped', file=output_filename)
+                    report(block_index, f"跳过第 {block_index}/{total_blocks} 块")
+                    continue
+
+                save_image(cropped_img, output_path, out_format, quality, png_mode, preset=encoder_preset)
+                entry.update(status='written', file=output_filename)
+
+                results.append({
+                    'input': image_file,
+                    'output': output_path,
+                    'output_folder': split_output_dir,
+                    'position': position,
+                    'size': f"{cropped_img.width}x{cropped_img.height}",
+                    'file_size': os.path.getsize(output_path)
+                })
+                report(block_index, f"已完成第 {block_index}/{total_blocks} 块")
+
+        if skip_blank or dedupe:
+            write_split_manifest(split_output_dir, manifest, {
+                'source': image_file,
+                'grid': [x_splits, y_splits],
+                'skip_blank': skip_blank,
+                'blank_threshold': blank_threshold,
+                'dedupe': dedupe
+            })
+
+    return results
+
+
 class GridSplitThread(QThread):
     """图片等分线程"""
     progress = Signal(int)
@@ -553,7 +1242,12 @@ class GridSplitThread(QThread):
         x_splits: int = 2,
         y_splits: int = 2,
         quality: int = 95,
-        output_format: Optional[str] = None
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        skip_blank: bool = False,
+        blank_threshold: float = DEFAULT_BLANK_THRESHOLD,
+        dedupe: bool = False
     ):
         super().__init__()
         self.image_file = image_file
@@ -562,6 +1256,12 @@ class GridSplitThread(QThread):
         self.y_splits = y_splits
         self.quality = quality
         self.output_format = output_format
+        self.png_mode = png_mode
+        self.encoder_preset = encoder_preset
+        # 跳过空白块、合并重复块，见 tile_analysis
+        self.skip_blank = skip_blank
+        self.blank_threshold = blank_threshold
+        self.dedupe = dedupe
         
         self.mutex = QMutex()
         self.wait_condition = QWaitCondition()
@@ -576,89 +1276,33 @@ class GridSplitThread(QThread):
             self.wait_condition.wakeAll()
         self.mutex.unlock()
 
+    def confirm_overwrite(self, output_path: str) -> bool:
+        """请求界面确认是否覆盖，阻塞到用户回答"""
+        self.mutex.lock()
+        self.waiting_for_response = True
+        self.overwrite_request.emit(output_path)
+        self.wait_condition.wait(self.mutex)
+        self.waiting_for_response = False
+        allowed = self.overwrite_allowed
+        self.mutex.unlock()
+        return allowed
+
     def run(self) -> None:
         try:
             self.status.emit("正在加载图片...")
             self.progress.emit(10)
-            
-            with Image.open(self.image_file) as img:
-                original_width = img.width
-                original_height = img.height
-                
-                block_width = original_width // self.x_splits
-                block_height = original_height // self.y_splits
-                
-                self.status.emit(f"开始等分 {self.x_splits}x{self.y_splits} = {self.x_splits * self.y_splits} 块...")
-                self.progress.emit(20)
-                
-                results: List[Dict[str, Any]] = []
-                total_blocks = self.x_splits * self.y_splits
-                
-                original_format = img.format or os.path.splitext(self.image_file)[1][1:].upper()
-                out_format = get_output_format(original_format, self.output_format)
-                
-                filename = os.path.basename(self.image_file)
-                name, _ = os.path.splitext(filename)
-                
-                split_folder_name = f"{name}_split_{self.x_splits}x{self.y_splits}"
-                split_output_dir = os.path.join(self.output_dir, split_folder_name)
-                
-                if not os.path.exists(split_output_dir):
-                    os.makedirs(split_output_dir)
-                
-                for y in range(self.y_splits):
-                    for x in range(self.x_splits):
-                        block_index = y * self.x_splits + x + 1
-                        self.status.emit(f"处理第 {block_index}/{total_blocks} 块...")
-                        
-                        left = x * block_width
-                        top = y * block_height
-                        right = left + block_width
-                        bottom = top + block_height
-                        
-                        if x == self.x_splits - 1:
-                            right = original_width
-                        if y == self.y_splits - 1:
-                            bottom = original_height
-                        
-                        cropped_img = img.crop((left, top, right, bottom))
-                        
-                        ext = get_file_extension(out_format)
-                        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                        output_filename = f"{name}_split_{timestamp}_{y+1}_{x+1}{ext}"
-                        output_path = os.path.join(split_output_dir, output_filename)
-                        
-                        if os.path.exists(output_path):
-                            self.mutex.lock()
-                            self.waiting_for_response = True
-                            self.overwrite_request.emit(output_path)
-                            self.wait_condition.wait(self.mutex)
-                            self.waiting_for_response = False
-                            self.mutex.unlock()
-                            if not self.overwrite_allowed:
-                                continue
-                        
-                        if out_format == 'JPEG':
-                            cropped_img = convert_to_rgb(cropped_img)
-                            cropped_img.save(output_path, 'JPEG', quality=self.quality, optimize=True)
-                        elif out_format == 'PNG':
-                            cropped_img.save(output_path, 'PNG', optimize=True)
-                        elif out_format == 'WEBP':
-                            cropped_img.save(output_path, 'WEBP', quality=self.quality)
-                        else:
-                            cropped_img.save(output_path, quality=self.quality)
-                        
-                        results.append({
-                            'input': self.image_file,
-                            'output': output_path,
-                            'output_folder': split_output_dir,
-                            'position': f"第{y+1}行第{x+1}列",
-                            'size': f"{cropped_img.width}x{cropped_img.height}",
-                            'file_size': os.path.getsize(output_path)
-                        })
-                        
-                        progress = 20 + int((block_index / total_blocks) * 70)
-                        self.progress.emit(progress)
+
+            def on_progress(done: int, total: int, text: str) -> None:
+                self.status.emit(text)
+                self.progress.emit(20 + int(done / total * 70))
+
+            results = split_image_grid(
+                self.image_file, self.output_dir, self.x_splits, self.y_splits,
+                self.quality, self.output_format, self.png_mode, self.encoder_preset,
+                self.skip_blank, self.blank_threshold, self.dedupe,
+                confirm_overwrite=self.confirm_overwrite,
+                progress_callback=on_progress
+            )
             
             self.progress.emit(100)
             self.finished.emit(results)
@@ -668,6 +1312,221 @@ class GridSplitThread(QThread):
             self.error.emit(str(e))
 
 
+class BatchGridSplitThread(GridSplitThread):
+    """批量等分线程
+
+    多张图片在线程池中并发等分，每张图片仍输出到自己的 {name}_split_{x}x{y} 文件夹；
+    进度按全部图片的总块数汇总。覆盖确认由锁串行化，同一时间只弹出一个确认框。
+    单张图片失败不会中断其余图片，失败信息以带 error 字段的结果返回。
+    """
+
+    def __init__(
+        self,
+        image_files: List[str],
+        output_dir: Optional[str],
+        x_splits: int = 2,
+        y_splits: int = 2,
+        quality: int = 95,
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        skip_blank: bool = False,
+        blank_threshold: float = DEFAULT_BLANK_THRESHOLD,
+        dedupe: bool = False,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__(
+            image_files[0] if image_files else "", output_dir or "", x_splits, y_splits,
+            quality, output_format, png_mode, encoder_preset, skip_blank, blank_threshold, dedupe
+        )
+        self.image_files = image_files
+        # 为空时输出到每张图片所在的目录
+        self.output_dir = output_dir
+        # 每个工作线程同时持有一张解码后的图片，线程数同时限制了内存占用
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._prompt_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._done_blocks = 0
+        self._done_images = 0
+        self._stems: Dict[str, str] = {}
+
+    def confirm_overwrite(self, output_path: str) -> bool:
+        """多个工作线程可能同时遇到已存在的文件，逐个向界面确认"""
+        with self._prompt_lock:
+            return super().confirm_overwrite(output_path)
+
+    def run(self) -> None:
+        try:
+            total_images = len(self.image_files)
+            total_blocks = total_images * self.x_splits * self.y_splits
+            self._done_blocks = 0
+            self._done_images = 0
+            # 同名的图片（不同目录或不同扩展名）并发写出时使用不同的文件夹与文件名
+            self._stems = dict(zip(self.image_files, unique_output_stems(self.image_files)))
+            self.status.emit(f"开始等分 {total_images} 张图片（{self.max_workers} 个并发）...")
+            self.progress.emit(0)
+
+            results: List[Dict[str, Any]] = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self._split_one, filepath): filepath for filepath in self.image_files}
+                for future in as_completed(futures):
+                    filepath = futures[future]
+                    try:
+                        results.extend(future.result())
+                    except Exception as e:
+                        logger.error(f"BatchGridSplitThread error on {filepath}: {e}", exc_info=True)
+                        results.append({'input': filepath, 'error': str(e)})
+                    with self._progress_lock:
+                        self._done_images += 1
+                        done_images = self._done_images
+                    self.status.emit(f"已完成 {done_images}/{total_images} 张图片")
+
+            # 按输入顺序返回，与单张等分的块顺序一致
+            order = {filepath: index for index, filepath in enumerate(self.image_files)}
+            results.sort(key=lambda r: order[r['input']])
+
+            self.progress.emit(100)
+            self.finished.emit(results)
+
+        except Exception as e:
+            logger.error(f"BatchGridSplitThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
+
+    def _split_one(self, filepath: str) -> List[Dict[str, Any]]:
+        """在工作线程中等分单张图片，块级进度汇总到总进度"""
+        blocks_per_image = self.x_splits * self.y_splits
+        total_blocks = len(self.image_files) * blocks_per_image
+        reported = 0
+
+        def on_progress(done: int, total: int, text: str) -> None:
+            nonlocal reported
+            if done <= reported:
+                return
+            with self._progress_lock:
+                self._done_blocks += done - reported
+                done_blocks = self._done_blocks
+            reported = done
+            self.progress.emit(int(done_blocks / total_blocks * 99))
+
+        try:
+            return split_image_grid(
+                filepath, self.output_dir or os.path.dirname(filepath), self.x_splits, self.y_splits,
+                self.quality, self.output_format, self.png_mode, self.encoder_preset,
+                self.skip_blank, self.blank_threshold, self.dedupe,
+                confirm_overwrite=self.confirm_overwrite,
+                progress_callback=on_progress,
+                output_name=self._stems[filepath]
+            )
+        finally:
+            # 失败的图片也计入进度
+            on_progress(blocks_per_image, blocks_per_image, "")
+
+
+def crop_image_regions(
+    image_file: str,
+    output_dir: str,
+    regions: List[Region],
+    quality: int = 95,
+    output_format: Optional[str] = None,
+    png_mode: str = 'lossless',
+    encoder_preset: str = DEFAULT_ENCODER_PRESET,
+    background: Optional[Tuple[int, int, int]] = None,
+    confirm_overwrite: Optional[Callable[[str], bool]] = None,
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    output_name: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """按自定义区域分割一张图片，保存到 {name}_crop_{n}_regions 文件夹
+
+    图片只解码一次（未压缩的 BMP/TIFF/PPM 以内存映射方式读取），各区域依次裁剪编码。
+
+    Args:
+        image_file: 图片路径
+        output_dir: 输出目录
+        regions: 分割区域，见 region_mask（椭圆与多边形按形状输出）
+        quality: 输出质量
+        output_format: 输出格式
+        png_mode: PNG 输出模式
+        encoder_preset: 编码档位
+        background: 形状外区域的填充色，None 表示透明（输出 JPEG 时以白色填充）
+        confirm_overwrite: 输出文件已存在时调用，返回是否覆盖；None 表示直接覆盖
+        progress_callback: 进度回调，参数为 (已处理区域数, 总区域数, 状态文字)
+        output_name: 输出文件夹与区域文件名的前缀，默认为原文件名（批量时见 unique_output_stems）
+
+    Returns:
+        每个写出的区域的结果列表
+    """
+    regions = [normalize_region(region) for region in regions]
+    total = len(regions)
+    if not total:
+        raise ValueError("没有分割区域")
+
+    def report(done: int, text: str) -> None:
+        if progress_callback:
+            progress_callback(done, total, text)
+
+    results: List[Dict[str, Any]] = []
+
+    # 未压缩的 BMP/TIFF/PPM 以内存映射方式读取，每个区域只读取自身覆盖的像素
+    with open_for_crop(image_file) as img:
+        original_width = img.width
+        original_height = img.height
+
+        report(0, f"开始分割 {total} 个区域...")
+
+        out_format, png_mode, img = _prepare_crop_source(
+            img, image_file, quality, output_format, png_mode, encoder_preset,
+            lambda: report(0, "正在选择输出格式...")
+        )
+        masked = any(region['shape'] != 'rectangle' for region in regions)
+        if masked and background is None and out_format == 'JPEG':
+            if output_format == AUTO_FORMAT:
+                # 形状外需要透明，自动格式改用支持透明度的 WebP
+                out_format = 'WEBP'
+            else:
+                # JPEG 不支持透明，直接填充背景色，不经过透明度合成
+                background = DEFAULT_BACKGROUND
+
+        name = output_name or os.path.splitext(os.path.basename(image_file))[0]
+
+        split_folder_name = f"{name}_crop_{total}_regions"
+        split_output_dir = os.path.join(output_dir, split_folder_name)
+        os.makedirs(split_output_dir, exist_ok=True)
+
+        for i, region in enumerate(regions):
+            report(i, f"处理第 {i+1}/{total} 个区域...")
+
+            # 先裁出外接矩形，遮罩只覆盖这部分像素
+            box = region_pixel_box(region, original_width, original_height)
+            cropped_img = img.crop(box)
+            mask = region_mask(region, (original_width, original_height), box)
+            if mask is not None:
+                cropped_img = apply_mask(cropped_img, mask, background)
+
+            ext = get_file_extension(out_format)
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            output_filename = f"{name}_crop_{timestamp}_{i+1}{ext}"
+            output_path = os.path.join(split_output_dir, output_filename)
+
+            if os.path.exists(output_path) and confirm_overwrite and not confirm_overwrite(output_path):
+                report(i + 1, f"跳过第 {i+1}/{total} 个区域")
+                continue
+
+            save_image(cropped_img, output_path, out_format, quality, png_mode, preset=encoder_preset)
+
+            results.append({
+                'input': image_file,
+                'output': output_path,
+                'output_folder': split_output_dir,
+                'region': f"区域{i+1}",
+                'shape': region['shape'],
+                'size': f"{cropped_img.width}x{cropped_img.height}",
+                'file_size': os.path.getsize(output_path)
+            })
+            report(i + 1, f"已完成第 {i+1}/{total} 个区域")
+
+    return results
+
+
 class CropSplitThread(QThread):
     """自定义区域分割线程"""
     progress = Signal(int)
@@ -680,16 +1539,24 @@ class CropSplitThread(QThread):
         self,
         image_file: str,
         output_dir: str,
-        regions: List[Tuple[float, float, float, float]],
+        regions: List[Region],
         quality: int = 95,
-        output_format: Optional[str] = None
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        background: Optional[Tuple[int, int, int]] = None
     ):
         super().__init__()
         self.image_file = image_file
         self.output_dir = output_dir
-        self.regions = regions
+        # 区域格式见 region_mask：椭圆与多边形按形状输出
+        self.regions = [normalize_region(region) for region in regions]
         self.quality = quality
         self.output_format = output_format
+        self.png_mode = png_mode
+        self.encoder_preset = encoder_preset
+        # 形状外区域的填充色，None 表示透明（输出 JPEG 时以白色填充）
+        self.background = background
         
         self.mutex = QMutex()
         self.wait_condition = QWaitCondition()
@@ -704,78 +1571,32 @@ class CropSplitThread(QThread):
             self.wait_condition.wakeAll()
         self.mutex.unlock()
 
+    def confirm_overwrite(self, output_path: str) -> bool:
+        """请求界面确认是否覆盖，阻塞到用户回答"""
+        self.mutex.lock()
+        self.waiting_for_response = True
+        self.overwrite_request.emit(output_path)
+        self.wait_condition.wait(self.mutex)
+        self.waiting_for_response = False
+        allowed = self.overwrite_allowed
+        self.mutex.unlock()
+        return allowed
+
     def run(self) -> None:
         try:
             self.status.emit("正在加载图片...")
             self.progress.emit(10)
-            
-            with Image.open(self.image_file) as img:
-                original_width = img.width
-                original_height = img.height
-                
-                self.status.emit(f"开始分割 {len(self.regions)} 个区域...")
-                self.progress.emit(20)
-                
-                results: List[Dict[str, Any]] = []
-                
-                original_format = img.format or os.path.splitext(self.image_file)[1][1:].upper()
-                out_format = get_output_format(original_format, self.output_format)
-                
-                filename = os.path.basename(self.image_file)
-                name, _ = os.path.splitext(filename)
-                
-                split_folder_name = f"{name}_crop_{len(self.regions)}_regions"
-                split_output_dir = os.path.join(self.output_dir, split_folder_name)
-                
-                if not os.path.exists(split_output_dir):
-                    os.makedirs(split_output_dir)
-                
-                for i, (x, y, width, height) in enumerate(self.regions):
-                    self.status.emit(f"处理第 {i+1}/{len(self.regions)} 个区域...")
-                    
-                    left = int(x * original_width)
-                    top = int(y * original_height)
-                    right = int((x + width) * original_width)
-                    bottom = int((y + height) * original_height)
-                    
-                    cropped_img = img.crop((left, top, right, bottom))
-                    
-                    ext = get_file_extension(out_format)
-                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                    output_filename = f"{name}_crop_{timestamp}_{i+1}{ext}"
-                    output_path = os.path.join(split_output_dir, output_filename)
-                    
-                    if os.path.exists(output_path):
-                        self.mutex.lock()
-                        self.waiting_for_response = True
-                        self.overwrite_request.emit(output_path)
-                        self.wait_condition.wait(self.mutex)
-                        self.waiting_for_response = False
-                        self.mutex.unlock()
-                        if not self.overwrite_allowed:
-                            continue
-                    
-                    if out_format == 'JPEG':
-                        cropped_img = convert_to_rgb(cropped_img)
-                        cropped_img.save(output_path, 'JPEG', quality=self.quality, optimize=True)
-                    elif out_format == 'PNG':
-                        cropped_img.save(output_path, 'PNG', optimize=True)
-                    elif out_format == 'WEBP':
-                        cropped_img.save(output_path, 'WEBP', quality=self.quality)
-                    else:
-                        cropped_img.save(output_path, quality=self.quality)
-                    
-                    results.append({
-                        'input': self.image_file,
-                        'output': output_path,
-                        'output_folder': split_output_dir,
-                        'region': f"区域{i+1}",
-                        'size': f"{cropped_img.width}x{cropped_img.height}",
-                        'file_size': os.path.getsize(output_path)
-                    })
-                    
-                    progress = 20 + int((i + 1) / len(self.regions) * 70)
-                    self.progress.emit(progress)
+
+            def on_progress(done: int, total: int, text: str) -> None:
+                self.status.emit(text)
+                self.progress.emit(20 + int((done / total if total else 0) * 70))
+
+            results = crop_image_regions(
+                self.image_file, self.output_dir, self.regions,
+                self.quality, self.output_format, self.png_mode, self.encoder_preset, self.background,
+                confirm_overwrite=self.confirm_overwrite,
+                progress_callback=on_progress
+            )
             
             self.progress.emit(100)
             self.finished.emit(results)
@@ -783,3 +1604,112 @@ class CropSplitThread(QThread):
         except Exception as e:
             logger.error(f"CropSplitThread error: {e}", exc_info=True)
             self.error.emit(str(e))
+
+
+class BatchCropSplitThread(CropSplitThread):
+    """按同一组区域（模板）批量分割线程
+
+    区域坐标是相对于图片宽高的比例，同一组区域可以套用到版式相同的一批图片上。
+    多张图片在线程池中并发处理，每张图片只解码一次，输出到各自的 {name}_crop_{n}_regions 文件夹；
+    进度按全部图片的总区域数汇总。覆盖确认由锁串行化，单张图片失败不会中断其余图片，
+    失败信息以带 error 字段的结果返回。
+    """
+
+    def __init__(
+        self,
+        image_files: List[str],
+        output_dir: Optional[str],
+        regions: List[Region],
+        quality: int = 95,
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        background: Optional[Tuple[int, int, int]] = None,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__(
+            image_files[0] if image_files else "", output_dir or "", regions,
+            quality, output_format, png_mode, encoder_preset, background
+        )
+        self.image_files = image_files
+        # 为空时输出到每张图片所在的目录
+        self.output_dir = output_dir
+        # 每个工作线程同时持有一张解码后的图片，线程数同时限制了内存占用
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._prompt_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._done_regions = 0
+        self._done_images = 0
+        self._stems: Dict[str, str] = {}
+
+    def confirm_overwrite(self, output_path: str) -> bool:
+        """多个工作线程可能同时遇到已存在的文件，逐个向界面确认"""
+        with self._prompt_lock:
+            return super().confirm_overwrite(output_path)
+
+    def run(self) -> None:
+        try:
+            if not self.regions:
+                # 每张图片都会失败，直接报告一次
+                raise ValueError("没有分割区域")
+            total_images = len(self.image_files)
+            self._done_regions = 0
+            self._done_images = 0
+            # 同名的图片（不同目录或不同扩展名）并发写出时使用不同的文件夹与文件名
+            self._stems = dict(zip(self.image_files, unique_output_stems(self.image_files)))
+            self.status.emit(f"开始分割 {total_images} 张图片（{self.max_workers} 个并发）...")
+            self.progress.emit(0)
+
+            results: List[Dict[str, Any]] = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self._crop_one, filepath): filepath for filepath in self.image_files}
+                for future in as_completed(futures):
+                    filepath = futures[future]
+                    try:
+                        results.extend(future.result())
+                    except Exception as e:
+                        logger.error(f"BatchCropSplitThread error on {filepath}: {e}", exc_info=True)
+                        results.append({'input': filepath, 'error': str(e)})
+                    with self._progress_lock:
+                        self._done_images += 1
+                        done_images = self._done_images
+                    self.status.emit(f"已完成 {done_images}/{total_images} 张图片")
+
+            # 按输入顺序返回，同一张图片内保持区域顺序
+            order = {filepath: index for index, filepath in enumerate(self.image_files)}
+            results.sort(key=lambda r: order[r['input']])
+
+            self.progress.emit(100)
+            self.finished.emit(results)
+
+        except Exception as e:
+            logger.error(f"BatchCropSplitThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
+
+    def _crop_one(self, filepath: str) -> List[Dict[str, Any]]:
+        """在工作线程中分割单张图片，区域级进度汇总到总进度"""
+        regions_per_image = len(self.regions)
+        total_regions = len(self.image_files) * regions_per_image
+        reported = 0
+
+        def on_progress(done: int, total: int, text: str) -> None:
+            nonlocal reported
+            if done <= reported:
+                return
+            with self._progress_lock:
+                self._done_regions += done - reported
+                done_regions = self._done_regions
+            reported = done
+            self.progress.emit(int((done_regions / total_regions if total_regions else 0) * 99))
+
+        try:
+            return crop_image_regions(
+                filepath, self.output_dir or os.path.dirname(filepath), self.regions,
+                self.quality, self.output_format, self.png_mode, self.encoder_preset, self.background,
+                confirm_overwrite=self.confirm_overwrite,
+                progress_callback=on_progress,
+                output_name=self._stems[filepath]
+            )
+        finally:
+            # 失败的图片也计入进度
+            on_progress(regions_per_image, regions_per_image, "")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JPEG 头信息分析模块
+
+只读取文件头中的量化表 (DQT)，不解码像素数据，据此估算源文件的 JPEG 质量：
+1. 逐个扫描 JPEG 标记段，遇到 SOS（扫描数据开始）即停止
+2. 按 libjpeg 的质量缩放公式生成 1-100 各质量下的标准量化表
+3. 取与文件量化表误差最小的质量作为估计值
+"""
+
+import logging
+import struct
+from typing import Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger('ImageStitcher.jpeg_analyzer')
+
+# ITU-T T.81 附录 K 中的标准亮度 / 色度量化表（自然顺序）
+STD_LUMINANCE_TABLE = [
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+]
+
+STD_CHROMINANCE_TABLE = [
+    17, 18, 24, 47, 99, 99, 99, 99,
+    18, 21, 26, 66, 99, 99, 99, 99,
+    24, 26, 56, 99, 99, 99, 99, 99,
+    47, 66, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+]
+
+# DQT 中的数值按 zigzag 顺序存储，此表给出第 i 个值对应的自然顺序下标
+ZIGZAG_TO_NATURAL = [
+    0, 1, 8, 16, 9, 2, 3, 10,
+    17, 24, 32, 25, 18, 11, 4, 5,
+    12, 19, 26, 33, 40, 48, 41, 34,
+    27, 20, 13, 6, 7, 14, 21, 28,
+    35, 42, 49, 56, 57, 50, 43, 36,
+    29, 22, 15, 23, 30, 37, 44, 51,
+    58, 59, 52, 45, 38, 31, 39, 46,
+    53, 60, 61, 54, 47, 55, 62, 63,
+]
+
+# 没有长度字段的独立标记：TEM 与 RST0-RST7
+_STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+_MARKER_DQT = 0xDB
+_MARKER_SOS = 0xDA
+_MARKER_EOI = 0xD9
+
+
+def read_quantization_tables(filepath: str) -> Dict[int, List[int]]:
+    """读取 JPEG 文件头中的量化表
+
+    Args:
+        filepath: 图片路径
+
+    Returns:
+        以表编号为键、自然顺序的 64 个量化值为值的字典；非 JPEG 文件返回空字典
+    """
+    tables: Dict[int, List[int]] = {}
+
+    with open(filepath, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return tables
+
+        while True:
+            byte = f.read(1)
+            if not byte:
+                break
+            if byte != b'\xff':
+                continue
+
+            # 跳过填充的 0xFF
+            marker = f.read(1)
+            while marker == b'\xff':
+                marker = f.read(1)
+            if not marker:
+                break
+
+            code = marker[0]
+            if code in _STANDALONE_MARKERS or code == 0x00:
+                continue
+            if code in (_MARKER_SOS, _MARKER_EOI):
+                break
+
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                break
+            length = struct.unpack('>H', length_bytes)[0]
+
+            if code != _MARKER_DQT:
+                f.seek(length - 2, 1)
+                continue
+
+            payload = f.read(length - 2)
+            offset = 0
+            while offset < len(payload):
+                precision = payload[offset] >> 4
+                table_id = payload[offset] & 0x0F
+                offset += 1
+                if precision:
+                    values = struct.unpack('>64H', payload[offset:offset + 128])
+                    offset += 128
+                else:
+                    values = tuple(payload[offset:offset + 64])
+                    offset += 64
+                if len(values) < 64:
+                    break
+
+                natural = [0] * 64
+                for i, value in enumerate(values):
+                    natural[ZIGZAG_TO_NATURAL[i]] = value
+                tables[table_id] = natural
+
+    return tables
+
+
+def _scaled_table(std_table: List[int], quality: int) -> List[int]:
+    """按 libjpeg 的规则生成指定质量下的量化表"""
+    scale = 5000 // quality if quality < 50 else 200 - quality * 2
+    return [min(max((value * scale + 50) // 100, 1), 255) for value in std_table]
+
+
+# 预先生成 1-100 全部质量下的量化表，形状为 (100, 64)
+_SCALED_LUMINANCE = np.array([_scaled_table(STD_LUMINANCE_TABLE, q) for q in range(1, 101)])
+_SCALED_CHROMINANCE = np.array([_scaled_table(STD_CHROMINANCE_TABLE, q) for q in range(1, 101)])
+
+
+def _match_quality(table: List[int], scaled_tables: np.ndarray) -> int:
+    """找出生成结果与给定量化表最接近的质量"""
+    errors = np.abs(scaled_tables - np.asarray(table)).sum(axis=1)
+    return int(np.argmin(errors)) + 1
+
+
+def estimate_jpeg_quality(filepath: str) -> Optional[int]:
+    """根据量化表估算 JPEG 质量（1-100）
+
+    非 libjpeg 生成的文件（如部分相机或 Photoshop 导出）量化表并非标准表的缩放，
+    此时返回的是最接近的近似值。
+
+    Args:
+        filepath: 图片路径
+
+    Returns:
+        估算的质量；不是 JPEG 或读取失败时返回 None
+    """
+    try:
+        tables = read_quantization_tables(filepath)
+    except OSError as e:
+        logger.debug(f"Failed to read quantization tables from {filepath}: {e}")
+        return None
+
+    if not tables:
+        return None
+
+    luminance = tables.get(0, tables[min(tables)])
+    estimate = _match_quality(luminance, _SCALED_LUMINANCE)
+    if 1 in tables:
+        # 亮度表对画质影响最大，色度表只作为辅助
+        chrominance = _match_quality(tables[1], _SCALED_CHROMINANCE)
+        estimate = round((estimate * 2 + chrominance) / 3)
+
+    return estimate
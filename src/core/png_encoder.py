@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PNG 编码模块
+
+不经过 Pillow 的 PNG 编码器，直接用 NumPy 完成扫描行过滤并自行写出 PNG 数据块，
+从而可以显式控制过滤方式与 zlib 压缩策略：
+1. 过滤：none / sub / up / average / paeth 五种固定过滤器，以及逐行选择的 adaptive
+   （与 libpng 相同的启发式：取带符号字节绝对值之和最小的过滤器）
+2. 无损优化：在线程池中对 过滤方式 x 压缩策略 的组合分别编码（zlib 压缩时释放 GIL），
+   连同 Pillow optimize=True 的结果一起比较，保留最小的一个
+3. 大图并行写出：按行分块并行过滤与 deflate，再拼接为合法的 IDAT 数据流
+"""
+
+import io
+import os
+import zlib
+import struct
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('ImageStitcher.png_encoder')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# 固定过滤器对应的 PNG 过滤类型编号
+FILTER_TYPES = {
+    'none': 0,
+    'sub': 1,
+    'up': 2,
+    'average': 3,
+    'paeth': 4
+}
+FILTER_NAMES = tuple(FILTER_TYPES) + ('adaptive',)
+
+ZLIB_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'rle': zlib.Z_RLE,
+    'huffman': zlib.Z_HUFFMAN_ONLY
+}
+
+# 优化力度：每一级尝试的 (过滤方式, 压缩策略) 组合，力度越高越慢、结果越小
+PNG_EFFORT_TRIALS = {
+    1: (('none', 'adaptive'), ('default', 'filtered')),
+    2: (('none', 'sub', 'up', 'paeth', 'adaptive'), ('default', 'filtered', 'rle')),
+    3: (FILTER_NAMES, ('default', 'filtered', 'rle', 'huffman')),
+}
+DEFAULT_PNG_EFFORT = 2
+
+# 过滤时每批处理的字节数上限，控制 adaptive 模式下临时数组的内存占用
+_FILTER_BAND_BYTES = 4 << 20
+# 单个 IDAT 数据块的最大长度
+_IDAT_CHUNK_SIZE = 1 << 20
+
+# 并行写出时每个任务负责的过滤后数据量；deflate 的回溯窗口为 32KB
+_PARALLEL_CHUNK_BYTES = 2 << 20
+_DEFLATE_WINDOW = 32 << 10
+# 像素数达到该值时才值得使用并行写出
+PARALLEL_PNG_MIN_PIXELS = 4_000_000
+# NumPy 的 adaptive 过滤比 Pillow 的 C 编码器慢（单线程约 2 倍），至少 3 个线程并行时才能抵消
+PARALLEL_PNG_MIN_WORKERS = 3
+_ADLER_BASE = 65521
+
+
+def _chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """构造一个 PNG 数据块（长度 + 类型 + 数据 + CRC）"""
+    crc = zlib.crc32(data, zlib.crc32(chunk_type))
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', crc)
+
+
+def _pack_bits(indices: np.ndarray, bit_depth: int) -> np.ndarray:
+    """将每像素一个字节的索引按 bit_depth 打包为 PNG 扫描行（高位在前）"""
+    height, width = indices.shape
+    per_byte = 8 // bit_depth
+    padded_width = -(-width // per_byte) * per_byte
+    if padded_width != width:
+        indices = np.pad(indices, ((0, 0), (0, padded_width - width)))
+    groups = indices.reshape(height, -1, per_byte).astype(np.uint8)
+    packed = np.zeros(groups.shape[:2], dtype=np.uint8)
+    for i in range(per_byte):
+        packed |= groups[:, :, i] << (8 - bit_depth * (i + 1))
+    return packed
+
+
+def png_header(img: Image.Image) -> Optional[Tuple[int, int, int, bytes]]:
+    """生成 PNG 文件头（签名、IHDR 以及 IDAT 之前的数据块）
+
+    Args:
+        img: PIL Image 对象
+
+    Returns:
+        (位深, 每像素字节数, 每行字节数, 文件头)；
+        不支持的模式（16 位、CMYK 等）返回 None
+    """
+    width, height = img.size
+    chunks: List[bytes] = []
+    bpp = 1
+
+    if img.mode == '1':
+        bit_depth, color_type = 1, 0
+    elif img.mode == 'P':
+        if img.palette is None or img.palette.mode != 'RGB':
+            return None
+        used = img.getextrema()[1] + 1
+        bit_depth = next(depth for depth in (1, 2, 4, 8) if used <= 1 << depth)
+        color_type = 3
+
+        palette = img.getpalette() or []
+        palette = (palette + [0] * (used * 3))[:used * 3]
+        chunks.append(_chunk(b'PLTE', bytes(palette)))
+
+        transparency = img.info.get('transparency')
+        if isinstance(transparency, int):
+            transparency = b'\xff' * transparency + b'\x00'
+        if isinstance(transparency, bytes):
+            alpha = transparency[:used].rstrip(b'\xff')
+            if alpha:
+                chunks.append(_chunk(b'tRNS', alpha))
+    elif img.mode in ('L', 'LA', 'RGB', 'RGBA'):
+        color_type = {'L': 0, 'LA': 4, 'RGB': 2, 'RGBA': 6}[img.mode]
+        bpp = len(img.mode)
+        bit_depth = 8
+
+        transparency = img.info.get('transparency')
+        if img.mode == 'L' and isinstance(transparency, int):
+            chunks.append(_chunk(b'tRNS', struct.pack('>H', transparency)))
+        elif img.mode == 'RGB' and isinstance(transparency, tuple):
+            chunks.append(_chunk(b'tRNS', struct.pack('>HHH', *transparency)))
+    else:
+        return None
+
+    icc_profile = img.info.get('icc_profile')
+    if icc_profile:
+        chunks.insert(0, _chunk(b'iCCP', b'ICC Profile\x00\x00' + zlib.compress(icc_profile)))
+
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    head = PNG_SIGNATURE + _chunk(b'IHDR', header) + b''.join(chunks)
+    stride = -(-width * bpp * bit_depth // 8)
+    return bit_depth, bpp, stride, head
+
+
+def read_scanlines(img: Image.Image, top: int, bottom: int, bit_depth: int) -> np.ndarray:
+    """读取 [top, bottom) 行并转换为未过滤的扫描行
+
+    Args:
+        img: PIL Image 对象（模式须为 png_header 支持的模式）
+        top: 起始行
+        bottom: 结束行（不含）
+        bit_depth: png_header 返回的位深
+
+    Returns:
+        扫描行 (bottom - top, stride)，uint8
+    """
+    if top != 0 or bottom != img.height:
+        img = img.crop((0, top, img.width, bottom))
+
+    if img.mode == '1':
+        raw = np.packbits(np.asarray(img, dtype=bool), axis=1)
+    elif img.mode == 'P':
+        raw = np.asarray(img)
+        if bit_depth < 8:
+            raw = _pack_bits(raw, bit_depth)
+    else:
+        raw = np.asarray(img).reshape(img.height, -1)
+    return np.ascontiguousarray(raw, dtype=np.uint8)
+
+
+def prepare_scanlines(img: Image.Image) -> Optional[Tuple[np.ndarray, int, bytes]]:
+    """将整张图片转换为未过滤的扫描行与 PNG 文件头
+
+    Returns:
+        (扫描行 (H, stride) uint8, 每像素字节数, 文件头)；不支持的模式返回 None
+    """
+    header = png_header(img)
+    if header is None:
+        return None
+    bit_depth, bpp, _, head = header
+    return read_scanlines(img, 0, img.height, bit_depth), bpp, head
+
+
+def _apply_filter(cur: np.ndarray, prev: np.ndarray, bpp: int, filter_type: int) -> np.ndarray:
+    """对一批扫描行应用固定过滤器
+
+    Args:
+        cur: 当前行 (n, stride)，int16
+        prev: 每行的上一行 (n, stride)，int16，首行之上为全 0
+        bpp: 每像素字节数（不足 1 字节按 1 计）
+        filter_type: PNG 过滤类型编号
+
+    Returns:
+        过滤后的字节 (n, stride)，uint8
+    """
+    if filter_type == 0:
+        return cur.astype(np.uint8)
+
+    left = np.zeros_like(cur)
+    left[:, bpp:] = cur[:, :-bpp]
+
+    if filter_type == 1:
+        predictor = left
+    elif filter_type == 2:
+        predictor = prev
+    elif filter_type == 3:
+        predictor = (left + prev) >> 1
+    else:
+        upper_left = np.zeros_like(prev)
+        upper_left[:, bpp:] = prev[:, :-bpp]
+        pa = np.abs(prev - upper_left)
+        pb = np.abs(left - upper_left)
+        pc = np.abs(left + prev - 2 * upper_left)
+        predictor = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, prev, upper_left))
+
+    return ((cur - predictor) & 0xFF).astype(np.uint8)
+
+
+def filter_scanlines(
+    raw: np.ndarray,
+    bpp: int,
+    filter_name: str = 'adaptive',
+    prev_row: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """对扫描行做 PNG 过滤
+
+    Args:
+        raw: 未过滤的扫描行 (H, stride)
+        bpp: 每像素字节数
+        filter_name: FILTER_NAMES 中的过滤方式
+        prev_row: raw 首行之上的一行；为 None 表示 raw 从图片第一行开始
+
+    Returns:
+        过滤后的数据 (H, stride + 1)，每行首字节为过滤类型，可直接送入 zlib
+    """
+    height, stride = raw.shape
+    out = np.empty((height, stride + 1), dtype=np.uint8)
+    band_rows = max(1, _FILTER_BAND_BYTES // max(stride, 1))
+
+    for start in range(0, height, band_rows):
+        end = min(start + band_rows, height)
+        cur = raw[start:end].astype(np.int16)
+        prev = np.zeros_like(cur)
+        prev[1:] = cur[:-1]
+        if start > 0:
+            prev[0] = raw[start - 1]
+        elif prev_row is not None:
+            prev[0] = prev_row
+
+        if filter_name != 'adaptive':
+            filter_type = FILTER_TYPES[filter_name]
+            out[start:end, 0] = filter_type
+            out[start:end, 1:] = _apply_filter(cur, prev, bpp, filter_type)
+            continue
+
+        candidates = [_apply_filter(cur, prev, bpp, t) for t in range(5)]
+        scores = np.stack([
+            np.abs(c.view(np.int8).astype(np.int32)).sum(axis=1) for c in candidates
+        ])
+        best = np.argmin(scores, axis=0)
+        out[start:end, 0] = best
+        for t, candidate in enumerate(candidates):
+            rows = best == t
+            out[start:end][rows, 1:] = candidate[rows]
+
+    return out
+
+
+def assemble_png(head: bytes, compressed: bytes) -> bytes:
+    """拼接文件头、IDAT 数据块与 IEND"""
+    parts = [head]
+    for start in range(0, len(compressed), _IDAT_CHUNK_SIZE):
+        parts.append(_chunk(b'IDAT', compressed[start:start + _IDAT_CHUNK_SIZE]))
+    if not compressed:
+        parts.append(_chunk(b'IDAT', b''))
+    parts.append(_chunk(b'IEND', b''))
+    return b''.join(parts)
+
+
+def _deflate(data: np.ndarray, strategy: str, level: int = 9) -> bytes:
+    """使用指定策略压缩过滤后的数据"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, ZLIB_STRATEGIES[strategy])
+    return compressor.compress(memoryview(data).cast('B')) + compressor.flush()
+
+
+def _pillow_png(img: Image.Image) -> bytes:
+    """Pillow optimize=True 的编码结果，作为优化的基准"""
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def optimize_png(
+    img: Image.Image,
+    effort: int = DEFAULT_PNG_EFFORT,
+    max_workers: Optional[int] = None
+) -> Tuple[bytes, Dict[str, Any]]:
+    """并行尝试多种过滤方式与压缩策略，返回最小的无损 PNG
+
+    Args:
+        img: PIL Image 对象
+        effort: 优化力度（1-3），见 PNG_EFFORT_TRIALS
+        max_workers: 线程池大小，默认为 CPU 核心数（最多 8）
+
+    Returns:
+        (PNG 字节, 报告)；报告包含 bytes、baseline_bytes（Pillow optimize=True 的体积）、
+        saved（相对基准节省的字节数）、filter、strategy、trials
+    """
+    effort = max(1, min(effort, max(PNG_EFFORT_TRIALS)))
+    filters, strategies = PNG_EFFORT_TRIALS[effort]
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+
+    prepared = prepare_scanlines(img)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        baseline_future = executor.submit(_pillow_png, img)
+        candidates: List[Tuple[str, str, Any]] = []
+
+        if prepared is not None:
+            raw, bpp, head = prepared
+            filtered_futures = {name: executor.submit(filter_scanlines, raw, bpp, name) for name in filters}
+            for name in filters:
+                filtered = filtered_futures[name].result()
+                for strategy in strategies:
+                    candidates.append((name, strategy, executor.submit(_deflate, filtered, strategy)))
+        else:
+            logger.debug(f"PNG optimizer does not support mode {img.mode}, using Pillow output")
+
+        baseline = baseline_future.result()
+        best_data, best_filter, best_strategy = baseline, 'pillow', 'pillow'
+        for name, strategy, future in candidates:
+            data = assemble_png(head, future.result())
+            if len(data) < len(best_data):
+                best_data, best_filter, best_strategy = data, name, strategy
+
+    report = {
+        'bytes': len(best_data),
+        'baseline_bytes': len(baseline),
+        'saved': len(baseline) - len(best_data),
+        'filter': best_filter,
+        'strategy': best_strategy,
+        'trials': len(candidates) + 1
+    }
+    logger.debug(f"PNG optimize: {report}")
+    return best_data, report
+
+
+def _zlib_header(level: int) -> bytes:
+    """生成 zlib 流头（32KB 窗口，FLEVEL 与压缩级别对应）"""
+    cmf = 0x78
+    flevel = 0 if level < 2 else 1 if level < 6 else 2 if level == 6 else 3
+    flg = flevel << 6
+    flg += 31 - (cmf * 256 + flg) % 31
+    return bytes([cmf, flg])
+
+
+def adler32_combine(adler1: int, adler2: int, length2: int) -> int:
+    """合并两段数据的 Adler-32 校验值（与 zlib 的 adler32_combine 相同）
+
+    Args:
+        adler1: 前一段数据的校验值
+        adler2: 后一段数据的校验值
+        length2: 后一段数据的长度
+
+    Returns:
+        两段数据拼接后的校验值
+    """
+    remainder = length2 % _ADLER_BASE
+    sum1 = adler1 & 0xFFFF
+    sum2 = (remainder * sum1) % _ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xFFFF) + _ADLER_BASE - 1) % _ADLER_BASE
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + _ADLER_BASE - remainder) % _ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def write_png_parallel(
+    img: Image.Image,
+    output: Any,
+    level: int = 6,
+    strategy: str = 'default',
+    filter_name: Optional[str] = None,
+    max_workers: Optional[int] = None
+) -> bool:
+    """多线程写出 PNG（与 pigz 相同的分块并行 deflate）
+
+    按行把图片切成若干块，每块在线程池中独立读取、过滤并做原始 deflate：
+    以前一块末尾 32KB 过滤后数据作为预设字典（所需的前几行由任务自行重新过滤），
+    非最后一块以 Z_SYNC_FLUSH 结束，使各块输出可以按字节直接拼接为一个 zlib 流，
+    Adler-32 校验值逐块计算后合并。同时在途的任务数有上限，内存占用与图片大小无关。
+
+    Args:
+        img: PIL Image 对象
+        output: 输出文件路径或可写的文件对象
+        level: zlib 压缩级别
+        strategy: ZLIB_STRATEGIES 中的压缩策略
+        filter_name: FILTER_NAMES 中的过滤方式；默认与 libpng 一致，
+            调色板及低位深图片不过滤，其余使用 adaptive
+        max_workers: 线程池大小，默认为 CPU 核心数（最多 8）
+
+    Returns:
+        是否已写出；不支持的模式或线程数少于 PARALLEL_PNG_MIN_WORKERS 时返回 False，调用方应改用 Pillow 保存
+    """
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    if max_workers < PARALLEL_PNG_MIN_WORKERS:
+        return False
+    header = png_header(img)
+    if header is None:
+        return False
+    bit_depth, bpp, stride, head = header
+    if filter_name is None:
+        filter_name = 'none' if img.mode == 'P' or bit_depth < 8 else 'adaptive'
+    height = img.height
+    line = stride + 1
+    band_rows = max(1, _PARALLEL_CHUNK_BYTES // line)
+    context_rows = -(-_DEFLATE_WINDOW // line)
+
+    def compress_band(start: int, end: int) -> Tuple[bytes, int, int]:
+        context_start = max(0, start - context_rows)
+        read_top = max(0, context_start - 1)
+        raw = read_scanlines(img, read_top, end, bit_depth)
+        prev_row = None
+        if context_start > 0:
+            prev_row, raw = raw[0], raw[1:]
+        flat = filter_scanlines(raw, bpp, filter_name, prev_row).reshape(-1)
+
+        split = (start - context_start) * line
+        data = flat[split:]
+        options = {}
+        if split:
+            options['zdict'] = flat[max(0, split - _DEFLATE_WINDOW):split].tobytes()
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9, ZLIB_STRATEGIES[strategy], **options)
+        mode = zlib.Z_FINISH if end == height else zlib.Z_SYNC_FLUSH
+        compressed = compressor.compress(data) + compressor.flush(mode)
+        return compressed, zlib.adler32(data), len(data)
+
+    handle = output if hasattr(output, 'write') else open(output, 'wb')
+    try:
+        handle.write(head)
+        prefix = _zlib_header(level)
+        adler = 1
+        pending: deque = deque()
+
+        def write_next() -> None:
+            nonlocal prefix, adler
+            compressed, band_adler, length = pending.popleft().result()
+            adler = adler32_combine(adler, band_adler, length)
+            handle.write(_chunk(b'IDAT', prefix + compressed))
+            prefix = b''
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for start in range(0, height, band_rows):
+                pending.append(executor.submit(compress_band, start, min(start + band_rows, height)))
+                if len(pending) >= max_workers * 2:
+                    write_next()
+            while pending:
+                write_next()
+
+        handle.write(_chunk(b'IDAT', prefix + struct.pack('>I', adler)))
+        handle.write(_chunk(b'IEND', b''))
+    finally:
+        if handle is not output:
+            handle.close()
+
+    return True
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PNG 调色板量化模块
+
+将真彩色（可带透明通道）图片量化为最多 256 色的自适应调色板，效果类似 pngquant：
+1. 先对像素颜色去重并统计次数，后续所有计算都只在唯一颜色上进行
+   （截图、界面素材的唯一颜色数远少于像素数）
+2. 唯一颜色数不超过调色板大小时直接使用原色，结果无损
+3. 否则在 RGBA 空间做加权中位切分 (median cut)，再用少量 k-means 迭代修正调色板
+4. 可选有序抖动：为每个颜色找出最近与次近的两个调色板颜色，
+   按 Bayer 阈值矩阵逐像素在两者之间选择，全部计算都是向量化的
+"""
+
+import logging
+from typing import Tuple
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('ImageStitcher.png_quantizer')
+
+MAX_COLORS = 256
+KMEANS_ITERATIONS = 2
+# 构建调色板时最多使用的唯一颜色数（照片等颜色极多的图片会先加权抽样）
+PALETTE_SAMPLE_SIZE = 32768
+# 计算距离时每批处理的颜色数，控制临时矩阵大小
+_DISTANCE_CHUNK = 16384
+
+# 8x8 Bayer 有序抖动矩阵，归一化到 [0, 1)
+_BAYER_8X8 = np.array([
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+], dtype=np.float32) / 64.0
+
+
+def _unique_colors(rgba: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """对像素颜色去重
+
+    Returns:
+        (唯一颜色 (N, 4) uint8, 每个像素对应的唯一颜色下标, 每个唯一颜色的像素数)
+    """
+    packed = rgba.reshape(-1, 4).view(np.uint32).ravel()
+    unique, inverse, counts = np.unique(packed, return_inverse=True, return_counts=True)
+    colors = unique.view(np.uint8).reshape(-1, 4)
+    return colors, inverse.ravel(), counts
+
+
+def _box_stats(colors: np.ndarray, weights: np.ndarray, members: np.ndarray) -> Tuple[float, int]:
+    """计算盒子的切分优先级（颜色跨度 x 像素数）以及跨度最大的通道"""
+    if len(members) < 2:
+        return 0.0, 0
+    box = colors[members]
+    spans = box.max(axis=0) - box.min(axis=0)
+    channel = int(np.argmax(spans))
+    return float(spans[channel]) * float(weights[members].sum()), channel
+
+
+def _median_cut(colors: np.ndarray, weights: np.ndarray, max_colors: int) -> np.ndarray:
+    """加权中位切分
+
+    Args:
+        colors: 唯一颜色 (N, 4)，float32
+        weights: 每个颜色的像素数
+        max_colors: 调色板大小上限
+
+    Returns:
+        调色板 (K, 4)，float32
+    """
+    all_members = np.arange(len(colors))
+    boxes = [all_members]
+    stats = [_box_stats(colors, weights, all_members)]
+
+    while len(boxes) < max_colors:
+        best_index = max(range(len(boxes)), key=lambda i: stats[i][0])
+        score, channel = stats[best_index]
+        if score <= 0:
+            break
+
+        members = boxes.pop(best_index)
+        stats.pop(best_index)
+        order = members[np.argsort(colors[members, channel], kind='stable')]
+        cumulative = np.cumsum(weights[order])
+        split = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+        split = min(max(split, 1), len(order) - 1)
+        for part in (order[:split], order[split:]):
+            boxes.append(part)
+            stats.append(_box_stats(colors, weights, part))
+
+    palette = np.empty((len(boxes), 4), dtype=np.float32)
+    for i, members in enumerate(boxes):
+        w = weights[members].astype(np.float64)
+        palette[i] = (colors[members] * w[:, None]).sum(axis=0) / w.sum()
+    return palette
+
+
+def _nearest_two(colors: np.ndarray, palette: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """为每个颜色找出最近与次近的调色板颜色
+
+    Returns:
+        (最近下标, 最近距离平方, 次近下标, 次近距离平方)
+    """
+    n = len(colors)
+    first = np.empty(n, dtype=np.int64)
+    second = np.empty(n, dtype=np.int64)
+    first_dist = np.empty(n, dtype=np.float32)
+    second_dist = np.empty(n, dtype=np.float32)
+    palette_norm = (palette * palette).sum(axis=1)
+    single = len(palette) < 2
+
+    for start in range(0, n, _DISTANCE_CHUNK):
+        chunk = colors[start:start + _DISTANCE_CHUNK]
+        # |c - p|^2 = |c|^2 - 2 c.p + |p|^2
+        dist = (chunk * chunk).sum(axis=1)[:, None] - 2 * chunk @ palette.T + palette_norm[None, :]
+        np.maximum(dist, 0, out=dist)
+        rows = np.arange(len(chunk))
+        if single:
+            nearest = np.zeros(len(chunk), dtype=np.int64)
+            runner_up = nearest
+        else:
+            top2 = np.argpartition(dist, 1, axis=1)[:, :2]
+            swap = dist[rows, top2[:, 0]] > dist[rows, top2[:, 1]]
+            nearest = np.where(swap, top2[:, 1], top2[:, 0])
+            runner_up = np.where(swap, top2[:, 0], top2[:, 1])
+        first[start:start + len(chunk)] = nearest
+        second[start:start + len(chunk)] = runner_up
+        first_dist[start:start + len(chunk)] = dist[rows, nearest]
+        second_dist[start:start + len(chunk)] = dist[rows, runner_up]
+
+    return first, first_dist, second, second_dist
+
+
+def _refine_palette(colors: np.ndarray, weights: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """用加权 k-means 迭代修正调色板"""
+    for _ in range(KMEANS_ITERATIONS):
+        nearest = _nearest_two(colors, palette)[0]
+        counts = np.bincount(nearest, weights=weights, minlength=len(palette))
+        used = counts > 0
+        palette = palette.copy()
+        for channel in range(4):
+            totals = np.bincount(nearest, weights=colors[:, channel] * weights, minlength=len(palette))
+            palette[used, channel] = totals[used] / counts[used]
+    return palette
+
+
+def _sample_colors(colors: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """唯一颜色过多时，按像素数加权抽样，只用样本构建调色板"""
+    if len(colors) <= PALETTE_SAMPLE_SIZE:
+        return colors, weights
+    rng = np.random.default_rng(0)
+    picked = rng.choice(len(colors), size=PALETTE_SAMPLE_SIZE, p=weights / weights.sum())
+    picked, sample_weights = np.unique(picked, return_counts=True)
+    return colors[picked], sample_weights
+
+
+def quantize_image(img: Image.Image, colors: int = MAX_COLORS, dither: bool = False) -> Image.Image:
+    """将图片量化为带透明度的调色板 (P 模式) 图片
+
+    Args:
+        img: PIL Image 对象
+        colors: 调色板颜色数上限（2-256）
+        dither: 是否使用有序抖动，渐变区域更平滑但体积略大
+
+    Returns:
+        P 模式图片，透明度保存在 info['transparency'] 中，可直接保存为 PNG
+    """
+    colors = max(2, min(colors, MAX_COLORS))
+
+    if img.mode in ('1', 'L'):
+        # 灰度图本身就是 8 位单通道，量化收益很小
+        return img
+    if img.mode == 'P' and len(img.getcolors(MAX_COLORS + 1) or []) <= colors:
+        return img
+
+    rgba = np.ascontiguousarray(np.asarray(img.convert('RGBA')))
+    height, width = rgba.shape[:2]
+
+    # 完全透明像素的颜色不可见，统一为 0 以减少唯一颜色
+    transparent = rgba[:, :, 3] == 0
+    if transparent.any():
+        rgba = rgba.copy()
+        rgba[transparent] = 0
+
+    unique, inverse, counts = _unique_colors(rgba)
+
+    if len(unique) <= colors:
+        palette = unique.astype(np.float32)
+        indices = inverse
+    else:
+        unique_f = unique.astype(np.float32)
+        sample, sample_counts = _sample_colors(unique_f, counts)
+        palette = _median_cut(sample, sample_counts, colors)
+        palette = _refine_palette(sample, sample_counts, palette)
+        nearest, nearest_dist, runner_up, runner_dist = _nearest_two(unique_f, palette)
+
+        if dither:
+            # 颜色位于两个调色板颜色之间时，按到两者的距离决定选用次近颜色的比例
+            d1 = np.sqrt(nearest_dist)
+            d2 = np.sqrt(runner_dist)
+            mix = np.divide(d1, d1 + d2, out=np.zeros_like(d1), where=(d1 + d2) > 0)
+            threshold = np.tile(_BAYER_8X8, (height // 8 + 1, width // 8 + 1))[:height, :width].ravel()
+            use_second = threshold < mix[inverse]
+            indices = np.where(use_second, runner_up[inverse], nearest[inverse])
+        else:
+            indices = nearest[inverse]
+
+        logger.debug(f"Quantized {len(unique)} colors to {len(palette)}")
+
+    palette_u8 = np.clip(np.rint(palette), 0, 255).astype(np.uint8)
+    # Image.fromarray 的 mode 参数在 Pillow 11.3 起已弃用，直接按字节构造调色板图片
+    result = Image.frombytes('P', (width, height), indices.astype(np.uint8).tobytes())
+    result.putpalette(palette_u8[:, :3].tobytes())
+
+    alpha = palette_u8[:, 3]
+    if (alpha < 255).any():
+        result.info['transparency'] = alpha.tobytes()
+
+    return result
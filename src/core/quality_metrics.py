@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片质量评估模块
+
+提供基于 NumPy 向量化实现的 SSIM（结构相似度）计算：
+1. 只在亮度通道 (Y) 上计算，避免三通道重复开销
+2. 使用积分图实现的均值滤波窗口，复杂度与窗口大小无关
+3. 可选先对参考图与测试图做同比例降采样，进一步降低大图的计算成本
+"""
+
+import io
+import logging
+from typing import Callable, Optional, Tuple, Union
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('ImageStitcher.quality_metrics')
+
+# SSIM 常量（针对 8 位图像，L = 255）
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+SSIM_WINDOW = 7
+
+# 默认降采样后的最长边（像素），0 或 None 表示不降采样
+DEFAULT_SSIM_MAX_SIDE = 512
+
+
+def to_luminance(img: Image.Image, max_side: Optional[int] = DEFAULT_SSIM_MAX_SIDE) -> np.ndarray:
+    """将图片转换为亮度矩阵
+
+    透明区域按白色背景合成，与 JPEG 输出时的处理一致。
+
+    Args:
+        img: PIL Image 对象
+        max_side: 降采样后的最长边，None 或 0 表示保持原尺寸
+
+    Returns:
+        Float64 类型的 numpy 数组，形状为 (height, width)
+    """
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        bg = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(bg, rgba)
+
+    if img.mode != 'L':
+        img = img.convert('L')
+
+    if max_side and max(img.size) > max_side:
+        # 整数倍的盒式降采样，速度快且参考图与测试图得到完全一致的网格
+        factor = -(-max(img.size) // max_side)
+        img = img.reduce(factor)
+
+    return np.asarray(img, dtype=np.float64)
+
+
+def _box_mean(arr: np.ndarray, size: int) -> np.ndarray:
+    """使用积分图计算 size x size 窗口内的均值（valid 模式）"""
+    integral = np.zeros((arr.shape[0] + 1, arr.shape[1] + 1), dtype=np.float64)
+    np.cumsum(arr, axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    window_sum = (
+        integral[size:, size:]
+        - integral[:-size, size:]
+        - integral[size:, :-size]
+        + integral[:-size, :-size]
+    )
+    return window_sum / (size * size)
+
+
+def ssim_luminance(ref: np.ndarray, test: np.ndarray, window: int = SSIM_WINDOW) -> float:
+    """计算两个亮度矩阵之间的平均 SSIM
+
+    Args:
+        ref: 参考亮度矩阵
+        test: 待评估亮度矩阵（尺寸须与 ref 相同）
+        window: 均值窗口边长
+
+    Returns:
+        平均 SSIM，范围 [-1, 1]，1 表示完全一致
+    """
+    if ref.shape != test.shape:
+        raise ValueError(f"SSIM inputs must have the same shape: {ref.shape} vs {test.shape}")
+
+    # 图片太小无法放下一个完整窗口时，缩小窗口
+    window = max(1, min(window, ref.shape[0], ref.shape[1]))
+
+    c1 = (SSIM_K1 * 255) ** 2
+    c2 = (SSIM_K2 * 255) ** 2
+
+    mu_x = _box_mean(ref, window)
+    mu_y = _box_mean(test, window)
+    sigma_x = _box_mean(ref * ref, window) - mu_x * mu_x
+    sigma_y = _box_mean(test * test, window) - mu_y * mu_y
+    sigma_xy = _box_mean(ref * test, window) - mu_x * mu_y
+
+    numerator = (2 * mu_x * mu_y + c1) * (2 * sigma_xy + c2)
+    denominator = (mu_x * mu_x + mu_y * mu_y + c1) * (sigma_x + sigma_y + c2)
+
+    return float(np.mean(numerator / denominator))
+
+
+def compute_ssim(
+    reference: Union[Image.Image, np.ndarray],
+    test: Union[Image.Image, bytes],
+    max_side: Optional[int] = DEFAULT_SSIM_MAX_SIDE
+) -> float:
+    """计算参考图与测试图之间的 SSIM
+
+    Args:
+        reference: 参考图片，或已由 to_luminance 计算好的亮度矩阵（批量比较时可复用）
+        test: 待评估图片，或编码后的图片字节
+        max_side: 降采样后的最长边，None 或 0 表示不降采样
+
+    Returns:
+        平均 SSIM
+    """
+    if isinstance(reference, Image.Image):
+        reference = to_luminance(reference, max_side)
+
+    if isinstance(test, (bytes, bytearray)):
+        with Image.open(io.BytesIO(test)) as decoded:
+            test_lum = to_luminance(decoded, max_side)
+    else:
+        test_lum = to_luminance(test, max_side)
+
+    return ssim_luminance(reference, test_lum)
+
+
+def find_quality_for_ssim(
+    img: Image.Image,
+    encode: Callable[[Image.Image, int], bytes],
+    target_ssim: float,
+    min_quality: int = 10,
+    max_quality: int = 95,
+    max_side: Optional[int] = DEFAULT_SSIM_MAX_SIDE
+) -> Tuple[int, bytes, float]:
+    """二分查找满足目标 SSIM 的最低编码质量
+
+    假设 SSIM 随质量单调不减；若最高质量仍达不到目标，则返回最高质量的结果。
+
+    Args:
+        img: 待编码的图片（已完成缩放）
+        encode: 编码回调，参数为 (图片, 质量)，返回编码后的字节
+        target_ssim: 目标 SSIM
+        min_quality: 允许的最低质量
+        max_quality: 允许的最高质量
+        max_side: SSIM 计算时降采样后的最长边
+
+    Returns:
+        (质量, 编码字节, SSIM) 三元组
+    """
+    reference = to_luminance(img, max_side)
+    min_quality = max(1, min(min_quality, max_quality))
+
+    best: Optional[Tuple[int, bytes, float]] = None
+    fallback: Optional[Tuple[int, bytes, float]] = None
+    low, high = min_quality, max_quality
+
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(img, quality)
+        score = compute_ssim(reference, data, max_side)
+        logger.debug(f"SSIM search: quality={quality}, ssim={score:.4f}, bytes={len(data)}")
+
+        if score >= target_ssim:
+            best = (quality, data, score)
+            high = quality - 1
+        else:
+            if fallback is None or quality > fallback[0]:
+                fallback = (quality, data, score)
+            low = quality + 1
+
+    if best is not None:
+        return best
+
+    # 最高质量也达不到目标时，直接使用最高质量
+    if fallback is not None and fallback[0] == max_quality:
+        return fallback
+    data = encode(img, max_quality)
+    return max_quality, data, compute_ssim(reference, data, max_side)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+未压缩图片的内存映射读取模块
+
+BMP、未压缩 TIFF、PPM/PGM 的像素按行原样存放在文件中，Pillow 的文件头中给出了每段像素数据的
+偏移量、原始排列（rawmode）与行跨度。对这类文件：
+- 用 numpy.memmap 映射像素数据，按行跨度构造零拷贝的 (高, 宽, 通道) 视图，自下而上存放的 BMP 直接翻转视图
+- 裁剪时只读取区域覆盖的行与列，复制出的只有区域本身，峰值内存与原图大小无关；
+  通道顺序（BGR 等）由 Pillow 在构造区域图片时按 rawmode 转换，不额外复制
+- 映射成功时不做解压缩炸弹检查（不会整图解码），可以处理超过 Pillow 像素上限的扫描件
+其余格式或排列（压缩、按块存放的 TIFF、1 位或 16 位图片等）仍然交给 Pillow 正常打开和解码，
+像素上限检查照常生效。
+"""
+
+import os
+import math
+import logging
+from typing import List, Optional, Dict, Any, Tuple, Union
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('ImageStitcher.raw_mapping')
+
+# 可以映射的原始排列：rawmode -> (每像素字节数, 图片模式)
+RAW_LAYOUTS = {
+    'L': (1, 'L'),
+    'P': (1, 'P'),
+    'LA': (2, 'LA'),
+    'RGB': (3, 'RGB'),
+    'BGR': (3, 'RGB'),
+    'RGBX': (4, 'RGB'),
+    'BGRX': (4, 'RGB'),
+    'RGBA': (4, 'RGBA'),
+    'BGRA': (4, 'RGBA'),
+}
+
+# 支持映射的格式
+MAPPABLE_FORMATS = ('BMP', 'TIFF', 'PPM')
+
+# 生成代理图时采样的最长边
+PROXY_MAX_SIDE = 1024
+
+
+class MappedImage:
+    """内存映射的未压缩图片，提供与 PIL.Image 相同的尺寸属性与 crop()"""
+
+    def __init__(
+        self,
+        strips: List[Tuple[int, int, np.ndarray]],
+        size: Tuple[int, int],
+        mode: str,
+        rawmode: str,
+        format: str,
+        info: Dict[str, Any],
+        palette: Any = None
+    ):
+        """
+        Args:
+            strips: [(起始行, 结束行, (行数, 宽, 通道) 视图)]，按行排列
+            size: 图片尺寸
+            mode: 图片模式
+            rawmode: 文件中的像素排列，见 RAW_LAYOUTS
+            format: 文件格式
+            info: 图片信息（透明色等）
+            palette: 调色板（P 模式）
+        """
+        self.strips = strips
+        self.size = size
+        self.width, self.height = size
+        self.mode = mode
+        self.rawmode = rawmode
+        self.format = format
+        self.info = info
+        self.palette = palette
+
+    def __enter__(self) -> 'MappedImage':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """释放映射"""
+        self.strips = []
+
+    def _rows(self, top: int, bottom: int, left: int, right: int, step: int = 1) -> np.ndarray:
+        """取出 [top, bottom) 行、[left, right) 列的像素（跨越多个条带时拼接）"""
+        pieces = []
+        for start, end, view in self.strips:
+            lo, hi = max(top, start), min(bottom, end)
+            if lo >= hi:
+                continue
+            # 按步长采样时保持全局行号对齐
+            lo += (top - lo) % step
+            pieces.append(view[lo - start:hi - start:step, left:right:step])
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+    def _to_image(self, data: np.ndarray) -> Image.Image:
+        size = (data.shape[1], data.shape[0])
+        tile = Image.frombuffer(self.mode, size, np.ascontiguousarray(data), 'raw', self.rawmode, 0, 1)
+        if self.mode == 'P' and self.palette is not None:
+            tile.putpalette(self.palette)
+        tile.info.update(self.info)
+        return tile
+
+    def crop(self, box: Tuple[int, int, int, int]) -> Image.Image:
+        """裁剪区域，只读取区域覆盖的像素
+
+        Args:
+            box: (left, top, right, bottom)，超出图片的部分会被截掉
+
+        Returns:
+            区域图片
+        """
+        left, top, right, bottom = box
+        left, right = max(0, left), min(self.width, right)
+        top, bottom = max(0, top), min(self.height, bottom)
+        return self._to_image(self._rows(top, bottom, left, right))
+
+    def proxy(self, max_side: int = PROXY_MAX_SIDE) -> Image.Image:
+        """隔行隔列采样得到的缩略图，用于自动选择输出格式等只需要概览的场合"""
+        step = max(1, math.ceil(max(self.size) / max_side))
+        return self._to_image(self._rows(0, self.height, 0, self.width, step))
+
+
+def _open_header(path: str) -> Image.Image:
+    """只读取文件头（供 open_mapped 判断能否映射）
+
+    超过 Pillow 像素上限时按扩展名直接用对应的插件打开；只有确认可以映射时才会使用该结果，
+    不能映射的文件由调用方重新用 Image.open 打开，仍受像素上限检查。
+    """
+    try:
+        return Image.open(path)
+    except Image.DecompressionBombError:
+        fmt = Image.registered_extensions().get(os.path.splitext(path)[1].lower())
+        if fmt not in MAPPABLE_FORMATS or fmt not in Image.OPEN:
+            raise
+        return Image.OPEN[fmt][0](path)
+
+
+def open_mapped(path: str) -> Optional[MappedImage]:
+    """尝试以内存映射方式打开图片
+
+    Args:
+        path: 图片路径
+
+    Returns:
+        MappedImage；不是可映射的未压缩排列时返回 None
+    """
+    try:
+        img = _open_header(path)
+    except Exception:
+        return None
+
+    with img:
+        if img.format not in MAPPABLE_FORMATS or not img.tile:
+            return None
+        width, height = img.size
+        layout = None
+        strips = []
+        file_size = os.path.getsize(path)
+        for tile in img.tile:
+            # Pillow 10 的 tile 是普通元组，11 起为同样排列的具名元组，按位置取值兼容两者
+            codec_name, extents, offset, args = tuple(tile)[:4]
+            args = (args,) if isinstance(args, str) else tuple(args or ())
+            if not args:
+                return None
+            rawmode = args[0]
+            stride = args[1] if len(args) > 1 else 0
+            orientation = args[2] if len(args) > 2 else 1
+            x0, y0, x1, y1 = extents
+            if codec_name != 'raw' or rawmode not in RAW_LAYOUTS or (x0, x1) != (0, width):
+                return None
+            if layout is not None and layout != rawmode:
+                return None
+            layout = rawmode
+            bpp, mode = RAW_LAYOUTS[rawmode]
+            if mode != img.mode:
+                return None
+            stride = stride or width * bpp
+            rows = y1 - y0
+            if offset + stride * (rows - 1) + width * bpp > file_size:
+                # 文件被截断，交给 Pillow 报告错误
+                return None
+
+            length = stride * rows if offset + stride * rows <= file_size else file_size - offset
+            mapped = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(length,))
+            view = np.ndarray((rows, width, bpp), np.uint8, buffer=mapped, strides=(stride, bpp, 1))
+            if orientation < 0:
+                # 自下而上存放
+                view = view[::-1]
+            strips.append((y0, y1, view))
+
+        mode = RAW_LAYOUTS[layout][1]
+        strips.sort(key=lambda s: s[0])
+        info = {}
+        if 'transparency' in img.info:
+            info['transparency'] = img.info['transparency']
+        palette = img.palette if mode == 'P' else None
+        logger.info(f"内存映射读取 {path}: {width}x{height} {layout}，{len(strips)} 个条带")
+        return MappedImage(strips, (width, height), mode, layout, img.format, info, palette)
+
+
+def open_for_crop(path: str) -> Union[MappedImage, Image.Image]:
+    """打开需要裁剪的图片：未压缩排列时内存映射，否则用 Pillow 打开（受像素上限检查）"""
+    return open_mapped(path) or Image.open(path)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+率失真扫描模块
+
+每张图片只解码、缩放一次，然后在内存中按多个质量和格式并行编码，
+统计每个点的输出体积与 SSIM，生成每张图片的曲线以及整体汇总（CSV/JSON），
+用于挑选统一的压缩质量，过程中不写出任何中间图片。
+"""
+
+import os
+import csv
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+from PIL import Image
+from PySide6.QtCore import QThread, Signal
+
+from .image_processor import convert_to_rgb, encode_image, unique_output_stems
+from .quality_metrics import compute_ssim, to_luminance
+from .encoder_profiles import DEFAULT_ENCODER_PRESET
+
+logger = logging.getLogger('ImageStitcher.rd_sweep')
+
+DEFAULT_SWEEP_QUALITIES = [40, 50, 60, 70, 75, 80, 85, 90, 95]
+DEFAULT_SWEEP_FORMATS = ['JPEG', 'WEBP']
+
+CURVE_FIELDS = ['format', 'quality', 'bytes', 'bpp', 'ssim']
+SUMMARY_FIELDS = ['format', 'quality', 'images', 'bytes', 'bpp', 'ssim', 'min_ssim']
+
+
+def _write_curve(points: List[Dict[str, Any]], base_path: str, fields: List[str] = CURVE_FIELDS) -> Dict[str, str]:
+    """将曲线数据写出为 CSV 与 JSON
+
+    Args:
+        points: 曲线上的点
+        base_path: 不含扩展名的输出路径
+        fields: CSV 的列
+
+    Returns:
+        包含 csv、json 路径的字典
+    """
+    csv_path = base_path + '.csv'
+    json_path = base_path + '.json'
+
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(points)
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(points, f, ensure_ascii=False, indent=2)
+
+    return {'csv': csv_path, 'json': json_path}
+
+
+def aggregate_curves(curves: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """汇总多张图片的曲线
+
+    Args:
+        curves: 每张图片的曲线
+
+    Returns:
+        按 (格式, 质量) 汇总后的点，包含总字节数、平均 bpp、平均与最小 SSIM
+    """
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for points in curves:
+        for point in points:
+            groups.setdefault((point['format'], point['quality']), []).append(point)
+
+    summary = []
+    for (fmt, quality), points in sorted(groups.items()):
+        ssim_values = [p['ssim'] for p in points]
+        summary.append({
+            'format': fmt,
+            'quality': quality,
+            'images': len(points),
+            'bytes': sum(p['bytes'] for p in points),
+            'bpp': sum(p['bpp'] for p in points) / len(points),
+            'ssim': sum(ssim_values) / len(ssim_values),
+            'min_ssim': min(ssim_values)
+        })
+    return summary
+
+
+class RateDistortionSweepThread(QThread):
+    """率失真扫描线程"""
+    progress = Signal(int)
+    status = Signal(str)
+    finished = Signal(list)
+    error = Signal(str)
+
+    def __init__(
+        self,
+        image_files: List[str],
+        output_dir: str,
+        qualities: Optional[List[int]] = None,
+        formats: Optional[List[str]] = None,
+        scale: int = 100,
+        max_workers: Optional[int] = None,
+        encoder_preset: str = DEFAULT_ENCODER_PRESET
+    ):
+        super().__init__()
+        self.image_files = image_files
+        self.output_dir = output_dir
+        self.qualities = qualities or DEFAULT_SWEEP_QUALITIES
+        self.formats = formats or DEFAULT_SWEEP_FORMATS
+        self.scale = scale
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.encoder_preset = encoder_preset
+
+    def run(self) -> None:
+        try:
+            results: List[Dict[str, Any]] = []
+            curves: List[List[Dict[str, Any]]] = []
+            total = len(self.image_files)
+
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            sweep_dir = os.path.join(self.output_dir, f"rd_sweep_{timestamp}")
+            os.makedirs(sweep_dir, exist_ok=True)
+            # 同名的输入（不同目录或不同扩展名）使用不同的前缀，避免曲线文件互相覆盖
+            stems = unique_output_stems(self.image_files)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for i, filepath in enumerate(self.image_files):
+                    self.status.emit(f"正在扫描 {i+1}/{total}: {os.path.basename(filepath)}")
+
+                    points = self._sweep_image(filepath, executor)
+                    curves.append(points)
+
+                    paths = _write_curve(points, os.path.join(sweep_dir, f"{stems[i]}_rd_curve"))
+                    results.append({
+                        'input': filepath,
+                        'output_folder': sweep_dir,
+                        'curve': points,
+                        'csv': paths['csv'],
+                        'json': paths['json']
+                    })
+
+                    self.progress.emit(int((i + 1) / total * 95))
+
+            summary = aggregate_curves(curves)
+            _write_curve(summary, os.path.join(sweep_dir, "rd_sweep_summary"), SUMMARY_FIELDS)
+
+            self.progress.emit(100)
+            self.finished.emit(results)
+
+        except Exception as e:
+            logger.error(f"RateDistortionSweepThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
+
+    def _sweep_image(self, filepath: str, executor: ThreadPoolExecutor) -> List[Dict[str, Any]]:
+        """对单张图片执行扫描：一次解码与缩放，多点并行编码"""
+        with Image.open(filepath) as img:
+            img.load()
+            if self.scale < 100:
+                new_width = max(1, int(img.width * self.scale / 100))
+                new_height = max(1, int(img.height * self.scale / 100))
+                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            else:
+                img = img.copy()
+
+        pixels = img.width * img.height
+        reference = to_luminance(img)
+
+        # 每种格式只准备一次输入图，避免各线程重复做模式转换
+        sources = {fmt: convert_to_rgb(img) if fmt == 'JPEG' else img for fmt in self.formats}
+
+        def encode_point(fmt: str, quality: int) -> Dict[str, Any]:
+            data = encode_image(sources[fmt], fmt, quality, preset=self.encoder_preset)
+            return {
+                'format': fmt,
+                'quality': quality,
+                'bytes': len(data),
+                'bpp': len(data) * 8 / pixels,
+                'ssim': compute_ssim(reference, data)
+            }
+
+        futures = [
+            executor.submit(encode_point, fmt, quality)
+            for fmt in self.formats
+            for quality in self.qualities
+        ]
+        return [future.result() for future in futures]
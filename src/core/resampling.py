@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩放算法选择模块
+
+提供 最近邻 / 双线性 / 双三次 / Lanczos / 自动 五种缩放策略。自动策略按缩放比例和输出尺寸选择：
+- 放大：双三次（Lanczos 放大时振铃更明显，且更慢）
+- 轻度缩小（不小于原图的一半）：Lanczos，与此前的默认行为一致
+- 大幅缩小：Lanczos 并设置 reducing_gap，先用整数倍的盒式缩小 (reduce) 快速降到目标尺寸的几倍，
+  再做精确重采样；输出为缩略图时改用双三次与更小的 reducing_gap
+- JPEG 源图大幅缩小时，解码前调用 draft() 让 libjpeg 直接以 1/2、1/4、1/8 的尺寸解码
+
+另外提供缩放到目标框时的几何计算（拉伸 / 适应 / 填充裁剪 / 补边），只依赖文件头中的尺寸。
+"""
+
+from typing import Optional, Tuple, Dict, Any
+from PIL import Image
+
+RESAMPLE_POLICIES = ('nearest', 'bilinear', 'bicubic', 'lanczos', 'auto')
+DEFAULT_RESAMPLE = 'auto'
+
+RESAMPLE_FILTERS = {
+    'nearest': Image.Resampling.NEAREST,
+    'bilinear': Image.Resampling.BILINEAR,
+    'bicubic': Image.Resampling.BICUBIC,
+    'lanczos': Image.Resampling.LANCZOS,
+}
+
+# 缩小到原图的该比例以下视为大幅缩小
+STRONG_DOWNSCALE_RATIO = 0.5
+# 输出最长边不超过该值视为缩略图
+THUMBNAIL_MAX_SIDE = 400
+# 缩放到目标框的方式：拉伸（不保持比例）、适应（完整放入框内）、填充（居中裁剪后铺满）、补边（适应后居中补边）
+FIT_MODES = ('stretch', 'fit', 'fill', 'pad')
+DEFAULT_FIT_MODE = 'pad'
+
+# 大幅缩小时的 reducing_gap（越大越接近完整重采样，越小越快）
+REDUCING_GAP = 3.0
+THUMBNAIL_REDUCING_GAP = 2.0
+
+
+def reducible_image(img: Image.Image) -> Image.Image:
+    """转换为可以用 reduce() 按整数倍缩小的模式
+
+    reduce() 不支持 1、I;16 等模式；调色板图片虽然 PA 模式不报错，但会对调色板索引求平均，
+    同样需要先转换为真彩色。其余模式原样返回。
+    """
+    if img.mode in ('P', 'PA'):
+        return img.convert('RGBA' if img.mode == 'PA' or 'transparency' in img.info else 'RGB')
+    if img.mode == '1' or img.mode.startswith('I;16'):
+        return img.convert('L')
+    return img
+
+
+def _scale_ratio(src_size: Tuple[int, int], dst_size: Tuple[int, int]) -> float:
+    """目标尺寸相对原图的缩放比例（取两个方向中较大的一个）"""
+    return max(dst_size[0] / src_size[0], dst_size[1] / src_size[1])
+
+
+def resolve_resample(
+    policy: str,
+    src_size: Tuple[int, int],
+    dst_size: Tuple[int, int]
+) -> Tuple[Image.Resampling, Optional[float]]:
+    """根据缩放策略确定重采样滤波器与 reducing_gap
+
+    Args:
+        policy: 缩放策略，见 RESAMPLE_POLICIES
+        src_size: 原图尺寸
+        dst_size: 目标尺寸
+
+    Returns:
+        (滤波器, reducing_gap)，reducing_gap 为 None 表示完整重采样
+    """
+    if policy in RESAMPLE_FILTERS:
+        return RESAMPLE_FILTERS[policy], None
+
+    ratio = _scale_ratio(src_size, dst_size)
+    if ratio > 1:
+        return Image.Resampling.BICUBIC, None
+    if ratio >= STRONG_DOWNSCALE_RATIO:
+        return Image.Resampling.LANCZOS, None
+    if max(dst_size) <= THUMBNAIL_MAX_SIDE:
+        return Image.Resampling.BICUBIC, THUMBNAIL_REDUCING_GAP
+    return Image.Resampling.LANCZOS, REDUCING_GAP
+
+
+def apply_draft(img: Image.Image, dst_size: Tuple[int, int], policy: str = DEFAULT_RESAMPLE) -> None:
+    """自动策略下，对将被大幅缩小的 JPEG 图片启用 DCT 域缩小解码
+
+    必须在图片解码（load、resize 等）之前调用。解码尺寸至少保留目标尺寸的两倍，
+    之后的 resize 仍会精确缩放到目标尺寸。
+
+    Args:
+        img: 刚打开、尚未解码的图片
+        dst_size: 最终的目标尺寸
+        policy: 缩放策略
+    """
+    if policy != 'auto' or img.format != 'JPEG':
+        return
+    if _scale_ratio(img.size, dst_size) >= STRONG_DOWNSCALE_RATIO:
+        return
+    img.draft(img.mode, (dst_size[0] * 2, dst_size[1] * 2))
+
+
+def resize_image(
+    img: Image.Image,
+    size: Tuple[int, int],
+    policy: str = DEFAULT_RESAMPLE,
+    box: Optional[Tuple[float, float, float, float]] = None
+) -> Image.Image:
+    """按缩放策略调整图片尺寸
+
+    Args:
+        img: PIL Image 对象
+        size: 目标尺寸
+        policy: 缩放策略，见 RESAMPLE_POLICIES
+        box: 只缩放的源图区域 (left, top, right, bottom)，None 表示整张图片
+
+    Returns:
+        缩放后的图片；尺寸相同且不裁剪时直接返回原图
+    """
+    if box is None or tuple(box) == (0, 0, img.width, img.height):
+        if img.size == tuple(size):
+            return img
+        box = None
+    src_size = img.size if box is None else (box[2] - box[0], box[3] - box[1])
+    resample, reducing_gap = resolve_resample(policy, src_size, size)
+    return img.resize(size, resample, box=box, reducing_gap=reducing_gap)
+
+
+def compute_geometry(
+    src_size: Tuple[int, int],
+    target_size: Tuple[int, int],
+    fit_mode: str = DEFAULT_FIT_MODE
+) -> Dict[str, Any]:
+    """计算把图片缩放到目标框的几何参数
+
+    Args:
+        src_size: 原图尺寸（来自文件头即可，无需解码）
+        target_size: 目标框尺寸
+        fit_mode: 缩放方式，见 FIT_MODES
+
+    Returns:
+        字典，包含：
+        - box: 参与缩放的源图区域 (left, top, right, bottom)，填充模式下为居中裁剪区域
+        - size: 缩放后的尺寸
+        - canvas: 输出图片尺寸（补边模式下大于 size）
+        - offset: 缩放结果在画布中的位置
+    """
+    src_w, src_h = src_size
+    dst_w, dst_h = target_size
+    box = (0, 0, src_w, src_h)
+    size = (dst_w, dst_h)
+
+    if fit_mode in ('fit', 'pad'):
+        scale = min(dst_w / src_w, dst_h / src_h)
+        size = (max(1, min(dst_w, round(src_w * scale))), max(1, min(dst_h, round(src_h * scale))))
+    elif fit_mode == 'fill':
+        # 按目标比例在源图中取居中区域，只缩放这部分像素
+        scale = max(dst_w / src_w, dst_h / src_h)
+        crop_w = min(src_w, dst_w / scale)
+        crop_h = min(src_h, dst_h / scale)
+        left = (src_w - crop_w) / 2
+        top = (src_h - crop_h) / 2
+        box = (left, top, left + crop_w, top + crop_h)
+    elif fit_mode != 'stretch':
+        raise ValueError(f"未知的缩放方式: {fit_mode}")
+
+    canvas = (dst_w, dst_h) if fit_mode == 'pad' else size
+    offset = ((canvas[0] - size[0]) // 2, (canvas[1] - size[1]) // 2)
+    return {'box': box, 'size': size, 'canvas': canvas, 'offset': offset}
+
+
+def scale_box(
+    box: Tuple[float, float, float, float],
+    src_size: Tuple[int, int],
+    img_size: Tuple[int, int]
+) -> Tuple[float, float, float, float]:
+    """将按文件头尺寸计算的区域换算到 draft() 之后的实际尺寸"""
+    if tuple(src_size) == tuple(img_size):
+        return box
+    sx = img_size[0] / src_size[0]
+    sy = img_size[1] / src_size[1]
+    return (box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy)
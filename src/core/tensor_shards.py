@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+张量分片导出模块
+
+把尺寸一致的瓦片或缩放结果直接写入 (N, H, W, C) 的 uint8 .npy 分片，而不是逐个编码为图片文件：
+- 每个分片用 numpy.lib.format.open_memmap 创建为内存映射文件，写入时不在内存中累积整批数据
+- 单个分片不超过 SHARD_MAX_BYTES，样本总数预先由文件头算出，每个分片的大小在创建时即确定
+- 同目录下的 index.csv / index.json 记录每个样本所在的分片、分片内下标、来源路径与位置
+
+下游读取时可以直接 np.load(path, mmap_mode='r')，无需任何解码。
+"""
+
+import os
+import csv
+import json
+import logging
+from typing import List, Optional, Dict, Any, Tuple
+import numpy as np
+from PIL import Image
+
+from .image_processor import convert_to_rgb
+
+logger = logging.getLogger('ImageStitcher.tensor_shards')
+
+# 输出方式："files" 逐个编码为图片文件；"npy" 写入 .npy 分片
+OUTPUT_CONTAINERS = ('files', 'npy')
+
+# 单个分片的字节上限
+SHARD_MAX_BYTES = 1024 * 1024 * 1024
+
+# 索引中每个样本的基本字段（调用方可附加位置等字段）
+INDEX_FIELDS = ['sample', 'shard', 'offset', 'source']
+
+CHANNEL_COUNTS = {'L': 1, 'RGB': 3, 'RGBA': 4}
+
+
+def choose_channels(modes: List[str]) -> str:
+    """按源图模式确定统一的通道格式：全为灰度时用 L，任一带透明度时用 RGBA，否则用 RGB"""
+    if modes and all(mode in ('L', '1') for mode in modes):
+        return 'L'
+    if any(mode in ('RGBA', 'LA', 'PA') for mode in modes):
+        return 'RGBA'
+    return 'RGB'
+
+
+def source_mode(img: Image.Image) -> str:
+    """只读取文件头判断图片的通道情况，带 transparency 的调色板图片视为带透明度"""
+    if img.mode == 'P' and 'transparency' in img.info:
+        return 'PA'
+    return img.mode
+
+
+def to_channels(img: Image.Image, channels: str) -> Image.Image:
+    """将图片转换为指定通道格式（转为 RGB 时透明区域合成到白色背景上）"""
+    if img.mode == channels:
+        return img
+    if channels == 'RGB':
+        img = convert_to_rgb(img)
+        return img if img.mode == 'RGB' else img.convert('RGB')
+    return img.convert(channels)
+
+
+class TensorShardWriter:
+    """按顺序把样本写入内存映射的 .npy 分片"""
+
+    def __init__(
+        self,
+        folder: str,
+        prefix: str,
+        total: int,
+        sample_shape: Tuple[int, int],
+        channels: str = 'RGB',
+        shard_max_bytes: int = SHARD_MAX_BYTES
+    ):
+        """
+        Args:
+            folder: 输出目录
+            prefix: 分片文件名前缀
+            total: 样本总数
+            sample_shape: 单个样本的 (高, 宽)
+            channels: 通道格式，见 CHANNEL_COUNTS
+            shard_max_bytes: 单个分片的字节上限
+        """
+        self.folder = folder
+        self.prefix = prefix
+        self.total = total
+        self.channels = channels
+        self.shape = (sample_shape[0], sample_shape[1], CHANNEL_COUNTS[channels])
+        sample_bytes = int(np.prod(self.shape))
+        self.shard_size = max(1, shard_max_bytes // sample_bytes)
+        self.shards: List[Dict[str, Any]] = []
+        self.entries: List[Dict[str, Any]] = []
+        self._current: Optional[np.memmap] = None
+        self._offset = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def add(self, img: Image.Image, meta: Optional[Dict[str, Any]] = None) -> None:
+        """写入一个样本
+
+        Args:
+            img: 与 sample_shape 尺寸一致的图片
+            meta: 写入索引的附加字段（source、位置等）
+        """
+        if len(self.entries) >= self.total:
+            raise ValueError("样本数超过预先计算的总数")
+        if img.size != (self.shape[1], self.shape[0]):
+            raise ValueError(f"样本尺寸 {img.width}x{img.height} 与分片尺寸 {self.shape[1]}x{self.shape[0]} 不一致")
+
+        if self._current is None or self._offset >= len(self._current):
+            self._open_next_shard()
+        arr = np.asarray(to_channels(img, self.channels))
+        self._current[self._offset] = arr.reshape(self.shape)
+
+        entry = {
+            'sample': len(self.entries),
+            'shard': self.shards[-1]['file'],
+            'offset': self._offset
+        }
+        entry.update(meta or {})
+        self.entries.append(entry)
+        self._offset += 1
+
+    def _open_next_shard(self) -> None:
+        self._flush()
+        count = min(self.shard_size, self.total - len(self.entries))
+        filename = f"{self.prefix}_{len(self.shards):05d}.npy"
+        self._current = np.lib.format.open_memmap(
+            os.path.join(self.folder, filename), mode='w+', dtype=np.uint8, shape=(count,) + self.shape
+        )
+        self._offset = 0
+        self.shards.append({'file': filename, 'samples': count})
+
+    def _flush(self) -> None:
+        if self._current is not None:
+            self._current.flush()
+            # 释放映射，已写完的分片不再占用地址空间
+            self._current = None
+
+    def close(self, info: Optional[Dict[str, Any]] = None, extra_fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """结束写入并写出索引
+
+        Args:
+            info: 写入 index.json 的附加信息
+            extra_fields: index.csv 中 INDEX_FIELDS 之后的字段
+
+        Returns:
+            包含 folder、shards、samples、csv、json 的字典
+        """
+        self._flush()
+        if len(self.entries) != self.total:
+            raise ValueError(f"只写入了 {len(self.entries)}/{self.total} 个样本")
+
+        csv_path = os.path.join(self.folder, 'index.csv')
+        json_path = os.path.join(self.folder, 'index.json')
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS + (extra_fields or []), extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.entries)
+
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(
+                info or {},
+                layout='NHWC',
+                dtype='uint8',
+                channels=self.channels,
+                sample_shape=list(self.shape),
+                shards=self.shards,
+                samples=self.entries
+            ), f, ensure_ascii=False, indent=2)
+
+        return {
+            'folder': self.folder,
+            'shards': [s['file'] for s in self.shards],
+            'samples': len(self.entries),
+            'csv': csv_path,
+            'json': json_path
+        }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块内容分析模块
+
+在编码之前分析等分得到的图片块，避免写出大量空白或重复的文件：
+- 空白块：按行带读取像素，用 numpy.add.reduceat 一次算出同一行所有块每个通道的和与平方和，
+  得到各块的标准差；像素保持 uint8，平方和按列分段查平方表（uint16）累加，不生成 8 字节的整带副本；所有通道的标准差都不超过阈值（或完全透明）的块视为空白
+- 重复块：按像素哈希（包含模式与尺寸）判断，重复块指向第一次出现的块的文件
+- 分析结果写入分块文件夹中的 manifest.json，记录每个位置实际对应的文件
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import List, Optional, Dict, Any
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('ImageStitcher.tile_analysis')
+
+# 空白判定的默认阈值（各通道像素值的标准差，0-255）
+DEFAULT_BLANK_THRESHOLD = 2.0
+
+# 每次读取的最大行数，限制统计时的临时内存
+STATS_ROWS = 256
+
+# 计算平方和时每段的列数，平方值的临时数组只覆盖这些列
+STATS_COLUMNS = 1024
+
+# 0-255 的平方表，最大值 65025 可以放进 uint16
+_SQUARES = (np.arange(256, dtype=np.uint32) ** 2).astype(np.uint16)
+
+# 分块清单的文件名
+SPLIT_MANIFEST = 'manifest.json'
+
+
+def tile_hash(tile: Image.Image) -> str:
+    """瓦片像素的哈希（包含模式与尺寸）"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{tile.mode}{tile.size}".encode())
+    digest.update(tile.tobytes())
+    return digest.hexdigest()
+
+
+def _stats_image(img: Image.Image) -> Image.Image:
+    """转换为可按通道统计的模式（调色板等模式转为 RGB / RGBA）"""
+    if img.mode in ('L', 'LA', 'RGB', 'RGBA'):
+        return img
+    if img.mode in ('PA', 'RGBa') or 'transparency' in img.info:
+        return img.convert('RGBA')
+    if img.mode in ('1', 'I', 'I;16', 'F'):
+        return img.convert('L')
+    return img.convert('RGB')
+
+
+def blank_blocks(
+    img: Image.Image,
+    xs: List[int],
+    ys: List[int],
+    threshold: float = DEFAULT_BLANK_THRESHOLD
+) -> List[List[Optional[List[int]]]]:
+    """找出网格中的空白块
+
+    Args:
+        img: 图片（PIL.Image 或 raw_mapping.MappedImage，只使用 crop() 与尺寸）
+        xs: 每一列块的起点（升序，第一个为 0），最后一列延伸到图片右边缘
+        ys: 每一行块的起点（升序，第一个为 0），最后一行延伸到图片下边缘
+        threshold: 各通道标准差的上限
+
+    Returns:
+        [行][列] 的二维列表；空白块为其平均颜色（各通道取整），非空白块为 None
+    """
+    bands = list(zip(ys, ys[1:] + [img.height]))
+    starts = np.asarray(xs)
+    widths = np.diff(np.append(starts, img.width))
+    has_alpha = False
+
+    result = []
+    for top, bottom in bands:
+        sums = None
+        squares = None
+        for y in range(top, bottom, STATS_ROWS):
+            # 逐行带转换模式，调色板图片不需要整图转换；img 也可以是 raw_mapping.MappedImage
+            band = _stats_image(img.crop((0, y, img.width, min(y + STATS_ROWS, bottom))))
+            has_alpha = band.mode in ('LA', 'RGBA')
+            band = np.asarray(band)
+            band = band.reshape(band.shape[0], band.shape[1], -1)
+            # 先按列求和，再把相邻列合并为块；一列最多 STATS_ROWS 个像素，uint32 不会溢出
+            column_sums = band.sum(axis=0, dtype=np.uint32)
+            column_squares = np.empty(column_sums.shape, dtype=np.uint32)
+            for x in range(0, band.shape[1], STATS_COLUMNS):
+                chunk = band[:, x:x + STATS_COLUMNS]
+                column_squares[x:x + STATS_COLUMNS] = _SQUARES[chunk].sum(axis=0, dtype=np.uint32)
+            column_sums = column_sums.astype(np.uint64)
+            column_squares = column_squares.astype(np.uint64)
+            block_sums = np.add.reduceat(column_sums, starts, axis=0)
+            block_squares = np.add.reduceat(column_squares, starts, axis=0)
+            sums = block_sums if sums is None else sums + block_sums
+            squares = block_squares if squares is None else squares + block_squares
+
+        counts = (widths * (bottom - top)).astype(np.float64)[:, None]
+        means = sums / counts
+        variances = np.maximum(squares / counts - means * means, 0)
+        uniform = np.sqrt(variances).max(axis=1) <= threshold
+        if has_alpha:
+            # 完全透明的块不论颜色通道如何都视为空白
+            uniform |= sums[:, -1] == 0
+
+        result.append([
+            [int(round(v)) for v in means[i]] if uniform[i] else None
+            for i in range(len(xs))
+        ])
+    return result
+
+
+def write_split_manifest(folder: str, entries: List[Dict[str, Any]], info: Dict[str, Any]) -> str:
+    """写出分块清单
+
+    Args:
+        folder: 分块文件夹
+        entries: 每个位置的记录（row、col、status、file 等）
+        info: 附加信息（源文件、行列数、阈值等）
+
+    Returns:
+        清单路径
+    """
+    path = os.path.join(folder, SPLIT_MANIFEST)
+    summary = {
+        status: sum(1 for e in entries if e['status'] == status)
+        for status in ('written', 'blank', 'duplicate', 'skipped')
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(info, summary=summary, tiles=entries), f, ensure_ascii=False, indent=2)
+    return path
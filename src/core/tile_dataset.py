@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+固定尺寸瓦片导出模块（用于机器学习数据集）
+
+按固定瓦片尺寸与步长滑窗切分图片（步长小于瓦片尺寸时相邻瓦片重叠），不受行列数上限限制：
+- 边缘处理：补零（pad）、镜像补边（reflect）、最后一块贴边对齐（shift）或丢弃不完整的瓦片（drop）
+- 每张图片只解码一次，瓦片按需裁剪后提交到线程池编码；排队中的瓦片数有上限，内存占用与瓦片总数无关
+- 每张图片输出 manifest.csv / manifest.json 瓦片索引，记录每块瓦片在原图中的位置与有效区域
+- 也可以不编码图片，把全部图片的瓦片写入同一组 (N, H, W, C) .npy 分片（见 tensor_shards）
+"""
+
+import os
+import csv
+import json
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Optional, Dict, Any, Tuple, Callable, Iterator
+import numpy as np
+from PIL import Image
+from PySide6.QtCore import QThread, Signal, QMutex, QWaitCondition
+
+from .image_processor import (
+    get_output_format, get_file_extension, encode_image, write_bytes,
+    choose_auto_format, convert_to_rgb, AUTO_FORMAT
+)
+from .encoder_profiles import DEFAULT_ENCODER_PRESET
+from .tensor_shards import TensorShardWriter, choose_channels, source_mode, to_channels
+
+logger = logging.getLogger('ImageStitcher.tile_dataset')
+
+EDGE_MODES = ('pad', 'reflect', 'shift', 'drop')
+DEFAULT_EDGE_MODE = 'pad'
+DEFAULT_DATASET_TILE_SIZE = 512
+
+# 瓦片索引的字段
+MANIFEST_FIELDS = ['file', 'source', 'row', 'col', 'x', 'y', 'width', 'height', 'padded']
+
+
+def tile_starts(length: int, tile_size: int, stride: int, edge_mode: str = DEFAULT_EDGE_MODE) -> List[int]:
+    """计算一个方向上所有瓦片的起点
+
+    Args:
+        length: 图片在该方向上的长度
+        tile_size: 瓦片边长
+        stride: 步长
+        edge_mode: 边缘处理方式，见 EDGE_MODES
+
+    Returns:
+        起点列表；drop 模式下图片小于瓦片时为空
+    """
+    count = math.ceil(max(length - tile_size, 0) / stride) + 1
+    starts = [i * stride for i in range(count)]
+    if edge_mode == 'drop':
+        return [s for s in starts if s + tile_size <= length]
+    if edge_mode == 'shift' and length >= tile_size:
+        # 最后一块向内移动，与前一块的重叠更多，但不需要补边
+        starts[-1] = min(starts[-1], length - tile_size)
+        if len(starts) > 1 and starts[-1] == starts[-2]:
+            starts.pop()
+    return starts
+
+
+def iter_tiles(
+    img: Image.Image,
+    tile_size: int,
+    stride: int,
+    edge_mode: str = DEFAULT_EDGE_MODE
+) -> Iterator[Tuple[int, int, int, int, Image.Image, int, int]]:
+    """逐块裁剪瓦片（按行优先顺序，按需生成）
+
+    Args:
+        img: 已解码的图片
+        tile_size: 瓦片边长
+        stride: 步长
+        edge_mode: 边缘处理方式
+
+    Yields:
+        (行, 列, x, y, 瓦片, 有效宽度, 有效高度)，不完整的瓦片已补边到 tile_size
+    """
+    xs = tile_starts(img.width, tile_size, stride, edge_mode)
+    ys = tile_starts(img.height, tile_size, stride, edge_mode)
+    for row, y in enumerate(ys):
+        for col, x in enumerate(xs):
+            valid_w = min(tile_size, img.width - x)
+            valid_h = min(tile_size, img.height - y)
+            tile = img.crop((x, y, x + valid_w, y + valid_h))
+            if (valid_w, valid_h) != (tile_size, tile_size):
+                tile = pad_tile(tile, tile_size, edge_mode)
+            yield row, col, x, y, tile, valid_w, valid_h
+
+
+def pad_tile(tile: Image.Image, tile_size: int, edge_mode: str = DEFAULT_EDGE_MODE) -> Image.Image:
+    """将不完整的瓦片补边到 tile_size（reflect 镜像补边，其余补零）"""
+    if edge_mode == 'reflect':
+        arr = np.asarray(tile)
+        pad = ((0, tile_size - tile.height), (0, tile_size - tile.width)) + ((0, 0),) * (arr.ndim - 2)
+        # symmetric 在补边超过瓦片本身时仍然可用
+        data = np.pad(arr, pad, mode='symmetric')
+        # Image.fromarray 的 mode 参数已弃用；'1' 模式的数组是布尔值，其余模式按原始字节构造
+        if tile.mode == '1':
+            padded = Image.fromarray(data)
+        else:
+            padded = Image.frombytes(tile.mode, (tile_size, tile_size), data.tobytes())
+        if tile.mode == 'P':
+            padded.putpalette(tile.getpalette())
+        return padded
+
+    padded = Image.new(tile.mode, (tile_size, tile_size))
+    if tile.mode == 'P':
+        padded.putpalette(tile.getpalette())
+    padded.paste(tile, (0, 0))
+    return padded
+
+
+def write_manifest(entries: List[Dict[str, Any]], folder: str, info: Dict[str, Any]) -> Dict[str, str]:
+    """写出瓦片索引（CSV 只含瓦片列表，JSON 另含切分参数）
+
+    Returns:
+        包含 csv、json 路径的字典
+    """
+    csv_path = os.path.join(folder, 'manifest.csv')
+    json_path = os.path.join(folder, 'manifest.json')
+
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(entries)
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(info, tiles=entries), f, ensure_ascii=False, indent=2)
+
+    return {'csv': csv_path, 'json': json_path}
+
+
+class TileDatasetThread(QThread):
+    """固定尺寸瓦片导出线程
+
+    多张图片依次处理，共用一个编码线程池；排队中的瓦片不超过 max_workers * 2 块。
+    """
+    progress = Signal(int)
+    status = Signal(str)
+    finished = Signal(list)
+    error = Signal(str)
+    overwrite_request = Signal(str)
+
+    def __init__(
+        self,
+        image_files: List[str],
+        output_dir: Optional[str],
+        tile_size: int = DEFAULT_DATASET_TILE_SIZE,
+        stride: Optional[int] = None,
+        edge_mode: str = DEFAULT_EDGE_MODE,
+        quality: int = 95,
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        max_workers: Optional[int] = None,
+        container: str = 'files'
+    ):
+        super().__init__()
+        self.image_files = image_files
+        # 为空时输出到每张图片所在的目录（npy 分片输出到第一张图片所在的目录）
+        self.output_dir = output_dir
+        self.tile_size = tile_size
+        # 步长小于瓦片尺寸时相邻瓦片重叠 tile_size - stride 像素
+        self.stride = stride or tile_size
+        self.edge_mode = edge_mode
+        self.quality = quality
+        self.output_format = output_format
+        self.png_mode = png_mode
+        self.encoder_preset = encoder_preset
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        # 输出方式，见 tensor_shards.OUTPUT_CONTAINERS
+        self.container = container
+
+        self.mutex = QMutex()
+        self.wait_condition = QWaitCondition()
+        self.overwrite_allowed = True
+        self.waiting_for_response = False
+
+    def set_overwrite_allowed(self, allowed: bool) -> None:
+        """设置是否允许覆盖文件"""
+        self.mutex.lock()
+        self.overwrite_allowed = allowed
+        if self.waiting_for_response:
+            self.wait_condition.wakeAll()
+        self.mutex.unlock()
+
+    def run(self) -> None:
+        try:
+            if self.container == 'npy':
+                self.finished.emit(self._export_shards())
+                return
+
+            results: List[Dict[str, Any]] = []
+            total = len(self.image_files)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for i, filepath in enumerate(self.image_files):
+                    self.status.emit(f"正在切分 {i+1}/{total}: {os.path.basename(filepath)}")
+
+                    def on_progress(done: int, tiles: int) -> None:
+                        self.progress.emit(int((i + done / max(tiles, 1)) / total * 100))
+
+                    result = self._export_image(filepath, executor, on_progress)
+                    if result is not None:
+                        results.append(result)
+
+            self.progress.emit(100)
+            self.finished.emit(results)
+
+        except Exception as e:
+            logger.error(f"TileDatasetThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
+
+    def _confirm_overwrite(self, path: str) -> bool:
+        """请求界面确认是否覆盖，阻塞到用户回答"""
+        self.mutex.lock()
+        self.waiting_for_response = True
+        self.overwrite_request.emit(path)
+        self.wait_condition.wait(self.mutex)
+        self.waiting_for_response = False
+        allowed = self.overwrite_allowed
+        self.mutex.unlock()
+        return allowed
+
+    def _export_image(
+        self,
+        filepath: str,
+        executor: ThreadPoolExecutor,
+        progress_callback: Callable[[int, int], None]
+    ) -> Optional[Dict[str, Any]]:
+        """切分单张图片并写出瓦片与索引；用户拒绝覆盖时返回 None"""
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        folder_name = f"{name}_tiles_{self.tile_size}"
+        if self.stride != self.tile_size:
+            folder_name += f"_s{self.stride}"
+        folder = os.path.join(self.output_dir or os.path.dirname(filepath), folder_name)
+        # 瓦片文件名是确定的，整个文件夹只确认一次
+        if os.path.exists(os.path.join(folder, 'manifest.json')) and not self._confirm_overwrite(folder):
+            return None
+        os.makedirs(folder, exist_ok=True)
+
+        with Image.open(filepath) as img:
+            img.load()
+            original_format = img.format or os.path.splitext(filepath)[1][1:].upper()
+            out_format = get_output_format(original_format, self.output_format)
+            png_mode = self.png_mode
+            if out_format == AUTO_FORMAT:
+                # 所有瓦片使用同一格式，按整张图片选择一次
+                choice = choose_auto_format(img, self.quality, self.encoder_preset)
+                out_format, png_mode = choice['format'], choice['png_mode']
+            if out_format == 'JPEG':
+                # 整张图片只去除一次透明度，而不是每块瓦片各做一次
+                img = convert_to_rgb(img)
+            ext = get_file_extension(out_format)
+
+            tiles = len(tile_starts(img.width, self.tile_size, self.stride, self.edge_mode)) * \
+                len(tile_starts(img.height, self.tile_size, self.stride, self.edge_mode))
+            entries: List[Dict[str, Any]] = []
+            pending: List[Future] = []
+
+            def encode_tile(tile: Image.Image, path: str) -> None:
+                write_bytes(path, encode_image(tile, out_format, self.quality, png_mode, preset=self.encoder_preset))
+
+            for row, col, x, y, tile, valid_w, valid_h in iter_tiles(img, self.tile_size, self.stride, self.edge_mode):
+                filename = f"{name}_r{row:04d}_c{col:04d}{ext}"
+                entries.append({
+                    'file': filename,
+                    'source': filepath,
+                    'row': row,
+                    'col': col,
+                    'x': x,
+                    'y': y,
+                    'width': valid_w,
+                    'height': valid_h,
+                    'padded': (valid_w, valid_h) != (self.tile_size, self.tile_size)
+                })
+                pending.append(executor.submit(encode_tile, tile, os.path.join(folder, filename)))
+                # 限制排队中的瓦片数，已裁剪的瓦片不会无限堆积在内存中
+                if len(pending) >= self.max_workers * 2:
+                    pending.pop(0).result()
+                    progress_callback(len(entries) - len(pending), tiles)
+
+            for future in pending:
+                future.result()
+            progress_callback(tiles, tiles)
+
+            paths = write_manifest(entries, folder, {
+                'source': filepath,
+                'source_width': img.width,
+                'source_height': img.height,
+                'tile_size': self.tile_size,
+                'stride': self.stride,
+                'overlap': self.tile_size - self.stride,
+                'edge_mode': self.edge_mode,
+                'format': out_format
+            })
+
+        return {
+            'input': filepath,
+            'output_folder': folder,
+            'tiles': len(entries),
+            'csv': paths['csv'],
+            'json': paths['json']
+        }
+
+    def _export_shards(self) -> List[Dict[str, Any]]:
+        """把全部图片的瓦片写入同一组 .npy 分片，返回每张图片的结果"""
+        self.status.emit("读取图片尺寸...")
+        headers = []
+        for filepath in self.image_files:
+            with Image.open(filepath) as img:
+                xs = tile_starts(img.width, self.tile_size, self.stride, self.edge_mode)
+                ys = tile_starts(img.height, self.tile_size, self.stride, self.edge_mode)
+                headers.append((filepath, source_mode(img), len(xs) * len(ys)))
+        total_tiles = sum(count for _, _, count in headers)
+        if total_tiles == 0:
+            raise ValueError("没有可输出的瓦片（图片均小于瓦片尺寸）")
+
+        folder_name = f"tiles_{self.tile_size}"
+        if self.stride != self.tile_size:
+            folder_name += f"_s{self.stride}"
+        folder = os.path.join(self.output_dir or os.path.dirname(self.image_files[0]), folder_name + "_npy")
+        if os.path.exists(os.path.join(folder, 'index.json')) and not self._confirm_overwrite(folder):
+            return []
+
+        channels = choose_channels([mode for _, mode, _ in headers])
+        writer = TensorShardWriter(folder, 'tiles', total_tiles, (self.tile_size, self.tile_size), channels)
+        counts = []
+        for i, (filepath, _, count) in enumerate(headers):
+            self.status.emit(f"正在写入 {i+1}/{len(headers)}: {os.path.basename(filepath)}")
+            with Image.open(filepath) as img:
+                img.load()
+                # 整张图片只转换一次通道格式
+                img = to_channels(img, channels)
+                for row, col, x, y, tile, valid_w, valid_h in iter_tiles(img, self.tile_size, self.stride, self.edge_mode):
+                    writer.add(tile, {
+                        'source': filepath,
+                        'row': row,
+                        'col': col,
+                        'x': x,
+                        'y': y,
+                        'width': valid_w,
+                        'height': valid_h,
+                        'padded': (valid_w, valid_h) != (self.tile_size, self.tile_size)
+                    })
+                    if len(writer.entries) % 64 == 0:
+                        self.progress.emit(int(len(writer.entries) / total_tiles * 99))
+            counts.append(count)
+
+        paths = writer.close({
+            'tile_size': self.tile_size,
+            'stride': self.stride,
+            'overlap': self.tile_size - self.stride,
+            'edge_mode': self.edge_mode,
+            'sources': self.image_files
+        }, MANIFEST_FIELDS[2:])
+
+        return [{
+            'input': filepath,
+            'output_folder': folder,
+            'tiles': count,
+            'csv': paths['csv'],
+            'json': paths['json']
+        } for (filepath, _, _), count in zip(headers, counts)]
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+瓦片金字塔导出模块
+
+为网页查看器（OpenSeadragon、Leaflet 等）生成多分辨率瓦片金字塔：
+- DZI 布局：{name}.dzi 描述文件 + {name}_files/{level}/{col}_{row}.{ext}，最小一级为 1x1
+- XYZ 布局：{z}/{x}/{y}.{ext}，z=0 时整张图片缩小到一块瓦片以内；Leaflet 等地图库按瓦片尺寸绘制每一块，
+  右侧与底部的边缘瓦片（以及 z=0）补成完整的正方形（JPEG 以白色补边，其余格式透明补边），
+  DZI 仍按规范输出裁剪后的边缘瓦片
+- 每一级都由上一级 reduce(2) 得到，而不是每级都从原图重新缩放
+- 每一级构建完成后即提交到线程池，与下一级的构建并行编码
+- 输出目录中的 pyramid.json 记录每块瓦片的像素哈希；重新生成时源文件与参数都未变化则直接跳过，
+  否则只重新编码像素发生变化的瓦片，并删除不再属于金字塔的旧瓦片
+"""
+
+import os
+import json
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Dict, Any, Tuple, Callable
+from PIL import Image
+from PySide6.QtCore import QThread, Signal
+
+from .image_processor import (
+    get_output_format, get_file_extension, encode_image, write_bytes,
+    choose_auto_format, convert_to_rgb, AUTO_FORMAT, DEFAULT_BACKGROUND
+)
+from .encoder_profiles import DEFAULT_ENCODER_PRESET
+from .tile_analysis import tile_hash
+
+logger = logging.getLogger('ImageStitcher.tile_pyramid')
+
+PYRAMID_LAYOUTS = ('dzi', 'xyz')
+DEFAULT_PYRAMID_LAYOUT = 'dzi'
+DEFAULT_TILE_SIZE = 256
+DEFAULT_TILE_OVERLAP = 0
+
+# 记录瓦片哈希的清单文件
+PYRAMID_MANIFEST = 'pyramid.json'
+PYRAMID_MANIFEST_VERSION = 2
+
+
+def pyramid_levels(width: int, height: int, tile_size: int, layout: str = DEFAULT_PYRAMID_LAYOUT) -> List[Tuple[int, int]]:
+    """计算金字塔各级尺寸，从原图尺寸开始逐级减半（向上取整）
+
+    Args:
+        width: 原图宽度
+        height: 原图高度
+        tile_size: 瓦片边长
+        layout: 金字塔布局，DZI 一直缩小到 1x1，XYZ 缩小到一块瓦片以内
+
+    Returns:
+        各级尺寸，第一个为原图尺寸
+    """
+    if layout == 'dzi':
+        count = math.ceil(math.log2(max(width, height))) + 1 if max(width, height) > 1 else 1
+    else:
+        count = max(0, math.ceil(math.log2(max(width, height) / tile_size))) + 1
+
+    levels = [(width, height)]
+    while len(levels) < count:
+        w, h = levels[-1]
+        levels.append((max(1, math.ceil(w / 2)), max(1, math.ceil(h / 2))))
+    return levels
+
+
+def tile_boxes(level_size: Tuple[int, int], tile_size: int, overlap: int = 0) -> List[Tuple[int, int, Tuple[int, int, int, int]]]:
+    """返回一级中所有瓦片的 (列, 行, 区域)，区域按 DZI 规则向四周扩展 overlap 像素"""
+    width, height = level_size
+    boxes = []
+    for row in range(math.ceil(height / tile_size)):
+        for col in range(math.ceil(width / tile_size)):
+            left = max(0, col * tile_size - overlap)
+            top = max(0, row * tile_size - overlap)
+            right = min(width, (col + 1) * tile_size + overlap)
+            bottom = min(height, (row + 1) * tile_size + overlap)
+            boxes.append((col, row, (left, top, right, bottom)))
+    return boxes
+
+
+def pad_tile(tile: Image.Image, tile_size: int, transparent: bool) -> Image.Image:
+    """把边缘瓦片补成 tile_size 见方，内容位于左上角
+
+    Args:
+        tile: 裁剪出的瓦片
+        tile_size: 瓦片边长
+        transparent: 是否透明补边（否则以白色补边）
+
+    Returns:
+        完整尺寸的瓦片；已是完整尺寸时原样返回
+    """
+    size = (tile_size, tile_size)
+    if tile.size == size:
+        return tile
+    if transparent:
+        mode = 'LA' if tile.mode in ('L', 'LA') else 'RGBA'
+        canvas = Image.new(mode, size, (0,) * len(mode))
+    else:
+        mode = 'L' if tile.mode == 'L' else 'RGB'
+        canvas = Image.new(mode, size, 255 if mode == 'L' else DEFAULT_BACKGROUND)
+    canvas.paste(tile if tile.mode == mode else tile.convert(mode), (0, 0))
+    return canvas
+
+
+def tile_relpath(layout: str, name: str, level: int, col: int, row: int, ext: str) -> str:
+    """瓦片相对金字塔根目录的路径"""
+    if layout == 'dzi':
+        return os.path.join(f"{name}_files", str(level), f"{col}_{row}{ext}")
+    return os.path.join(str(level), str(col), f"{row}{ext}")
+
+
+def write_dzi(path: str, width: int, height: int, tile_size: int, overlap: int, ext: str) -> None:
+    """写出 DZI 描述文件"""
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="{ext.lstrip(".")}" '
+        f'Overlap="{overlap}" TileSize="{tile_size}">\n'
+        f'  <Size Width="{width}" Height="{height}"/>\n'
+        '</Image>\n'
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def _load_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == PYRAMID_MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def build_pyramid(
+    image_file: str,
+    output_dir: str,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    layout: str = DEFAULT_PYRAMID_LAYOUT,
+    overlap: int = DEFAULT_TILE_OVERLAP,
+    quality: int = 90,
+    output_format: Optional[str] = None,
+    png_mode: str = 'lossless',
+    encoder_preset: str = DEFAULT_ENCODER_PRESET,
+    max_workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int, str], None]] = None
+) -> Dict[str, Any]:
+    """为一张图片生成（或增量更新）瓦片金字塔，输出到 {output_dir}/{name}_pyramid
+
+    瓦片按内容增量更新，已存在的文件会被直接替换，不再逐个确认覆盖。
+
+    Args:
+        image_file: 图片路径
+        output_dir: 输出目录
+        tile_size: 瓦片边长
+        layout: 金字塔布局，见 PYRAMID_LAYOUTS
+        overlap: 瓦片四周重叠的像素数（DZI 的 Overlap，XYZ 布局忽略）
+        quality: 输出质量
+        output_format: 输出格式
+        png_mode: PNG 输出模式
+        encoder_preset: 编码档位
+        max_workers: 编码线程数，默认为 CPU 核心数（最多 8）
+        progress_callback: 进度回调，参数为 (已处理瓦片数, 总瓦片数, 状态文字)
+
+    Returns:
+        包含 input、output_folder、layout、levels、tiles、written、skipped、removed 的字典
+    """
+    def report(done: int, total: int, text: str) -> None:
+        if progress_callback:
+            progress_callback(done, total, text)
+
+    if layout not in PYRAMID_LAYOUTS:
+        raise ValueError(f"未知的金字塔布局: {layout}")
+    if layout == 'xyz':
+        # XYZ 瓦片互不重叠，每块都是 tile_size 见方
+        overlap = 0
+
+    name = os.path.splitext(os.path.basename(image_file))[0]
+    root = os.path.join(output_dir, f"{name}_pyramid")
+    manifest_path = os.path.join(root, PYRAMID_MANIFEST)
+    stat = os.stat(image_file)
+    source = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    params = {
+        'layout': layout,
+        'tile_size': tile_size,
+        'overlap': overlap,
+        'output_format': output_format,
+        'quality': quality,
+        'png_mode': png_mode,
+        'encoder_preset': encoder_preset
+    }
+
+    old = _load_manifest(manifest_path)
+    if (
+        old is not None
+        and old['source'] == source
+        and old['params'] == params
+        and all(os.path.exists(os.path.join(root, p)) for p in old['tiles'])
+    ):
+        # 源文件与参数都未变化，无需解码
+        total = len(old['tiles'])
+        report(total, total, "金字塔已是最新")
+        return {
+            'input': image_file,
+            'output_folder': root,
+            'layout': layout,
+            'levels': old['levels'],
+            'tiles': total,
+            'written': 0,
+            'skipped': total,
+            'removed': 0
+        }
+    old_tiles = old['tiles'] if old is not None and old['params'] == params else {}
+
+    with Image.open(image_file) as img:
+        img.load()
+        original_format = img.format or os.path.splitext(image_file)[1][1:].upper()
+        out_format = get_output_format(original_format, output_format)
+        if out_format == AUTO_FORMAT:
+            # 所有瓦片使用同一格式，按整张图片选择一次
+            report(0, 0, "正在选择输出格式...")
+            choice = choose_auto_format(img, quality, encoder_preset)
+            out_format, png_mode = choice['format'], choice['png_mode']
+        if out_format == 'JPEG':
+            level = convert_to_rgb(img)
+        elif img.mode in ('RGB', 'RGBA', 'L', 'LA'):
+            level = img.copy()
+        else:
+            # 调色板等模式无法直接逐级缩小
+            level = img.convert('RGBA' if img.mode in ('P', 'PA') and img.has_transparency_data else 'RGB')
+
+    ext = get_file_extension(out_format)
+    sizes = pyramid_levels(level.width, level.height, tile_size, layout)
+    max_level = len(sizes) - 1
+    total = sum(len(tile_boxes(size, tile_size, overlap)) for size in sizes)
+
+    def process_tile(source_level: Image.Image, box: Tuple[int, int, int, int], relpath: str) -> Tuple[str, str, bool]:
+        tile = source_level.crop(box)
+        if layout == 'xyz':
+            tile = pad_tile(tile, tile_size, out_format != 'JPEG')
+        digest = tile_hash(tile)
+        path = os.path.join(root, relpath)
+        if old_tiles.get(relpath) == digest and os.path.exists(path):
+            return relpath, digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_bytes(path, encode_image(tile, out_format, quality, png_mode, preset=encoder_preset))
+        return relpath, digest, True
+
+    tiles: Dict[str, str] = {}
+    written = 0
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    os.makedirs(root, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for index, size in enumerate(sizes):
+            if index > 0:
+                # 由上一级缩小得到，上一级的瓦片仍在后台编码
+                report(len(tiles), total, f"正在构建第 {max_level - index} 级 ({size[0]}x{size[1]})...")
+                level = level.reduce(2)
+                if level.size != size:
+                    level = level.resize(size, Image.Resampling.BOX)
+            level_number = max_level - index
+            for col, row, box in tile_boxes(size, tile_size, overlap):
+                relpath = tile_relpath(layout, name, level_number, col, row, ext)
+                futures.append(executor.submit(process_tile, level, box, relpath))
+
+        for future in as_completed(futures):
+            relpath, digest, changed = future.result()
+            tiles[relpath] = digest
+            written += changed
+            if len(tiles) % 64 == 0 or len(tiles) == total:
+                report(len(tiles), total, f"编码瓦片 {len(tiles)}/{total}...")
+
+    removed = 0
+    for relpath in set(old.get('tiles', {}) if old else {}) - set(tiles):
+        path = os.path.join(root, relpath)
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+
+    if layout == 'dzi':
+        write_dzi(os.path.join(root, f"{name}.dzi"), sizes[0][0], sizes[0][1], tile_size, overlap, ext)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': PYRAMID_MANIFEST_VERSION,
+            'source': source,
+            'params': params,
+            'width': sizes[0][0],
+            'height': sizes[0][1],
+            'format': out_format,
+            'levels': len(sizes),
+            'tiles': tiles
+        }, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    return {
+        'input': image_file,
+        'output_folder': root,
+        'layout': layout,
+        'levels': len(sizes),
+        'tiles': total,
+        'written': written,
+        'skipped': total - written,
+        'removed': removed
+    }
+
+
+class TilePyramidThread(QThread):
+    """瓦片金字塔导出线程（多张图片依次处理，每张图片内部并行编码）"""
+    progress = Signal(int)
+    status = Signal(str)
+    finished = Signal(list)
+    error = Signal(str)
+
+    def __init__(
+        self,
+        image_files: List[str],
+        output_dir: Optional[str],
+        tile_size: int = DEFAULT_TILE_SIZE,
+        layout: str = DEFAULT_PYRAMID_LAYOUT,
+        overlap: int = DEFAULT_TILE_OVERLAP,
+        quality: int = 90,
+        output_format: Optional[str] = None,
+        png_mode: str = 'lossless',
+        encoder_preset: str = DEFAULT_ENCODER_PRESET,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__()
+        self.image_files = image_files
+        # 为空时输出到每张图片所在的目录
+        self.output_dir = output_dir
+        self.tile_size = tile_size
+        self.layout = layout
+        self.overlap = overlap
+        self.quality = quality
+        self.output_format = output_format
+        self.png_mode = png_mode
+        self.encoder_preset = encoder_preset
+        self.max_workers = max_workers
+
+    def run(self) -> None:
+        try:
+            results: List[Dict[str, Any]] = []
+            total = len(self.image_files)
+
+            for i, filepath in enumerate(self.image_files):
+                prefix = f"[{i+1}/{total}] " if total > 1 else ""
+
+                def on_progress(done: int, tiles: int, text: str) -> None:
+                    fraction = done / tiles if tiles else 0
+                    self.status.emit(prefix + text)
+                    self.progress.emit(int((i + fraction) / total * 100))
+
+                results.append(build_pyramid(
+                    filepath,
+                    self.output_dir or os.path.dirname(filepath),
+                    self.tile_size,
+                    self.layout,
+                    self.overlap,
+                    self.quality,
+                    self.output_format,
+                    self.png_mode,
+                    self.encoder_preset,
+                    self.max_workers,
+                    on_progress
+                ))
+
+            self.progress.emit(100)
+            self.finished.emit(results)
+
+        except Exception as e:
+            logger.error(f"TilePyramidThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
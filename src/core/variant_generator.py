@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多规格输出模块
+
+每张图片只解码一次，按目标尺寸从大到小构建缩放链（每一级都由上一级缩小得到），
+再将 尺寸 x 格式 的全部组合并行编码并写出，用于一次生成 2x/1x/缩略图等多套网页素材。
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from PIL import Image
+from PySide6.QtCore import QThread, Signal
+
+from .image_processor import convert_to_rgb, encode_image, get_file_extension, unique_output_stems
+from .encoder_profiles import DEFAULT_ENCODER_PRESET
+
+logger = logging.getLogger('ImageStitcher.variant_generator')
+
+# 每个规格可以用 scale（相对原图的百分比）或 max_side（最长边像素）描述
+DEFAULT_VARIANTS = [
+    {'name': '2x', 'scale': 100},
+    {'name': '1x', 'scale': 50},
+    {'name': 'thumb', 'max_side': 320},
+]
+DEFAULT_VARIANT_FORMATS = ['JPEG', 'WEBP']
+
+
+def variant_size(width: int, height: int, variant: Dict[str, Any]) -> Tuple[int, int]:
+    """计算规格对应的输出尺寸（不会放大原图）
+
+    Args:
+        width: 原图宽度
+        height: 原图高度
+        variant: 规格描述
+
+    Returns:
+        (宽, 高)
+    """
+    if 'max_side' in variant:
+        factor = variant['max_side'] / max(width, height)
+    else:
+        factor = variant.get('scale', 100) / 100
+    factor = min(factor, 1.0)
+    return max(1, round(width * factor)), max(1, round(height * factor))
+
+
+def build_downscale_chain(img: Image.Image, variants: List[Dict[str, Any]]) -> Dict[str, Image.Image]:
+    """按尺寸从大到小依次缩小，每一级都以上一级为输入
+
+    Args:
+        img: 已解码的原图
+        variants: 规格列表
+
+    Returns:
+        规格名称到缩放后图片的映射
+    """
+    sized = [(variant['name'], variant_size(img.width, img.height, variant)) for variant in variants]
+    sized.sort(key=lambda item: item[1][0] * item[1][1], reverse=True)
+
+    chain: Dict[str, Image.Image] = {}
+    current = img
+    for name, size in sized:
+        if current.size != size:
+            current = current.resize(size, Image.Resampling.LANCZOS)
+        chain[name] = current
+    return chain
+
+
+class VariantThread(QThread):
+    """多规格输出线程"""
+    progress = Signal(int)
+    status = Signal(str)
+    finished = Signal(list)
+    error = Signal(str)
+
+    def __init__(
+        self,
+        image_files: List[str],
+        output_dir: str,
+        variants: Optional[List[Dict[str, Any]]] = None,
+        formats: Optional[List[str]] = None,
+        quality: int = 85,
+        max_workers: Optional[int] = None,
+        encoder_preset: str = DEFAULT_ENCODER_PRESET
+    ):
+        super().__init__()
+        self.image_files = image_files
+        self.output_dir = output_dir
+        self.variants = variants or DEFAULT_VARIANTS
+        self.formats = formats or DEFAULT_VARIANT_FORMATS
+        self.quality = quality
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.encoder_preset = encoder_preset
+
+    def run(self) -> None:
+        try:
+            results: List[Dict[str, Any]] = []
+            total = len(self.image_files)
+
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            variants_dir = os.path.join(self.output_dir, f"variants_{timestamp}")
+            os.makedirs(variants_dir, exist_ok=True)
+            # 同名的输入（不同目录或不同扩展名）使用不同的前缀，避免输出互相覆盖
+            stems = unique_output_stems(self.image_files)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pending: List[Tuple[str, Dict[str, Any], Any]] = []
+                for i, filepath in enumerate(self.image_files):
+                    self.status.emit(f"正在生成 {i+1}/{total}: {os.path.basename(filepath)}")
+
+                    with Image.open(filepath) as img:
+                        img.load()
+                        chain = build_downscale_chain(img, self.variants)
+
+                    name = stems[i]
+                    submitted = []
+                    for variant_name, variant_img in chain.items():
+                        # JPEG 的模式转换每个尺寸只做一次
+                        rgb_img = convert_to_rgb(variant_img) if 'JPEG' in self.formats else None
+                        for fmt in self.formats:
+                            output_path = os.path.join(
+                                variants_dir, f"{name}_{variant_name}{get_file_extension(fmt)}"
+                            )
+                            future = executor.submit(
+                                self._write_variant,
+                                rgb_img if fmt == 'JPEG' else variant_img,
+                                fmt,
+                                output_path
+                            )
+                            submitted.append((filepath, {
+                                'variant': variant_name,
+                                'format': fmt,
+                                'size': f"{variant_img.width}x{variant_img.height}"
+                            }, future))
+
+                    # 当前图片的编码在后台进行时，收集上一张图片的结果，使解码与编码重叠
+                    self._collect(pending, results, variants_dir)
+                    pending = submitted
+                    self.progress.emit(int(i / total * 100))
+
+                self._collect(pending, results, variants_dir)
+
+            self.progress.emit(100)
+            self.finished.emit(results)
+
+        except Exception as e:
+            logger.error(f"VariantThread error: {e}", exc_info=True)
+            self.error.emit(str(e))
+
+    def _collect(self, pending: List[Tuple[str, Dict[str, Any], Any]], results: List[Dict[str, Any]], variants_dir: str) -> None:
+        """等待已提交的编码任务并记录结果"""
+        for filepath, info, future in pending:
+            output_path, file_size = future.result()
+            results.append({
+                'input': filepath,
+                'output': output_path,
+                'output_folder': variants_dir,
+                'variant': info['variant'],
+                'format': info['format'],
+                'size': info['size'],
+                'file_size': file_size
+            })
+
+    def _write_variant(self, img: Image.Image, out_format: str, output_path: str) -> Tuple[str, int]:
+        """编码并写出单个规格"""
+        data = encode_image(img, out_format, self.quality, preset=self.encoder_preset)
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        return output_path, len(data)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩预览卡片组件
+"""
+
+from PIL import Image
+from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPixmap, QImage
+from qfluentwidgets import CardWidget, BodyLabel, CaptionLabel, StrongBodyLabel, ComboBox
+
+# 对比视图的放大倍数选项
+ZOOM_OPTIONS = {
+    "100%": 1,
+    "200%": 2,
+    "400%": 4
+}
+
+PREVIEW_VIEW_SIZE = 220
+
+
+def pil_to_pixmap(img: Image.Image) -> QPixmap:
+    """将 PIL 图片转换为 QPixmap（需在界面线程中调用）"""
+    img = img.convert('RGBA')
+    data = img.tobytes('raw', 'RGBA')
+    qimage = QImage(data, img.width, img.height, img.width * 4, QImage.Format_RGBA8888)
+    return QPixmap.fromImage(qimage.copy())
+
+
+class CompressPreviewCard(CardWidget):
+    """压缩预览卡片：显示估算体积以及编码前后的放大对比"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.before = None
+        self.after = None
+        self.setStyleSheet("CardWidget { border-radius: 8px; }")
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(24, 16, 24, 16)
+        layout.setSpacing(12)
+
+        # 标题行：估算结果与放大倍数
+        header = QHBoxLayout()
+        header.setSpacing(16)
+        header.addWidget(StrongBodyLabel("压缩预览"))
+
+        self.summary_label = CaptionLabel("添加图片后显示预计输出体积")
+        self.summary_label.setStyleSheet("color: #666;")
+        header.addWidget(self.summary_label, 1)
+
+        zoom_label = BodyLabel("放大")
+        zoom_label.setStyleSheet("color: #666;")
+        header.addWidget(zoom_label)
+        self.zoom_combo = ComboBox()
+        self.zoom_combo.addItems(list(ZOOM_OPTIONS))
+        self.zoom_combo.setCurrentText("200%")
+        self.zoom_combo.currentTextChanged.connect(self.update_views)
+        header.addWidget(self.zoom_combo)
+        layout.addLayout(header)
+
+        # 编码前后对比
+        views = QHBoxLayout()
+        views.setSpacing(24)
+        self.before_title, self.before_view = self._create_view("原图", views)
+        self.after_title, self.after_view = self._create_view("压缩后", views)
+        views.addStretch(1)
+        layout.addLayout(views)
+
+    def _create_view(self, title, parent_layout):
+        column = QVBoxLayout()
+        column.setSpacing(6)
+        title_label = CaptionLabel(title)
+        title_label.setStyleSheet("color: #666;")
+        column.addWidget(title_label)
+        view = QLabel()
+        view.setFixedSize(PREVIEW_VIEW_SIZE, PREVIEW_VIEW_SIZE)
+        view.setAlignment(Qt.AlignCenter)
+        view.setStyleSheet("QLabel { background-color: #f0f0f0; border-radius: 6px; }")
+        column.addWidget(view)
+        parent_layout.addLayout(column)
+        return title_label, view
+
+    def set_pending(self):
+        """参数变化、等待新的估算结果"""
+        self.summary_label.setText("正在估算...")
+
+    def clear(self):
+        """清空预览"""
+        self.before = None
+        self.after = None
+        self.summary_label.setText("添加图片后显示预计输出体积")
+        self.after_title.setText("压缩后")
+        self.before_view.clear()
+        self.after_view.clear()
+
+    def set_result(self, result, format_size):
+        """显示估算结果
+
+        Args:
+            result: CompressPreviewThread 的结果
+            format_size: 文件大小格式化函数
+        """
+        total_original = result['total_original']
+        total_estimated = result['total_estimated']
+        ratio = (1 - total_estimated / total_original) * 100 if total_original > 0 else 0
+        text = f"预计输出 {format_size(total_estimated)}（原 {format_size(total_original)}，"
+        text += f"减少 {ratio:.1f}%）" if ratio >= 0 else f"增加 {-ratio:.1f}%）"
+        # 直接复制或跳过的低质量源按原文件大小精确计入，只有按样本外推的图片才是粗略估算
+        if any(not f['sampled'] and not f['exact'] for f in result['files']):
+            text += f"，按 {result['sampled']} 张样本粗略估算"
+        self.summary_label.setText(text)
+
+        self.before = result['before']
+        self.after = result['after']
+        if self.before is None:
+            # 所有图片都按原样复制或跳过，没有编码对比
+            self.after_title.setText("压缩后")
+            self.before_view.clear()
+            self.after_view.clear()
+            return
+        self.after_title.setText(f"压缩后 · {result['view_format']}")
+        self.update_views()
+
+    def update_views(self):
+        """按放大倍数截取中心区域并以最近邻放大显示，便于观察压缩痕迹"""
+        if self.before is None or self.after is None:
+            return
+        zoom = ZOOM_OPTIONS[self.zoom_combo.currentText()]
+        for img, view in ((self.before, self.before_view), (self.after, self.after_view)):
+            side = PREVIEW_VIEW_SIZE // zoom
+            left = max(0, (img.width - side) // 2)
+            top = max(0, (img.height - side) // 2)
+            region = img.crop((left, top, min(img.width, left + side), min(img.height, top + side)))
+            region = region.resize((region.width * zoom, region.height * zoom), Image.Resampling.NEAREST)
+            view.setPixmap(pil_to_pixmap(region))
@@ -14,6 +14,11 @@ from qfluentwidgets import (
     StrongBodyLabel, TransparentToolButton, FluentIcon
 )
 
+from ...core.jpeg_analyzer import estimate_jpeg_quality
+
+# 可以添加的图片扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.tif', '.tiff', '.ppm', '.pgm')
+
 
 class FileListWidget(QWidget):
     """文件列表组件"""
@@ -22,6 +27,11 @@ class FileListWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.image_files = []
+        self._quality_cache = {}  # (路径, 修改时间) -> 估算的 JPEG 质量
+        self.show_size = False  # 显示图片尺寸而不是文件大小
+        self.show_quality = False  # 对 JPEG 文件额外显示估算质量
+        self._estimates = {}  # 文件路径 -> 预计输出体积
+        self._size_labels = {}  # 文件路径 -> 大小标签
         self.setAcceptDrops(True)
         self.setup_ui()
 
@@ -71,17 +81,31 @@ class FileListWidget(QWidget):
             event.acceptProposedAction()
 
     def dropEvent(self, event: QDropEvent):
-        files = [url.toLocalFile() for url in event.mimeData().urls()]
+        self.add_files([url.toLocalFile() for url in event.mimeData().urls()])
+
+    def add_files(self, files):
+        """添加文件，文件夹展开为其中的图片（按文件名排序，不包含子文件夹）
+
+        Returns:
+            新添加的文件数
+        """
         valid_files = []
         invalid_files = []
 
+        expanded = []
         for file in files:
+            if os.path.isdir(file):
+                expanded.extend(sorted(os.path.join(file, name) for name in os.listdir(file)))
+            else:
+                expanded.append(file)
+
+        for file in expanded:
             if os.path.isfile(file):
                 ext = os.path.splitext(file)[1].lower()
-                if ext in ['.png', '.jpg', '.jpeg', '.bmp', '.webp']:
+                if ext in IMAGE_EXTENSIONS:
                     # 验证文件是否真的是有效的图片
                     if self._is_valid_image(file):
-                        if file not in self.image_files:
+                        if file not in self.image_files and file not in valid_files:
                             valid_files.append(file)
                     else:
                         invalid_files.append(os.path.basename(file))
@@ -92,6 +116,7 @@ class FileListWidget(QWidget):
             self.files_changed.emit(self.image_files)
 
         # 可以添加提示告诉用户哪些文件无效（可选）
+        return len(valid_files)
 
     def _is_valid_image(self, filepath):
         """验证文件是否是有效的图片"""
@@ -108,8 +133,22 @@ class FileListWidget(QWidget):
         except Exception:
             return False
 
-    def update_file_list(self, show_size=False):
-        """更新文件列表显示"""
+    def update_file_list(self, show_size=None, show_quality=None, estimates=None):
+        """更新文件列表显示（未给出的显示选项沿用上一次的设置）
+
+        Args:
+            show_size: 显示图片尺寸而不是文件大小
+            show_quality: 对 JPEG 文件额外显示由量化表估算的质量
+            estimates: 文件路径到预计输出体积的映射，有值时附加显示
+        """
+        if show_size is not None:
+            self.show_size = show_size
+        if show_quality is not None:
+            self.show_quality = show_quality
+        if estimates is not None:
+            self._estimates = estimates
+        self._size_labels = {}
+
         while self.scroll_layout.count() > 0:
             item = self.scroll_layout.takeAt(0)
             if item.widget():
@@ -144,20 +183,10 @@ class FileListWidget(QWidget):
             name_label.setToolTip(filepath)
             item_layout.addWidget(name_label, 1)
 
-            # 显示文件大小或图片尺寸
-            if show_size:
-                try:
-                    with Image.open(filepath) as img:
-                        size_str = f"{img.width}×{img.height}"
-                except Exception:
-                    size_str = "未知"
-            else:
-                size = os.path.getsize(filepath)
-                size_str = self.format_size(size)
-            
-            size_label = CaptionLabel(size_str)
+            size_label = CaptionLabel(self._size_text(filepath))
             size_label.setStyleSheet("color: #888;")
             item_layout.addWidget(size_label)
+            self._size_labels[filepath] = size_label
 
             del_btn = TransparentToolButton(FluentIcon.CLOSE)
             del_btn.setFixedSize(28, 28)
@@ -168,6 +197,48 @@ class FileListWidget(QWidget):
 
         self.scroll_layout.addStretch()
 
+    def _size_text(self, filepath):
+        """文件大小（或图片尺寸）、估算质量与预计输出体积组成的说明文字"""
+        # 显示文件大小或图片尺寸
+        if self.show_size:
+            try:
+                with Image.open(filepath) as img:
+                    size_str = f"{img.width}×{img.height}"
+            except Exception:
+                size_str = "未知"
+        else:
+            size = os.path.getsize(filepath)
+            size_str = self.format_size(size)
+
+        if self.show_quality:
+            quality = self.get_jpeg_quality(filepath)
+            if quality is not None:
+                size_str += f" · 质量≈{quality}"
+
+        if filepath in self._estimates:
+            size_str += f" → ≈{self.format_size(self._estimates[filepath])}"
+        return size_str
+
+    def set_estimates(self, estimates):
+        """只刷新各文件的大小标签，附加预计输出体积（不重建列表）
+
+        Args:
+            estimates: 文件路径到预计输出体积的映射
+        """
+        self._estimates = estimates
+        for filepath, label in self._size_labels.items():
+            label.setText(self._size_text(filepath))
+
+    def get_jpeg_quality(self, filepath):
+        """获取 JPEG 文件的估算质量（只读取文件头，结果会被缓存）"""
+        try:
+            key = (filepath, os.path.getmtime(filepath))
+        except OSError:
+            return None
+        if key not in self._quality_cache:
+            self._quality_cache[key] = estimate_jpeg_quality(filepath)
+        return self._quality_cache[key]
+
     def format_size(self, size):
         """格式化文件大小"""
         if size < 1024:
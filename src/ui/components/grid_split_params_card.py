@@ -8,9 +8,36 @@ import os
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout
 from PySide6.QtCore import Qt
 from qfluentwidgets import (
-    CardWidget, TitleLabel, CaptionLabel, SpinBox, ComboBox,
+    CardWidget, TitleLabel, CaptionLabel, SpinBox, DoubleSpinBox, ComboBox, SwitchButton,
     PushButton, LineEdit, Slider, InfoBar, InfoBarPosition, StrongBodyLabel, BodyLabel
 )
+from .params_card import (
+    PNG_MODE_OPTIONS, ENCODER_PRESET_OPTIONS, OUTPUT_FORMAT_OPTIONS, OUTPUT_CONTAINER_OPTIONS,
+    create_png_mode_combo, create_encoder_preset_combo, create_output_format_combo,
+    create_output_container_combo, bind_png_mode_combo
+)
+
+# 分割方式选项
+SPLIT_MODE_OPTIONS = {
+    "按行列等分": "grid",
+    "瓦片金字塔": "pyramid",
+    "固定尺寸瓦片": "tiles",
+    "按分隔带自动分割": "gutter"
+}
+
+# 瓦片金字塔布局选项，对应 tile_pyramid.PYRAMID_LAYOUTS
+PYRAMID_LAYOUT_OPTIONS = {
+    "DZI": "dzi",
+    "XYZ (z/x/y)": "xyz"
+}
+
+# 固定尺寸瓦片的边缘处理选项，对应 tile_dataset.EDGE_MODES
+EDGE_MODE_OPTIONS = {
+    "补零": "pad",
+    "镜像补边": "reflect",
+    "贴边对齐": "shift",
+    "丢弃": "drop"
+}
 
 
 class GridSplitParamsCard(CardWidget):
@@ -25,8 +52,28 @@ class GridSplitParamsCard(CardWidget):
         layout.setContentsMargins(24, 20, 24, 20)
         layout.setSpacing(20)
 
+        # 分割方式
+        mode_row = QHBoxLayout()
+        mode_row.setSpacing(12)
+        mode_label = BodyLabel("分割方式")
+        mode_label.setStyleSheet("color: #666;")
+        mode_label.setMinimumWidth(70)
+        mode_row.addWidget(mode_label)
+        self.split_mode_combo = ComboBox()
+        self.split_mode_combo.addItems(list(SPLIT_MODE_OPTIONS))
+        self.split_mode_combo.setMinimumWidth(150)
+        self.split_mode_combo.setToolTip(
+            "瓦片金字塔：生成多分辨率瓦片，供 OpenSeadragon、Leaflet 等网页查看器使用；"
+            "按分隔带自动分割：检测漫画、设计稿中格子之间的空白分隔带，沿分隔带切出每一格"
+        )
+        mode_row.addWidget(self.split_mode_combo)
+        mode_row.addStretch(1)
+        layout.addLayout(mode_row)
+
         # 第一行：等分设置
-        row1 = QHBoxLayout()
+        self.grid_widget = QWidget()
+        row1 = QHBoxLayout(self.grid_widget)
+        row1.setContentsMargins(0, 0, 0, 0)
         row1.setSpacing(32)
 
         # 宽度等分
@@ -55,8 +102,181 @@ class GridSplitParamsCard(CardWidget):
         y_group.addWidget(self.y_splits_spin)
         row1.addLayout(y_group)
 
+        # 跳过空白块
+        blank_group = QHBoxLayout()
+        blank_group.setSpacing(12)
+        blank_label = BodyLabel("跳过空白块")
+        blank_label.setStyleSheet("color: #666;")
+        blank_group.addWidget(blank_label)
+        self.skip_blank_switch = SwitchButton()
+        self.skip_blank_switch.setToolTip("不输出颜色几乎一致（或完全透明）的块，位置记录在 manifest.json 中")
+        blank_group.addWidget(self.skip_blank_switch)
+        self.blank_threshold_spin = DoubleSpinBox()
+        self.blank_threshold_spin.setRange(0.0, 32.0)
+        self.blank_threshold_spin.setDecimals(1)
+        self.blank_threshold_spin.setSingleStep(0.5)
+        self.blank_threshold_spin.setValue(2.0)
+        self.blank_threshold_spin.setMinimumWidth(120)
+        self.blank_threshold_spin.setEnabled(False)
+        self.blank_threshold_spin.setToolTip("空白阈值：块内各通道像素值的标准差不超过该值时视为空白")
+        self.skip_blank_switch.checkedChanged.connect(self.blank_threshold_spin.setEnabled)
+        blank_group.addWidget(self.blank_threshold_spin)
+        row1.addLayout(blank_group)
+
+        # 合并重复块
+        dedupe_group = QHBoxLayout()
+        dedupe_group.setSpacing(12)
+        dedupe_label = BodyLabel("合并重复块")
+        dedupe_label.setStyleSheet("color: #666;")
+        dedupe_group.addWidget(dedupe_label)
+        self.dedupe_switch = SwitchButton()
+        self.dedupe_switch.setToolTip("像素完全相同的块只输出一次，manifest.json 中的重复位置指向第一次输出的文件")
+        dedupe_group.addWidget(self.dedupe_switch)
+        row1.addLayout(dedupe_group)
+
         row1.addStretch()
-        layout.addLayout(row1)
+        layout.addWidget(self.grid_widget)
+
+        # 瓦片金字塔设置
+        self.pyramid_widget = QWidget()
+        pyramid_row = QHBoxLayout(self.pyramid_widget)
+        pyramid_row.setContentsMargins(0, 0, 0, 0)
+        pyramid_row.setSpacing(32)
+
+        tile_group = QHBoxLayout()
+        tile_group.setSpacing(12)
+        tile_label = BodyLabel("瓦片尺寸")
+        tile_label.setStyleSheet("color: #666;")
+        tile_group.addWidget(tile_label)
+        self.tile_size_spin = SpinBox()
+        self.tile_size_spin.setRange(64, 2048)
+        self.tile_size_spin.setSingleStep(64)
+        self.tile_size_spin.setValue(256)
+        self.tile_size_spin.setMinimumWidth(150)
+        tile_group.addWidget(self.tile_size_spin)
+        pyramid_row.addLayout(tile_group)
+
+        layout_group = QHBoxLayout()
+        layout_group.setSpacing(12)
+        layout_label = BodyLabel("布局")
+        layout_label.setStyleSheet("color: #666;")
+        layout_group.addWidget(layout_label)
+        self.pyramid_layout_combo = ComboBox()
+        self.pyramid_layout_combo.addItems(list(PYRAMID_LAYOUT_OPTIONS))
+        self.pyramid_layout_combo.setMinimumWidth(120)
+        layout_group.addWidget(self.pyramid_layout_combo)
+        pyramid_row.addLayout(layout_group)
+
+        overlap_group = QHBoxLayout()
+        overlap_group.setSpacing(12)
+        overlap_label = BodyLabel("重叠像素")
+        overlap_label.setStyleSheet("color: #666;")
+        overlap_group.addWidget(overlap_label)
+        self.overlap_spin = SpinBox()
+        self.overlap_spin.setRange(0, 16)
+        self.overlap_spin.setValue(0)
+        self.overlap_spin.setMinimumWidth(120)
+        overlap_group.addWidget(self.overlap_spin)
+        pyramid_row.addLayout(overlap_group)
+
+        pyramid_row.addStretch()
+        self.pyramid_widget.setVisible(False)
+        layout.addWidget(self.pyramid_widget)
+
+        # 固定尺寸瓦片设置
+        self.tiles_widget = QWidget()
+        tiles_row = QHBoxLayout(self.tiles_widget)
+        tiles_row.setContentsMargins(0, 0, 0, 0)
+        tiles_row.setSpacing(32)
+
+        dataset_tile_group = QHBoxLayout()
+        dataset_tile_group.setSpacing(12)
+        dataset_tile_label = BodyLabel("瓦片尺寸")
+        dataset_tile_label.setStyleSheet("color: #666;")
+        dataset_tile_group.addWidget(dataset_tile_label)
+        self.dataset_tile_spin = SpinBox()
+        self.dataset_tile_spin.setRange(16, 8192)
+        self.dataset_tile_spin.setSingleStep(64)
+        self.dataset_tile_spin.setValue(512)
+        self.dataset_tile_spin.setMinimumWidth(150)
+        dataset_tile_group.addWidget(self.dataset_tile_spin)
+        tiles_row.addLayout(dataset_tile_group)
+
+        dataset_overlap_group = QHBoxLayout()
+        dataset_overlap_group.setSpacing(12)
+        dataset_overlap_label = BodyLabel("重叠像素")
+        dataset_overlap_label.setStyleSheet("color: #666;")
+        dataset_overlap_group.addWidget(dataset_overlap_label)
+        self.dataset_overlap_spin = SpinBox()
+        self.dataset_overlap_spin.setRange(0, 511)
+        self.dataset_overlap_spin.setValue(0)
+        self.dataset_overlap_spin.setMinimumWidth(150)
+        self.dataset_overlap_spin.setToolTip("相邻瓦片重叠的像素数，步长 = 瓦片尺寸 - 重叠像素")
+        dataset_overlap_group.addWidget(self.dataset_overlap_spin)
+        tiles_row.addLayout(dataset_overlap_group)
+
+        edge_group = QHBoxLayout()
+        edge_group.setSpacing(12)
+        edge_label = BodyLabel("边缘处理")
+        edge_label.setStyleSheet("color: #666;")
+        edge_group.addWidget(edge_label)
+        self.edge_mode_combo = ComboBox()
+        self.edge_mode_combo.addItems(list(EDGE_MODE_OPTIONS))
+        self.edge_mode_combo.setMinimumWidth(120)
+        self.edge_mode_combo.setToolTip(
+            "补零 / 镜像补边：不完整的瓦片补边到完整尺寸；贴边对齐：最后一块向内移动；丢弃：不输出不完整的瓦片"
+        )
+        edge_group.addWidget(self.edge_mode_combo)
+        tiles_row.addLayout(edge_group)
+
+        container_group = QHBoxLayout()
+        container_group.setSpacing(12)
+        container_label = BodyLabel("输出为")
+        container_label.setStyleSheet("color: #666;")
+        container_group.addWidget(container_label)
+        self.container_combo = create_output_container_combo()
+        container_group.addWidget(self.container_combo)
+        tiles_row.addLayout(container_group)
+
+        tiles_row.addStretch()
+        self.tiles_widget.setVisible(False)
+        layout.addWidget(self.tiles_widget)
+
+        # 按分隔带分割设置
+        self.gutter_widget = QWidget()
+        gutter_row = QHBoxLayout(self.gutter_widget)
+        gutter_row.setContentsMargins(0, 0, 0, 0)
+        gutter_row.setSpacing(32)
+
+        tolerance_group = QHBoxLayout()
+        tolerance_group.setSpacing(12)
+        tolerance_label = BodyLabel("颜色容差")
+        tolerance_label.setStyleSheet("color: #666;")
+        tolerance_group.addWidget(tolerance_label)
+        self.gutter_tolerance_spin = SpinBox()
+        self.gutter_tolerance_spin.setRange(0, 128)
+        self.gutter_tolerance_spin.setValue(16)
+        self.gutter_tolerance_spin.setMinimumWidth(150)
+        self.gutter_tolerance_spin.setToolTip("与分隔带颜色（取自图片四周）的灰度差不超过该值的像素视为分隔带")
+        tolerance_group.addWidget(self.gutter_tolerance_spin)
+        gutter_row.addLayout(tolerance_group)
+
+        min_gutter_group = QHBoxLayout()
+        min_gutter_group.setSpacing(12)
+        min_gutter_label = BodyLabel("最小间隔")
+        min_gutter_label.setStyleSheet("color: #666;")
+        min_gutter_group.addWidget(min_gutter_label)
+        self.min_gutter_spin = SpinBox()
+        self.min_gutter_spin.setRange(1, 1000)
+        self.min_gutter_spin.setValue(8)
+        self.min_gutter_spin.setMinimumWidth(150)
+        self.min_gutter_spin.setToolTip("分隔带的最小宽度（像素），更窄的空白不会被切开")
+        min_gutter_group.addWidget(self.min_gutter_spin)
+        gutter_row.addLayout(min_gutter_group)
+
+        gutter_row.addStretch()
+        self.gutter_widget.setVisible(False)
+        layout.addWidget(self.gutter_widget)
 
         # 第二行：预览信息
         self.preview_label = BodyLabel("将等分为 4 个图片块（2行 × 2列）")
@@ -80,10 +300,25 @@ class GridSplitParamsCard(CardWidget):
         format_label.setMinimumWidth(70)
         row3.addWidget(format_label)
 
-        self.format_combo = ComboBox()
-        self.format_combo.addItems(["保持原格式", "JPEG", "PNG", "WEBP"])
-        self.format_combo.setMinimumWidth(150)
+        self.format_combo = create_output_format_combo()
         row3.addWidget(self.format_combo)
+
+        row3.addSpacing(20)
+        png_mode_label = BodyLabel("PNG 模式")
+        png_mode_label.setStyleSheet("color: #666;")
+        row3.addWidget(png_mode_label)
+
+        self.png_mode_combo = create_png_mode_combo()
+        bind_png_mode_combo(self.format_combo, self.png_mode_combo)
+        row3.addWidget(self.png_mode_combo)
+
+        row3.addSpacing(20)
+        preset_label = BodyLabel("编码速度")
+        preset_label.setStyleSheet("color: #666;")
+        row3.addWidget(preset_label)
+
+        self.encoder_preset_combo = create_encoder_preset_combo()
+        row3.addWidget(self.encoder_preset_combo)
         row3.addStretch(1)
 
         layout.addLayout(row3)
@@ -145,7 +380,7 @@ class GridSplitParamsCard(CardWidget):
         layout.addLayout(row5)
 
         # 添加说明
-        note_label = BodyLabel("注意：等分后的图片将保存在一个新建的子文件夹中")
+        self.note_label = note_label = BodyLabel("注意：等分后的图片将保存在一个新建的子文件夹中")
         note_label.setStyleSheet("""
             BodyLabel {
                 color: #999;
@@ -157,9 +392,64 @@ class GridSplitParamsCard(CardWidget):
         # 连接信号
         self.x_splits_spin.valueChanged.connect(self.update_preview)
         self.y_splits_spin.valueChanged.connect(self.update_preview)
+        self.split_mode_combo.currentTextChanged.connect(self.on_split_mode_changed)
+        self.tile_size_spin.valueChanged.connect(self.update_preview)
+        self.pyramid_layout_combo.currentTextChanged.connect(self.update_preview)
+        self.overlap_spin.setEnabled(False)
+        self.dataset_tile_spin.valueChanged.connect(
+            lambda v: self.dataset_overlap_spin.setMaximum(v - 1)
+        )
+        self.dataset_tile_spin.valueChanged.connect(self.update_preview)
+        self.dataset_overlap_spin.valueChanged.connect(self.update_preview)
+        self.edge_mode_combo.currentTextChanged.connect(self.update_preview)
+        self.container_combo.currentTextChanged.connect(self.on_split_mode_changed)
+        self.min_gutter_spin.valueChanged.connect(self.update_preview)
+
+    def on_split_mode_changed(self):
+        """切换分割方式时显示对应的设置"""
+        mode = SPLIT_MODE_OPTIONS[self.split_mode_combo.currentText()]
+        self.grid_widget.setVisible(mode == 'grid')
+        self.pyramid_widget.setVisible(mode == 'pyramid')
+        self.tiles_widget.setVisible(mode == 'tiles')
+        self.gutter_widget.setVisible(mode == 'gutter')
+        if mode == 'pyramid':
+            self.note_label.setText("注意：瓦片保存在 原文件名_pyramid 文件夹中，再次生成时只更新内容发生变化的瓦片")
+        elif mode == 'tiles' and OUTPUT_CONTAINER_OPTIONS[self.container_combo.currentText()] == 'npy':
+            self.note_label.setText("注意：所有图片的瓦片写入 tiles_尺寸_npy 文件夹中的 .npy 分片，索引为 index.csv / index.json")
+        elif mode == 'tiles':
+            self.note_label.setText("注意：瓦片与索引 manifest.csv / manifest.json 保存在 原文件名_tiles_尺寸 文件夹中")
+        elif mode == 'gutter':
+            self.note_label.setText("注意：每一格保存在 原文件名_panels 文件夹中，按从上到下、从左到右的顺序编号")
+        else:
+            self.note_label.setText("注意：等分后的图片将保存在一个新建的子文件夹中")
+        self.update_preview()
 
     def update_preview(self):
         """更新预览信息"""
+        mode = SPLIT_MODE_OPTIONS[self.split_mode_combo.currentText()]
+        if mode == 'pyramid':
+            # 只有 DZI 描述文件支持重叠像素
+            is_dzi = PYRAMID_LAYOUT_OPTIONS[self.pyramid_layout_combo.currentText()] == 'dzi'
+            self.overlap_spin.setEnabled(is_dzi)
+            tile_size = self.tile_size_spin.value()
+            self.preview_label.setText(
+                f"将生成 {tile_size}×{tile_size} 瓦片的多级金字塔（{self.pyramid_layout_combo.currentText()}），"
+                f"每一级由上一级缩小一半得到"
+            )
+            return
+        if mode == 'tiles':
+            tile_size = self.dataset_tile_spin.value()
+            stride = tile_size - self.dataset_overlap_spin.value()
+            self.preview_label.setText(
+                f"将切分为 {tile_size}×{tile_size} 的瓦片，步长 {stride}，"
+                f"边缘{self.edge_mode_combo.currentText()}"
+            )
+            return
+        if mode == 'gutter':
+            self.preview_label.setText(
+                f"将在缩小的灰度图上检测宽度不小于 {self.min_gutter_spin.value()} 像素的分隔带，并沿分隔带切分"
+            )
+            return
         x_splits = self.x_splits_spin.value()
         y_splits = self.y_splits_spin.value()
         total = x_splits * y_splits
@@ -174,14 +464,29 @@ class GridSplitParamsCard(CardWidget):
 
     def get_params(self):
         """获取参数"""
-        output_format = self.format_combo.currentText()
-        if output_format == "保持原格式":
-            output_format = None
+        output_format = OUTPUT_FORMAT_OPTIONS[self.format_combo.currentText()]
+
+        layout = PYRAMID_LAYOUT_OPTIONS[self.pyramid_layout_combo.currentText()]
 
         return {
+            'split_mode': SPLIT_MODE_OPTIONS[self.split_mode_combo.currentText()],
+            'tile_size': self.tile_size_spin.value(),
+            'pyramid_layout': layout,
+            'overlap': self.overlap_spin.value() if layout == 'dzi' else 0,
+            'dataset_tile_size': self.dataset_tile_spin.value(),
+            'stride': self.dataset_tile_spin.value() - self.dataset_overlap_spin.value(),
+            'edge_mode': EDGE_MODE_OPTIONS[self.edge_mode_combo.currentText()],
+            'container': OUTPUT_CONTAINER_OPTIONS[self.container_combo.currentText()],
+            'skip_blank': self.skip_blank_switch.isChecked(),
+            'blank_threshold': self.blank_threshold_spin.value(),
+            'dedupe': self.dedupe_switch.isChecked(),
+            'gutter_tolerance': self.gutter_tolerance_spin.value(),
+            'min_gutter': self.min_gutter_spin.value(),
             'x_splits': self.x_splits_spin.value(),
             'y_splits': self.y_splits_spin.value(),
             'quality': self.quality_slider.value(),
             'output_format': output_format,
+            'png_mode': PNG_MODE_OPTIONS[self.png_mode_combo.currentText()],
+            'encoder_preset': ENCODER_PRESET_OPTIONS[self.encoder_preset_combo.currentText()],
             'output_dir': self.output_dir_edit.text().strip() or None
         }
\ No newline at end of file
@@ -8,9 +8,117 @@ from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QFileDialog, QWidget
 from PySide6.QtCore import Signal, Qt
 from qfluentwidgets import (
     CardWidget, BodyLabel, RadioButton, ComboBox, SwitchButton,
-    SpinBox, LineEdit, PushButton, Slider, StrongBodyLabel
+    SpinBox, DoubleSpinBox, LineEdit, PushButton, Slider, StrongBodyLabel
 )
 
+# PNG 模式选项与 image_processor.PNG_MODES 的对应关系
+PNG_MODE_OPTIONS = {
+    "无损": "lossless",
+    "调色板": "palette",
+    "调色板+抖动": "palette_dither"
+}
+
+# PNG 无损优化力度选项，对应 png_encoder.PNG_EFFORT_TRIALS 的级别
+PNG_EFFORT_OPTIONS = {
+    "关闭": 0,
+    "快速": 1,
+    "标准": 2,
+    "极致": 3
+}
+
+# 输出格式选项，"自动" 对应 format_selector.AUTO_FORMAT（按图片内容试编码后选择）
+OUTPUT_FORMAT_OPTIONS = {
+    "保持原格式": None,
+    "自动": "AUTO",
+    "JPEG": "JPEG",
+    "PNG": "PNG",
+    "WEBP": "WEBP"
+}
+
+# 缩放算法选项，对应 resampling.RESAMPLE_POLICIES
+RESAMPLE_OPTIONS = {
+    "自动": "auto",
+    "最近邻": "nearest",
+    "双线性": "bilinear",
+    "双三次": "bicubic",
+    "Lanczos": "lanczos"
+}
+
+# 尺寸统一的缩放方式选项，对应 resampling.FIT_MODES
+FIT_MODE_OPTIONS = {
+    "补边": "pad",
+    "适应": "fit",
+    "填充裁剪": "fill",
+    "拉伸": "stretch"
+}
+
+# 输出方式选项，对应 tensor_shards.OUTPUT_CONTAINERS
+OUTPUT_CONTAINER_OPTIONS = {
+    "图片文件": "files",
+    "NumPy 数组 (.npy)": "npy"
+}
+
+# 编码速度档位选项，对应 encoder_profiles.ENCODER_PRESETS
+ENCODER_PRESET_OPTIONS = {
+    "快速": "fast",
+    "均衡": "balanced",
+    "极致": "max"
+}
+
+
+def create_png_mode_combo() -> ComboBox:
+    """创建 PNG 模式下拉框"""
+    combo = ComboBox()
+    combo.addItems(list(PNG_MODE_OPTIONS))
+    combo.setMinimumWidth(150)
+    combo.setToolTip("调色板模式将 PNG 量化为最多 256 色（保留透明度），适合截图和界面素材")
+    return combo
+
+
+def create_encoder_preset_combo() -> ComboBox:
+    """创建编码速度下拉框，默认为均衡"""
+    combo = ComboBox()
+    combo.addItems(list(ENCODER_PRESET_OPTIONS))
+    combo.setCurrentText("均衡")
+    combo.setMinimumWidth(120)
+    combo.setToolTip("快速：编码最快、体积略大；极致：JPEG 渐进式、WEBP method 6 等，体积最小但最慢")
+    return combo
+
+
+def create_resample_combo() -> ComboBox:
+    """创建缩放算法下拉框，默认为自动"""
+    combo = ComboBox()
+    combo.addItems(list(RESAMPLE_OPTIONS))
+    combo.setMinimumWidth(120)
+    combo.setToolTip("自动：放大用双三次，轻度缩小用 Lanczos，大幅缩小时先快速整数倍缩小再精确重采样")
+    return combo
+
+
+def create_output_container_combo() -> ComboBox:
+    """创建输出方式下拉框，默认为图片文件"""
+    combo = ComboBox()
+    combo.addItems(list(OUTPUT_CONTAINER_OPTIONS))
+    combo.setMinimumWidth(150)
+    combo.setToolTip("NumPy 数组：尺寸一致的结果直接写入 (N, H, W, C) 的 .npy 分片与 index.csv 索引，读取时无需解码")
+    return combo
+
+
+def create_output_format_combo() -> ComboBox:
+    """创建输出格式下拉框"""
+    combo = ComboBox()
+    combo.addItems(list(OUTPUT_FORMAT_OPTIONS))
+    combo.setMinimumWidth(150)
+    combo.setToolTip("自动：检查透明度与颜色数并试编码，选择体积最小且满足质量的格式")
+    return combo
+
+
+def bind_png_mode_combo(format_combo: ComboBox, png_combo: ComboBox) -> None:
+    """仅在可能输出 PNG 时启用 PNG 相关的下拉框"""
+    def update(text):
+        png_combo.setEnabled(text in ("保持原格式", "PNG"))
+    format_combo.currentTextChanged.connect(update)
+    update(format_combo.currentText())
+
 
 class StitchParamsCard(CardWidget):
     """拼接参数配置卡片"""
@@ -89,6 +197,37 @@ class StitchParamsCard(CardWidget):
         scale_group.addWidget(self.scale_spin)
         row2.addLayout(scale_group)
 
+        png_mode_group = QHBoxLayout()
+        png_mode_group.setSpacing(12)
+        png_mode_label = BodyLabel("PNG 模式")
+        png_mode_label.setStyleSheet("color: #666;")
+        png_mode_group.addWidget(png_mode_label)
+        self.png_mode_combo = create_png_mode_combo()
+        png_mode_group.addWidget(self.png_mode_combo)
+        row2.addLayout(png_mode_group)
+
+        # 编码速度
+        preset_group = QHBoxLayout()
+        preset_group.setSpacing(12)
+        preset_label = BodyLabel("编码速度")
+        preset_label.setStyleSheet("color: #666;")
+        preset_group.addWidget(preset_label)
+        self.encoder_preset_combo = create_encoder_preset_combo()
+        preset_group.addWidget(self.encoder_preset_combo)
+        row2.addLayout(preset_group)
+
+        # 自动格式：按拼接结果的内容选择 JPEG / PNG / WEBP
+        auto_format_group = QHBoxLayout()
+        auto_format_group.setSpacing(12)
+        auto_format_label = BodyLabel("自动格式")
+        auto_format_label.setStyleSheet("color: #666;")
+        auto_format_group.addWidget(auto_format_label)
+        self.auto_format_switch = SwitchButton()
+        self.auto_format_switch.setToolTip("关闭时按输入格式决定输出格式；开启后试编码并选择体积最小的格式")
+        self.auto_format_switch.checkedChanged.connect(lambda checked: self.png_mode_combo.setEnabled(not checked))
+        auto_format_group.addWidget(self.auto_format_switch)
+        row2.addLayout(auto_format_group)
+
         row2.addStretch()
         layout.addLayout(row2)
 
@@ -169,12 +308,16 @@ class StitchParamsCard(CardWidget):
             'output_dir': self.output_dir,
             'output_name': self.name_edit.text(),
             'is_horizontal': self.horizontal_radio.isChecked(),
-            'align_mode': align_mode
+            'align_mode': align_mode,
+            'png_mode': PNG_MODE_OPTIONS[self.png_mode_combo.currentText()],
+            'encoder_preset': ENCODER_PRESET_OPTIONS[self.encoder_preset_combo.currentText()],
+            'output_format': "AUTO" if self.auto_format_switch.isChecked() else None
         }
 
 
 class CompressParamsCard(CardWidget):
     """压缩参数配置卡片"""
+    params_changed = Signal()  # 影响输出体积的参数变化信号
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -205,18 +348,40 @@ class CompressParamsCard(CardWidget):
         scale_group.addWidget(self.scale_spin)
         row1.addLayout(scale_group)
 
+        # 缩放算法（仅在缩放时生效）
+        resample_group = QHBoxLayout()
+        resample_group.setSpacing(12)
+        resample_label = BodyLabel("缩放算法")
+        resample_label.setStyleSheet("color: #666;")
+        resample_group.addWidget(resample_label)
+        self.resample_combo = create_resample_combo()
+        self.resample_combo.setEnabled(False)
+        self.scale_spin.valueChanged.connect(lambda v: self.resample_combo.setEnabled(v < 100))
+        resample_group.addWidget(self.resample_combo)
+        row1.addLayout(resample_group)
+
         # 输出格式
         format_group = QHBoxLayout()
         format_group.setSpacing(12)
         format_label = BodyLabel("输出格式")
         format_label.setStyleSheet("color: #666;")
         format_group.addWidget(format_label)
-        self.format_combo = ComboBox()
-        self.format_combo.addItems(["保持原格式", "JPEG", "PNG", "WEBP"])
-        self.format_combo.setMinimumWidth(150)
+        self.format_combo = create_output_format_combo()
         format_group.addWidget(self.format_combo)
         row1.addLayout(format_group)
 
+        # 源 JPEG 质量不高于输出质量时不再重新编码
+        low_quality_group = QHBoxLayout()
+        low_quality_group.setSpacing(12)
+        low_quality_label = BodyLabel("跳过低质量 JPEG")
+        low_quality_label.setStyleSheet("color: #666;")
+        low_quality_group.addWidget(low_quality_label)
+        self.low_quality_switch = SwitchButton()
+        self.low_quality_switch.setChecked(True)
+        self.low_quality_switch.setToolTip("根据量化表估算源 JPEG 质量，不高于输出质量时直接保留原图")
+        low_quality_group.addWidget(self.low_quality_switch)
+        row1.addLayout(low_quality_group)
+
         row1.addStretch()
         layout.addLayout(row1)
 
@@ -256,7 +421,88 @@ class CompressParamsCard(CardWidget):
         row2.addLayout(quality_input_layout)
         layout.addLayout(row2)
 
-        # 第三行：输出目录
+        # 第三行：目标 SSIM（按感知质量自动选择最低输出质量）
+        ssim_row = QHBoxLayout()
+        ssim_row.setSpacing(32)
+
+        ssim_group = QHBoxLayout()
+        ssim_group.setSpacing(12)
+        ssim_label = BodyLabel("目标 SSIM")
+        ssim_label.setStyleSheet("color: #666;")
+        ssim_group.addWidget(ssim_label)
+        self.ssim_switch = SwitchButton()
+        self.ssim_switch.checkedChanged.connect(self.toggle_target_ssim)
+        ssim_group.addWidget(self.ssim_switch)
+        self.ssim_spin = DoubleSpinBox()
+        self.ssim_spin.setRange(0.80, 0.999)
+        self.ssim_spin.setDecimals(3)
+        self.ssim_spin.setSingleStep(0.005)
+        self.ssim_spin.setValue(0.95)
+        self.ssim_spin.setMinimumWidth(150)
+        self.ssim_spin.setEnabled(False)
+        self.ssim_spin.setToolTip("仅对 JPEG/WEBP 输出生效，输出质量作为上限")
+        ssim_group.addWidget(self.ssim_spin)
+        ssim_row.addLayout(ssim_group)
+
+        # 重新编码后体积变大时的处理方式
+        larger_group = QHBoxLayout()
+        larger_group.setSpacing(12)
+        larger_label = BodyLabel("体积变大时")
+        larger_label.setStyleSheet("color: #666;")
+        larger_group.addWidget(larger_label)
+        self.larger_combo = ComboBox()
+        self.larger_combo.addItems(["保留原图", "跳过文件", "仍然输出"])
+        self.larger_combo.setMinimumWidth(150)
+        self.larger_combo.setToolTip("保留原图仅在未缩放且格式不变时生效")
+        larger_group.addWidget(self.larger_combo)
+        ssim_row.addLayout(larger_group)
+
+        ssim_row.addStretch()
+        layout.addLayout(ssim_row)
+
+        # 第四行：PNG 选项与编码速度
+        png_row = QHBoxLayout()
+        png_row.setSpacing(32)
+
+        png_mode_group = QHBoxLayout()
+        png_mode_group.setSpacing(12)
+        png_mode_label = BodyLabel("PNG 模式")
+        png_mode_label.setStyleSheet("color: #666;")
+        png_mode_group.addWidget(png_mode_label)
+        self.png_mode_combo = create_png_mode_combo()
+        png_mode_group.addWidget(self.png_mode_combo)
+        png_row.addLayout(png_mode_group)
+
+        # 并行尝试多种过滤方式与压缩策略，力度越高越慢
+        png_effort_group = QHBoxLayout()
+        png_effort_group.setSpacing(12)
+        png_effort_label = BodyLabel("PNG 优化")
+        png_effort_label.setStyleSheet("color: #666;")
+        png_effort_group.addWidget(png_effort_label)
+        self.png_effort_combo = ComboBox()
+        self.png_effort_combo.addItems(list(PNG_EFFORT_OPTIONS))
+        self.png_effort_combo.setMinimumWidth(150)
+        self.png_effort_combo.setToolTip("无损优化：并行尝试多种过滤方式与 zlib 压缩策略，保留体积最小的结果")
+        png_effort_group.addWidget(self.png_effort_combo)
+        png_row.addLayout(png_effort_group)
+
+        # 编码速度
+        preset_group = QHBoxLayout()
+        preset_group.setSpacing(12)
+        preset_label = BodyLabel("编码速度")
+        preset_label.setStyleSheet("color: #666;")
+        preset_group.addWidget(preset_label)
+        self.encoder_preset_combo = create_encoder_preset_combo()
+        preset_group.addWidget(self.encoder_preset_combo)
+        png_row.addLayout(preset_group)
+
+        bind_png_mode_combo(self.format_combo, self.png_mode_combo)
+        bind_png_mode_combo(self.format_combo, self.png_effort_combo)
+
+        png_row.addStretch()
+        layout.addLayout(png_row)
+
+        # 第五行：输出目录
         row3 = QHBoxLayout()
         row3.setSpacing(12)
 
@@ -276,6 +522,21 @@ class CompressParamsCard(CardWidget):
 
         layout.addLayout(row3)
 
+        self.scale_spin.valueChanged.connect(self.params_changed)
+        self.format_combo.currentTextChanged.connect(self.params_changed)
+        self.quality_slider.valueChanged.connect(self.params_changed)
+        self.ssim_switch.checkedChanged.connect(self.params_changed)
+        self.ssim_spin.valueChanged.connect(self.params_changed)
+        self.png_mode_combo.currentTextChanged.connect(self.params_changed)
+        self.png_effort_combo.currentTextChanged.connect(self.params_changed)
+        self.encoder_preset_combo.currentTextChanged.connect(self.params_changed)
+        self.resample_combo.currentTextChanged.connect(self.params_changed)
+        self.larger_combo.currentTextChanged.connect(self.params_changed)
+        self.low_quality_switch.checkedChanged.connect(self.params_changed)
+
+    def toggle_target_ssim(self, checked):
+        self.ssim_spin.setEnabled(checked)
+
     def select_output_dir(self):
         directory = QFileDialog.getExistingDirectory(self, "选择输出目录")
         if directory:
@@ -284,14 +545,25 @@ class CompressParamsCard(CardWidget):
 
     def get_params(self):
         """获取参数配置"""
-        format_text = self.format_combo.currentText()
-        output_format = None if format_text == "保持原格式" else format_text
+        output_format = OUTPUT_FORMAT_OPTIONS[self.format_combo.currentText()]
+        larger_policy_map = {
+            "保留原图": "copy",
+            "跳过文件": "skip",
+            "仍然输出": "keep"
+        }
 
         return {
             'scale': self.scale_spin.value(),
             'quality': self.quality_slider.value(),
             'output_format': output_format,
-            'output_dir': self.output_dir
+            'output_dir': self.output_dir,
+            'target_ssim': self.ssim_spin.value() if self.ssim_switch.isChecked() else None,
+            'larger_policy': larger_policy_map[self.larger_combo.currentText()],
+            'skip_low_quality_jpeg': self.low_quality_switch.isChecked(),
+            'png_mode': PNG_MODE_OPTIONS[self.png_mode_combo.currentText()],
+            'png_effort': PNG_EFFORT_OPTIONS[self.png_effort_combo.currentText()],
+            'encoder_preset': ENCODER_PRESET_OPTIONS[self.encoder_preset_combo.currentText()],
+            'resample': RESAMPLE_OPTIONS[self.resample_combo.currentText()]
         }
 
 
@@ -328,6 +600,32 @@ class ResizeParamsCard(CardWidget):
         mode_group.addWidget(self.min_radio)
 
         row1.addLayout(mode_group)
+
+        # 缩放方式
+        fit_group = QHBoxLayout()
+        fit_group.setSpacing(12)
+        fit_label = BodyLabel("缩放方式")
+        fit_label.setStyleSheet("color: #666;")
+        fit_group.addWidget(fit_label)
+        self.fit_mode_combo = ComboBox()
+        self.fit_mode_combo.addItems(list(FIT_MODE_OPTIONS))
+        self.fit_mode_combo.setMinimumWidth(120)
+        self.fit_mode_combo.setToolTip(
+            "补边：保持比例缩放后居中补边；适应：保持比例完整放入目标尺寸（输出尺寸可能不同）；"
+            "填充裁剪：保持比例铺满后居中裁剪；拉伸：直接拉伸到目标尺寸"
+        )
+        fit_group.addWidget(self.fit_mode_combo)
+        row1.addLayout(fit_group)
+
+        resample_group = QHBoxLayout()
+        resample_group.setSpacing(12)
+        resample_label = BodyLabel("缩放算法")
+        resample_label.setStyleSheet("color: #666;")
+        resample_group.addWidget(resample_label)
+        self.resample_combo = create_resample_combo()
+        resample_group.addWidget(self.resample_combo)
+        row1.addLayout(resample_group)
+
         row1.addStretch()
         layout.addLayout(row1)
 
@@ -335,18 +633,47 @@ class ResizeParamsCard(CardWidget):
         row2 = QHBoxLayout()
         row2.setSpacing(32)
 
+        # 输出方式
+        container_group = QHBoxLayout()
+        container_group.setSpacing(12)
+        container_label = BodyLabel("输出为")
+        container_label.setStyleSheet("color: #666;")
+        container_group.addWidget(container_label)
+        self.container_combo = create_output_container_combo()
+        container_group.addWidget(self.container_combo)
+        row2.addLayout(container_group)
+
         # 输出格式
         format_group = QHBoxLayout()
         format_group.setSpacing(12)
         format_label = BodyLabel("输出格式")
         format_label.setStyleSheet("color: #666;")
         format_group.addWidget(format_label)
-        self.format_combo = ComboBox()
-        self.format_combo.addItems(["保持原格式", "JPEG", "PNG", "WEBP"])
-        self.format_combo.setMinimumWidth(150)
+        self.format_combo = create_output_format_combo()
         format_group.addWidget(self.format_combo)
         row2.addLayout(format_group)
 
+        # PNG 模式
+        png_mode_group = QHBoxLayout()
+        png_mode_group.setSpacing(12)
+        png_mode_label = BodyLabel("PNG 模式")
+        png_mode_label.setStyleSheet("color: #666;")
+        png_mode_group.addWidget(png_mode_label)
+        self.png_mode_combo = create_png_mode_combo()
+        bind_png_mode_combo(self.format_combo, self.png_mode_combo)
+        png_mode_group.addWidget(self.png_mode_combo)
+        row2.addLayout(png_mode_group)
+
+        # 编码速度
+        preset_group = QHBoxLayout()
+        preset_group.setSpacing(12)
+        preset_label = BodyLabel("编码速度")
+        preset_label.setStyleSheet("color: #666;")
+        preset_group.addWidget(preset_label)
+        self.encoder_preset_combo = create_encoder_preset_combo()
+        preset_group.addWidget(self.encoder_preset_combo)
+        row2.addLayout(preset_group)
+
         row2.addStretch()
         layout.addLayout(row2)
 
@@ -386,6 +713,9 @@ class ResizeParamsCard(CardWidget):
         row3.addLayout(quality_input_layout)
         layout.addLayout(row3)
 
+        # 输出为 NumPy 数组时不编码图片，编码相关设置不生效
+        self.container_combo.currentTextChanged.connect(self.on_container_changed)
+
         # 第四行：输出目录
         row4 = QHBoxLayout()
         row4.setSpacing(12)
@@ -412,16 +742,27 @@ class ResizeParamsCard(CardWidget):
             self.output_dir = directory
             self.dir_edit.setText(directory)
 
+    def on_container_changed(self, text):
+        """切换输出方式时启用或禁用编码相关设置"""
+        encode = OUTPUT_CONTAINER_OPTIONS[text] == 'files'
+        for widget in (self.format_combo, self.encoder_preset_combo, self.quality_slider):
+            widget.setEnabled(encode)
+        self.png_mode_combo.setEnabled(encode and self.format_combo.currentText() in ("保持原格式", "PNG"))
+
     def get_params(self):
         """获取参数配置"""
-        format_text = self.format_combo.currentText()
-        output_format = None if format_text == "保持原格式" else format_text
+        output_format = OUTPUT_FORMAT_OPTIONS[self.format_combo.currentText()]
         resize_mode = "max" if self.max_radio.isChecked() else "min"
 
         return {
             'resize_mode': resize_mode,
             'quality': self.quality_slider.value(),
             'output_format': output_format,
+            'png_mode': PNG_MODE_OPTIONS[self.png_mode_combo.currentText()],
+            'encoder_preset': ENCODER_PRESET_OPTIONS[self.encoder_preset_combo.currentText()],
+            'resample': RESAMPLE_OPTIONS[self.resample_combo.currentText()],
+            'fit_mode': FIT_MODE_OPTIONS[self.fit_mode_combo.currentText()],
+            'container': OUTPUT_CONTAINER_OPTIONS[self.container_combo.currentText()],
             'output_dir': self.output_dir
         }
 
@@ -463,6 +804,16 @@ class GeminiWatermarkParamsCard(CardWidget):
         format_group.addWidget(self.format_combo)
         row2.addLayout(format_group)
 
+        # 编码速度
+        preset_group = QHBoxLayout()
+        preset_group.setSpacing(12)
+        preset_label = BodyLabel("编码速度")
+        preset_label.setStyleSheet("color: #666;")
+        preset_group.addWidget(preset_label)
+        self.encoder_preset_combo = create_encoder_preset_combo()
+        preset_group.addWidget(self.encoder_preset_combo)
+        row2.addLayout(preset_group)
+
         row2.addStretch()
         layout.addLayout(row2)
 
@@ -536,5 +887,6 @@ class GeminiWatermarkParamsCard(CardWidget):
         return {
             'output_format': output_format,
             'quality': self.quality_slider.value(),
+            'encoder_preset': ENCODER_PRESET_OPTIONS[self.encoder_preset_combo.currentText()],
             'output_dir': self.output_dir
         }
\ No newline at end of file
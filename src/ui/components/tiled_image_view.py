@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分级瓦片图片预览组件
+
+大图不再整张加载为一个 QPixmap：
+- 打开时只读取文件头确定尺寸，在后台线程中解码一张与屏幕相当的缩略图（JPEG 用 draft() 在解码时缩小，
+  未压缩的 BMP/TIFF/PPM 通过内存映射隔行采样），缩略图就绪前界面不被阻塞
+- 放大到缩略图分辨率不足时，按当前缩放比例选择金字塔级别（每级缩小一半），只为可见区域的瓦片
+  在后台线程池中解码，就绪后逐块重绘；尚未就绪的区域先用缩略图填充
+- 瓦片以 QPixmap 缓存在 LRU 中，显存与内存占用由缓存容量决定，与原图尺寸无关
+场景坐标始终是原图像素坐标，分割区域的换算方式与整图加载时相同。
+"""
+
+import math
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Optional, Tuple, Any
+from PIL import Image
+from PySide6.QtWidgets import QGraphicsObject, QGraphicsView, QStyleOptionGraphicsItem, QGraphicsItem
+from PySide6.QtCore import Qt, QRectF, Signal
+from PySide6.QtGui import QPainter, QPixmap, QImage
+
+from ...core.raw_mapping import open_mapped, open_for_crop
+from ...core.resampling import reducible_image
+
+logger = logging.getLogger('ImageStitcher.tiled_image_view')
+
+# 缩略图最长边
+PROXY_MAX_SIDE = 2048
+
+# 瓦片边长（所在级别的像素）
+TILE_SIZE = 512
+
+# 瓦片缓存容量（块数），RGBA 512x512 每块约 1 MB
+TILE_CACHE_SIZE = 128
+
+# 同时保留的已解码级别数（非内存映射的图片放大时需要整级解码）
+LEVEL_CACHE_SIZE = 2
+
+# 解码瓦片的线程数
+TILE_WORKERS = 2
+
+# 视图缩放范围（相对于适应窗口的比例）与每格滚轮的缩放倍数
+MAX_ZOOM = 4.0
+WHEEL_ZOOM_STEP = 1.25
+
+
+def pil_to_qimage(img: Image.Image) -> QImage:
+    """将 PIL 图片转换为 QImage（可在后台线程中调用）"""
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+    if img.mode == 'RGB':
+        qimage = QImage(img.tobytes(), img.width, img.height, img.width * 3, QImage.Format_RGB888)
+    else:
+        qimage = QImage(img.tobytes(), img.width, img.height, img.width * 4, QImage.Format_RGBA8888)
+    # QImage 不持有传入的字节，复制一份
+    return qimage.copy()
+
+
+class TiledImageItem(QGraphicsObject):
+    """按缩放级别逐块加载的图片图元，边界为原图像素尺寸"""
+    proxy_loaded = Signal(object)
+    tile_loaded = Signal(object, object)
+    tile_failed = Signal(object)
+    load_failed = Signal(str)
+
+    def __init__(self, filepath: str, parent=None):
+        super().__init__(parent)
+        self.filepath = filepath
+        with open_for_crop(filepath) as img:
+            self.image_size: Tuple[int, int] = img.size
+            self.format = img.format
+        width, height = self.image_size
+        # 级别 k 的尺寸为原图的 1/2^k，最高一级不小于一块瓦片
+        self.max_level = max(0, math.ceil(math.log2(max(width, height) / TILE_SIZE)))
+
+        self._proxy: Optional[QPixmap] = None
+        self._proxy_scale = 0.0
+        self._cache: 'OrderedDict[Tuple[int, int, int], QPixmap]' = OrderedDict()
+        self._pending: Dict[Tuple[int, int, int], Future] = {}
+        self._current_level: Optional[int] = None
+        self._closed = False
+
+        # 以下只在工作线程中访问
+        self._source_lock = threading.Lock()
+        self._mapped = None
+        self._levels: 'OrderedDict[int, Image.Image]' = OrderedDict()
+
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption, True)
+        self.proxy_loaded.connect(self._on_proxy_loaded)
+        self.tile_loaded.connect(self._on_tile_loaded)
+        self.tile_failed.connect(self._on_tile_failed)
+
+        self._executor = ThreadPoolExecutor(max_workers=TILE_WORKERS)
+        self._executor.submit(self._load_proxy)
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self.image_size[0], self.image_size[1])
+
+    def close(self) -> None:
+        """停止后台解码并释放缓存（移出场景前调用）"""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._cache.clear()
+        self._pending.clear()
+        with self._source_lock:
+            self._levels.clear()
+            if self._mapped is not None:
+                self._mapped.close()
+                self._mapped = None
+
+    # ---- 界面线程 ----
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None) -> None:
+        if self._proxy is None:
+            return
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+        painter.drawPixmap(self.boundingRect(), self._proxy, QRectF(self._proxy.rect()))
+
+        scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if scale <= self._proxy_scale:
+            return
+
+        level = min(self.max_level, max(0, math.floor(math.log2(1 / scale)))) if scale < 1 else 0
+        if level != self._current_level:
+            # 缩放级别变化后，其他级别排队中的瓦片不再需要
+            for key, future in list(self._pending.items()):
+                if key[0] != level and future.cancel():
+                    del self._pending[key]
+            self._current_level = level
+
+        span = TILE_SIZE << level
+        # 只请求窗口内可见的瓦片（exposedRect 在整体重绘时可能是整个图元）
+        visible = painter.worldTransform().inverted()[0].mapRect(QRectF(painter.viewport()))
+        exposed = option.exposedRect.intersected(visible).intersected(self.boundingRect())
+        if exposed.isEmpty():
+            return
+        first_col, last_col = int(exposed.left() // span), int(math.ceil(exposed.right() / span))
+        first_row, last_row = int(exposed.top() // span), int(math.ceil(exposed.bottom() / span))
+        for row in range(first_row, last_row):
+            for col in range(first_col, last_col):
+                key = (level, col, row)
+                pixmap = self._cache.get(key)
+                if pixmap is None:
+                    self._request_tile(key)
+                    continue
+                self._cache.move_to_end(key)
+                target = QRectF(col * span, row * span, pixmap.width() << level, pixmap.height() << level)
+                painter.drawPixmap(target.intersected(self.boundingRect()), pixmap, QRectF(
+                    0, 0, min(pixmap.width(), (self.image_size[0] - col * span) / (1 << level)),
+                    min(pixmap.height(), (self.image_size[1] - row * span) / (1 << level))
+                ))
+
+    def _request_tile(self, key: Tuple[int, int, int]) -> None:
+        if self._closed or key in self._pending:
+            return
+        self._pending[key] = self._executor.submit(self._load_tile, key)
+
+    def _on_proxy_loaded(self, qimage: QImage) -> None:
+        if self._closed:
+            return
+        self._proxy = QPixmap.fromImage(qimage)
+        self._proxy_scale = self._proxy.width() / self.image_size[0]
+        self.update()
+
+    def _on_tile_loaded(self, key: Tuple[int, int, int], qimage: QImage) -> None:
+        self._pending.pop(key, None)
+        if self._closed:
+            return
+        self._cache[key] = QPixmap.fromImage(qimage)
+        while len(self._cache) > TILE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        level, col, row = key
+        span = TILE_SIZE << level
+        self.update(QRectF(col * span, row * span, span, span))
+
+    def _on_tile_failed(self, key: Tuple[int, int, int]) -> None:
+        # 移出排队记录，之后重绘时可以再次请求
+        self._pending.pop(key, None)
+
+    # ---- 工作线程 ----
+
+    def _emit(self, signal: Any, *args) -> None:
+        """图元可能已被删除，此时丢弃结果"""
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            pass
+
+    def _load_proxy(self) -> None:
+        try:
+            width, height = self.image_size
+            factor = max(1, math.ceil(max(width, height) / PROXY_MAX_SIDE))
+            with self._source_lock:
+                self._mapped = open_mapped(self.filepath)
+                if self._mapped is not None:
+                    proxy = self._mapped.proxy(PROXY_MAX_SIDE)
+                else:
+                    with Image.open(self.filepath) as img:
+                        if img.format == 'JPEG' and factor > 1:
+                            img.draft('RGB', (width // factor, height // factor))
+                        img.load()
+                        if img.size == self.image_size:
+                            # 已经整图解码，留作放大时的第 0 级（转换为可以逐级缩小的模式）
+                            img = reducible_image(img)
+                            self._levels[0] = img
+                        proxy = img.copy()
+                proxy.thumbnail((PROXY_MAX_SIDE, PROXY_MAX_SIDE))
+            self._emit(self.proxy_loaded, pil_to_qimage(proxy))
+        except Exception as e:
+            logger.error(f"Proxy load error: {e}", exc_info=True)
+            self._emit(self.load_failed, str(e))
+
+    def _level_image(self, level: int) -> Image.Image:
+        """取得第 level 级的整图（调用方持有 _source_lock）"""
+        if level in self._levels:
+            self._levels.move_to_end(level)
+            return self._levels[level]
+
+        width, height = self.image_size
+        if level > 0 and 0 in self._levels:
+            img = self._levels[0].reduce(1 << level)
+        else:
+            img = Image.open(self.filepath)
+            if img.format == 'JPEG' and level > 0:
+                # JPEG 在解码时直接缩小到 1/2、1/4 或 1/8
+                img.draft('RGB', (width >> level, height >> level))
+            img.load()
+            img = reducible_image(img)
+            target = (max(1, width >> level), max(1, height >> level))
+            if img.size != target:
+                img = img.resize(target, Image.Resampling.BOX)
+        self._levels[level] = img
+        while len(self._levels) > LEVEL_CACHE_SIZE:
+            self._levels.popitem(last=False)
+        return img
+
+    def _load_tile(self, key: Tuple[int, int, int]) -> None:
+        level, col, row = key
+        if self._closed:
+            self._emit(self.tile_failed, key)
+            return
+        try:
+            factor = 1 << level
+            with self._source_lock:
+                if self._mapped is not None:
+                    # 内存映射：只读取瓦片覆盖的原图区域再缩小
+                    span = TILE_SIZE * factor
+                    tile = self._mapped.crop((col * span, row * span, (col + 1) * span, (row + 1) * span))
+                    if factor > 1:
+                        tile = reducible_image(tile).reduce(factor)
+                else:
+                    source = self._level_image(level)
+                    box = (col * TILE_SIZE, row * TILE_SIZE, (col + 1) * TILE_SIZE, (row + 1) * TILE_SIZE)
+                    tile = source.crop((box[0], box[1], min(box[2], source.width), min(box[3], source.height)))
+            self._emit(self.tile_loaded, key, pil_to_qimage(tile))
+        except Exception as e:
+            logger.error(f"Tile load error {key}: {e}", exc_info=True)
+            self._emit(self.tile_failed, key)
+
+
+class ZoomableGraphicsView(QGraphicsView):
+    """支持滚轮缩放（以鼠标位置为中心）与拖动平移的图形视图"""
+
+    def __init__(self, scene=None, parent=None):
+        super().__init__(scene, parent)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self._fit_scale = 1.0
+
+    def fit_item(self, item: QGraphicsItem) -> None:
+        """缩放到完整显示图元，并以此作为最小缩放比例"""
+        self.fitInView(item, Qt.AspectRatioMode.KeepAspectRatio)
+        self._fit_scale = self.transform().m11()
+
+    def wheelEvent(self, event) -> None:
+        delta = event.angleDelta().y()
+        if not delta or not self.scene() or self.scene().sceneRect().isEmpty():
+            return super().wheelEvent(event)
+        factor = WHEEL_ZOOM_STEP ** (delta / 120)
+        current = self.transform().m11()
+        # 最小为适应窗口，最大为原图像素的 MAX_ZOOM 倍
+        target = min(max(current * factor, self._fit_scale), max(MAX_ZOOM, self._fit_scale))
+        if target != current:
+            self.scale(target / current, target / current)
+        event.accept()
@@ -6,7 +6,7 @@
 
 import os
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from qfluentwidgets import (
     TitleLabel, CaptionLabel, PushButton, PrimaryPushButton,
     ProgressBar, InfoBar, InfoBarPosition, MessageBox
@@ -14,7 +14,15 @@ from qfluentwidgets import (
 
 from ..components.file_list_widget import FileListWidget
 from ..components.params_card import CompressParamsCard
+from ..components.compress_preview_card import CompressPreviewCard
 from ...core.image_processor import CompressThread
+from ...core.batch_planner import BatchPlanThread, summarize_plan
+from ...core.compress_preview import CompressPreviewThread
+from ...core.rd_sweep import RateDistortionSweepThread, DEFAULT_SWEEP_FORMATS
+from ...core.variant_generator import VariantThread, DEFAULT_VARIANTS, DEFAULT_VARIANT_FORMATS
+
+# 参数停止变化多久后开始预览（毫秒）
+PREVIEW_DEBOUNCE_MS = 400
 
 
 class ImageCompressPage(QWidget):
@@ -22,6 +30,9 @@ class ImageCompressPage(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.preview_request_id = 0
+        # 保留仍在运行的预览线程的引用，避免线程对象在运行中被回收
+        self.preview_threads = []
         self.setup_ui()
 
     def setup_ui(self):
@@ -41,13 +52,25 @@ class ImageCompressPage(QWidget):
 
         # 文件列表组件
         self.file_list = FileListWidget()
+        # 列表附带 JPEG 源文件的估算质量，文件变化时由列表自行重建
+        self.file_list.show_quality = True
         self.file_list.files_changed.connect(self.on_files_changed)
         layout.addWidget(self.file_list)
 
         # 参数设置卡片
         self.params_card = CompressParamsCard()
+        self.params_card.params_changed.connect(self.schedule_preview)
         layout.addWidget(self.params_card)
 
+        # 压缩预览卡片
+        self.preview_card = CompressPreviewCard()
+        layout.addWidget(self.preview_card)
+
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.start_preview)
+
         # 弹性空间
         layout.addStretch(1)
 
@@ -73,6 +96,25 @@ class ImageCompressPage(QWidget):
         self.clear_btn.clicked.connect(self.clear_list)
         bottom_layout.addWidget(self.clear_btn)
 
+        self.sweep_btn = PushButton("质量扫描")
+        self.sweep_btn.setMinimumWidth(100)
+        self.sweep_btn.setToolTip("按多个质量在内存中试编码，输出体积与 SSIM 曲线（CSV/JSON），不写出图片")
+        self.sweep_btn.clicked.connect(self.start_sweep)
+        bottom_layout.addWidget(self.sweep_btn)
+
+        self.variant_btn = PushButton("多规格输出")
+        self.variant_btn.setMinimumWidth(100)
+        variant_names = " / ".join(v['name'] for v in DEFAULT_VARIANTS)
+        self.variant_btn.setToolTip(f"每张图片只解码一次，生成 {variant_names} 多种尺寸与格式")
+        self.variant_btn.clicked.connect(self.start_variants)
+        bottom_layout.addWidget(self.variant_btn)
+
+        self.plan_btn = PushButton("试运行")
+        self.plan_btn.setMinimumWidth(100)
+        self.plan_btn.setToolTip("只读取文件头并抽样编码少量图片，预估耗时、输出体积与内存占用，不写出文件")
+        self.plan_btn.clicked.connect(self.start_plan)
+        bottom_layout.addWidget(self.plan_btn)
+
         self.compress_btn = PrimaryPushButton("开始压缩")
         self.compress_btn.setMinimumWidth(120)
         self.compress_btn.clicked.connect(self.start_compress)
@@ -86,6 +128,59 @@ class ImageCompressPage(QWidget):
             self.status_label.setText(f"共 {len(files)} 张图片")
         else:
             self.status_label.setText("就绪")
+        self.schedule_preview()
+
+    def schedule_preview(self):
+        """参数或文件变化后重新计时，停止变化一段时间后再开始预览"""
+        if self.file_list.get_files():
+            self.preview_card.set_pending()
+        self.preview_timer.start()
+
+    def start_preview(self):
+        """取消进行中的预览并按当前参数开始新的预览"""
+        for thread in self.preview_threads:
+            thread.cancel()
+        self.preview_threads = [t for t in self.preview_threads if t.isRunning()]
+
+        image_files = self.file_list.get_files()
+        self.preview_request_id += 1
+        if not image_files:
+            self.preview_card.clear()
+            return
+
+        params = self.params_card.get_params()
+        thread = CompressPreviewThread(
+            self.preview_request_id,
+            image_files,
+            params['scale'],
+            params['quality'],
+            params['output_format'],
+            target_ssim=params['target_ssim'],
+            png_mode=params['png_mode'],
+            png_effort=params['png_effort'],
+            encoder_preset=params['encoder_preset'],
+            resample=params['resample'],
+            larger_policy=params['larger_policy'],
+            skip_low_quality_jpeg=params['skip_low_quality_jpeg']
+        )
+        thread.finished.connect(self.on_preview_finished)
+        thread.error.connect(lambda msg, request_id=self.preview_request_id: self.on_preview_error(request_id, msg))
+        self.preview_threads.append(thread)
+        thread.start()
+
+    def on_preview_finished(self, result):
+        """预览完成（忽略已取消或过期的结果）"""
+        if result['cancelled'] or result['request_id'] != self.preview_request_id:
+            return
+        self.preview_card.set_result(result, self.file_list.format_size)
+        estimates = {f['input']: f['estimated_size'] for f in result['files']}
+        self.file_list.set_estimates(estimates)
+
+    def on_preview_error(self, request_id, error_msg):
+        """预览失败时只在预览卡片中提示，不打断操作"""
+        if request_id != self.preview_request_id:
+            return
+        self.preview_card.summary_label.setText(f"预览失败：{error_msg}")
 
     def clear_list(self):
         """清空列表"""
@@ -114,7 +209,7 @@ class ImageCompressPage(QWidget):
         params = self.params_card.get_params()
         output_dir = params['output_dir'] or os.path.dirname(image_files[0])
 
-        self.compress_btn.setEnabled(False)
+        self.set_buttons_enabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
 
@@ -123,7 +218,14 @@ class ImageCompressPage(QWidget):
             output_dir,
             params['scale'],
             params['quality'],
-            params['output_format']
+            params['output_format'],
+            target_ssim=params['target_ssim'],
+            larger_policy=params['larger_policy'],
+            skip_low_quality_jpeg=params['skip_low_quality_jpeg'],
+            png_mode=params['png_mode'],
+            png_effort=params['png_effort'],
+            encoder_preset=params['encoder_preset'],
+            resample=params['resample']
         )
         self.thread.progress.connect(self.progress_bar.setValue)
         self.thread.status.connect(lambda s: self.status_label.setText(s))
@@ -132,19 +234,272 @@ class ImageCompressPage(QWidget):
         self.thread.overwrite_request.connect(self.on_overwrite_request)
         self.thread.start()
 
+    def start_sweep(self):
+        """开始质量扫描"""
+        image_files = self.file_list.get_files()
+        if not image_files:
+            InfoBar.warning(
+                title="提示",
+                content="请先添加图片",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+            return
+
+        params = self.params_card.get_params()
+        output_dir = params['output_dir'] or os.path.dirname(image_files[0])
+        # 选择了有损格式时只扫描该格式，否则对比所有默认格式
+        if params['output_format'] in DEFAULT_SWEEP_FORMATS:
+            formats = [params['output_format']]
+        else:
+            formats = DEFAULT_SWEEP_FORMATS
+
+        self.set_buttons_enabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+
+        self.sweep_thread = RateDistortionSweepThread(
+            image_files,
+            output_dir,
+            formats=formats,
+            scale=params['scale'],
+            encoder_preset=params['encoder_preset']
+        )
+        self.sweep_thread.progress.connect(self.progress_bar.setValue)
+        self.sweep_thread.status.connect(lambda s: self.status_label.setText(s))
+        self.sweep_thread.finished.connect(self.on_sweep_finished)
+        self.sweep_thread.error.connect(self.on_sweep_error)
+        self.sweep_thread.start()
+
+    def on_sweep_finished(self, results):
+        """质量扫描完成"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+
+        output_folder = os.path.basename(results[0]['output_folder']) if results else ""
+        self.status_label.setText("质量扫描完成")
+        InfoBar.success(
+            title="完成",
+            content=f"已扫描 {len(results)} 张图片，曲线与汇总保存在文件夹: {output_folder}",
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def on_sweep_error(self, error_msg):
+        """质量扫描错误"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText("质量扫描失败")
+        InfoBar.error(
+            title="错误",
+            content=error_msg,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def start_variants(self):
+        """开始多规格输出"""
+        image_files = self.file_list.get_files()
+        if not image_files:
+            InfoBar.warning(
+                title="提示",
+                content="请先添加图片",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+            return
+
+        params = self.params_card.get_params()
+        output_dir = params['output_dir'] or os.path.dirname(image_files[0])
+        # 保持原格式与自动格式都按默认格式生成多版本
+        if params['output_format'] in ('JPEG', 'PNG', 'WEBP'):
+            formats = [params['output_format']]
+        else:
+            formats = DEFAULT_VARIANT_FORMATS
+
+        self.set_buttons_enabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+
+        self.variant_thread = VariantThread(
+            image_files,
+            output_dir,
+            formats=formats,
+            quality=params['quality'],
+            encoder_preset=params['encoder_preset']
+        )
+        self.variant_thread.progress.connect(self.progress_bar.setValue)
+        self.variant_thread.status.connect(lambda s: self.status_label.setText(s))
+        self.variant_thread.finished.connect(self.on_variants_finished)
+        self.variant_thread.error.connect(self.on_variants_error)
+        self.variant_thread.start()
+
+    def on_variants_finished(self, results):
+        """多规格输出完成"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+
+        output_folder = os.path.basename(results[0]['output_folder']) if results else ""
+        self.status_label.setText("多规格输出完成")
+        InfoBar.success(
+            title="完成",
+            content=f"已生成 {len(results)} 个文件，保存在文件夹: {output_folder}",
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def on_variants_error(self, error_msg):
+        """多规格输出错误"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText("多规格输出失败")
+        InfoBar.error(
+            title="错误",
+            content=error_msg,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def start_plan(self):
+        """开始试运行"""
+        image_files = self.file_list.get_files()
+        if not image_files:
+            InfoBar.warning(
+                title="提示",
+                content="请先添加图片",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+            return
+
+        params = self.params_card.get_params()
+        output_dir = params['output_dir'] or os.path.dirname(image_files[0])
+
+        self.set_buttons_enabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+
+        # 处理线程逐张串行执行，按并行数 1 预估
+        self.plan_thread = BatchPlanThread(
+            image_files,
+            output_dir,
+            operation='compress',
+            scale=params['scale'],
+            quality=params['quality'],
+            output_format=params['output_format'],
+            target_ssim=params['target_ssim'],
+            png_mode=params['png_mode'],
+            png_effort=params['png_effort'],
+            encoder_preset=params['encoder_preset'],
+            resample=params['resample'],
+            larger_policy=params['larger_policy'],
+            skip_low_quality_jpeg=params['skip_low_quality_jpeg']
+        )
+        self.plan_thread.progress.connect(self.progress_bar.setValue)
+        self.plan_thread.status.connect(lambda s: self.status_label.setText(s))
+        self.plan_thread.finished.connect(self.on_plan_finished)
+        self.plan_thread.error.connect(self.on_plan_error)
+        self.plan_thread.start()
+
+    def on_plan_finished(self, plan):
+        """试运行完成"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText("试运行完成")
+
+        content = summarize_plan(plan, self.file_list.format_size)
+        if plan.get('disk_free') is not None and plan['output_bytes'] > plan['disk_free']:
+            InfoBar.warning(
+                title="磁盘空间不足",
+                content=content,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=-1,
+                parent=self
+            )
+            return
+        InfoBar.info(
+            title="试运行",
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=8000,
+            parent=self
+        )
+
+    def on_plan_error(self, error_msg):
+        """试运行错误"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText("试运行失败")
+        InfoBar.error(
+            title="错误",
+            content=error_msg,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def set_buttons_enabled(self, enabled):
+        """统一设置操作按钮状态"""
+        self.compress_btn.setEnabled(enabled)
+        self.plan_btn.setEnabled(enabled)
+        self.sweep_btn.setEnabled(enabled)
+        self.variant_btn.setEnabled(enabled)
+
     def on_compress_finished(self, results):
         """压缩完成"""
-        self.compress_btn.setEnabled(True)
+        self.set_buttons_enabled(True)
         self.progress_bar.setVisible(False)
 
         total_original = sum(r['original_size'] for r in results)
         total_new = sum(r['new_size'] for r in results)
         ratio = (1 - total_new / total_original) * 100 if total_original > 0 else 0
+        ssim_values = [r['ssim'] for r in results if r.get('ssim') is not None]
+        avg_ssim = sum(ssim_values) / len(ssim_values) if ssim_values else None
+
+        if avg_ssim is not None:
+            self.status_label.setText(f"完成，节省 {ratio:.1f}%，平均 SSIM {avg_ssim:.4f}")
+        else:
+            self.status_label.setText(f"完成，节省 {ratio:.1f}%")
+
+        copied = sum(1 for r in results if r.get('action') == 'copied')
+        skipped = sum(1 for r in results if r.get('action') == 'skipped')
+        png_saved = sum(r.get('png_saved', 0) for r in results)
+        content = f"已处理 {len(results)} 张图片，体积减少 {ratio:.1f}%"
+        if copied or skipped:
+            content += f"\n其中 {copied} 张保留原图，{skipped} 张已跳过（重新编码无法改善）"
+        if png_saved > 0:
+            content += f"\nPNG 优化额外节省 {self.file_list.format_size(png_saved)}"
 
-        self.status_label.setText(f"完成，节省 {ratio:.1f}%")
         InfoBar.success(
             title="完成",
-            content=f"已处理 {len(results)} 张图片，体积减少 {ratio:.1f}%",
+            content=content,
             orient=Qt.Horizontal,
             isClosable=True,
             position=InfoBarPosition.TOP,
@@ -154,7 +509,7 @@ class ImageCompressPage(QWidget):
 
     def on_compress_error(self, error_msg):
         """压缩错误"""
-        self.compress_btn.setEnabled(True)
+        self.set_buttons_enabled(True)
         self.progress_bar.setVisible(False)
         self.status_label.setText("压缩失败")
         InfoBar.error(
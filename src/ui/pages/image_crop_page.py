@@ -5,10 +5,10 @@
 """
 
 import os
-from typing import List, Tuple, Optional
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsEllipseItem, QGraphicsPolygonItem, QScrollArea, QFrame
-from PySide6.QtCore import Qt, QPointF, QRectF
-from PySide6.QtGui import QPen, QColor, QPainter, QBrush, QPixmap, QImage, QPolygonF
+from typing import List, Optional, Dict, Any
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGraphicsScene, QGraphicsItem, QGraphicsRectItem, QGraphicsEllipseItem, QGraphicsPolygonItem, QScrollArea, QFrame
+from PySide6.QtCore import Qt, QPointF
+from PySide6.QtGui import QPen, QColor, QPainter, QBrush, QPolygonF
 from qfluentwidgets import (
     TitleLabel, CaptionLabel, PushButton, PrimaryPushButton,
     ProgressBar, InfoBar, InfoBarPosition, MessageBox, ComboBox,
@@ -16,7 +16,20 @@ from qfluentwidgets import (
 )
 
 from ..components.file_list_widget import FileListWidget
-from ...core.image_processor import CropSplitThread
+from ..components.tiled_image_view import TiledImageItem, ZoomableGraphicsView
+from ..components.params_card import (
+    PNG_MODE_OPTIONS, ENCODER_PRESET_OPTIONS, OUTPUT_FORMAT_OPTIONS, create_png_mode_combo,
+    create_encoder_preset_combo, create_output_format_combo, bind_png_mode_combo
+)
+from ...core.image_processor import CropSplitThread, BatchCropSplitThread
+from ...core.crop_template import save_crop_template, load_crop_template
+
+# 椭圆、多边形区域形状外的填充方式，None 表示透明
+MASK_BACKGROUND_OPTIONS = {
+    "透明": None,
+    "白色": (255, 255, 255),
+    "黑色": (0, 0, 0)
+}
 
 
 class ImageCropPage(QWidget):
@@ -25,8 +38,10 @@ class ImageCropPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.image_file: Optional[str] = None
-        self.crop_regions: List[Tuple[float, float, float, float]] = []
+        # 最近一次从预览中读取的区域，坐标为相对于图片宽高的比例，见 region_mask
+        self.crop_regions: List[Dict[str, Any]] = []
         self.current_mode = "rectangle"
+        self.image_item: Optional[TiledImageItem] = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -51,13 +66,13 @@ class ImageCropPage(QWidget):
         title = TitleLabel("图片分割")
         layout.addWidget(title)
 
-        subtitle = CaptionLabel("通过交互方式在图片上绘制分割区域，支持矩形、圆形和多边形")
+        subtitle = CaptionLabel("通过交互方式在图片上绘制分割区域，支持矩形、圆形和多边形；区域可保存为模板，批量套用到多张图片")
         subtitle.setStyleSheet("color: #666;")
         layout.addWidget(subtitle)
 
         layout.addSpacing(8)
 
-        # 文件列表组件（只允许单个文件）
+        # 文件列表组件（多张图片时预览第一张，按同一组区域批量分割）
         self.file_list = FileListWidget()
         self.file_list.files_changed.connect(self.on_files_changed)
         self.file_list.setAcceptDrops(True)
@@ -112,7 +127,7 @@ class ImageCropPage(QWidget):
 
         # 图形视图
         self.scene = QGraphicsScene()
-        self.view = QGraphicsView(self.scene)
+        self.view = ZoomableGraphicsView(self.scene)
         self.view.setMinimumHeight(350)
         self.view.setMaximumHeight(500)
         self.view.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -155,6 +170,18 @@ class ImageCropPage(QWidget):
         self.clear_regions_btn.clicked.connect(self.clear_regions)
         tools_layout.addWidget(self.clear_regions_btn)
 
+        tools_layout.addSpacing(20)
+
+        self.save_template_btn = PushButton("保存模板")
+        self.save_template_btn.setIcon(FluentIcon.SAVE)
+        self.save_template_btn.clicked.connect(self.save_template)
+        tools_layout.addWidget(self.save_template_btn)
+
+        self.load_template_btn = PushButton("载入模板")
+        self.load_template_btn.setIcon(FluentIcon.DOCUMENT)
+        self.load_template_btn.clicked.connect(self.load_template)
+        tools_layout.addWidget(self.load_template_btn)
+
         tools_layout.addStretch(1)
         preview_layout.addLayout(tools_layout)
 
@@ -181,10 +208,25 @@ class ImageCropPage(QWidget):
         format_label.setMinimumWidth(70)
         row1.addWidget(format_label)
 
-        self.format_combo = ComboBox()
-        self.format_combo.addItems(["保持原格式", "JPEG", "PNG", "WEBP"])
-        self.format_combo.setMinimumWidth(150)
+        self.format_combo = create_output_format_combo()
         row1.addWidget(self.format_combo)
+
+        row1.addSpacing(20)
+        png_mode_label = BodyLabel("PNG 模式")
+        png_mode_label.setStyleSheet("color: #666;")
+        row1.addWidget(png_mode_label)
+
+        self.png_mode_combo = create_png_mode_combo()
+        bind_png_mode_combo(self.format_combo, self.png_mode_combo)
+        row1.addWidget(self.png_mode_combo)
+
+        row1.addSpacing(20)
+        preset_label = BodyLabel("编码速度")
+        preset_label.setStyleSheet("color: #666;")
+        row1.addWidget(preset_label)
+
+        self.encoder_preset_combo = create_encoder_preset_combo()
+        row1.addWidget(self.encoder_preset_combo)
         row1.addStretch(1)
 
         params_layout.addLayout(row1)
@@ -220,6 +262,16 @@ class ImageCropPage(QWidget):
             lambda v: self.quality_value_label.setText(str(v))
         )
         quality_input_layout.addWidget(self.quality_value_label)
+
+        quality_input_layout.addSpacing(20)
+        background_label = BodyLabel("形状外区域")
+        background_label.setStyleSheet("color: #666;")
+        quality_input_layout.addWidget(background_label)
+
+        self.mask_background_combo = ComboBox()
+        self.mask_background_combo.addItems(list(MASK_BACKGROUND_OPTIONS))
+        self.mask_background_combo.setToolTip("圆形与多边形区域按形状输出，形状外透明或填充颜色（JPEG 不支持透明，以白色填充）")
+        quality_input_layout.addWidget(self.mask_background_combo)
         quality_input_layout.addStretch(1)
 
         row2.addLayout(quality_input_layout)
@@ -258,6 +310,11 @@ class ImageCropPage(QWidget):
         self.status_label.setStyleSheet("color: #666;")
         bottom_layout.addWidget(self.status_label, 1)
 
+        self.add_folder_btn = PushButton("添加文件夹")
+        self.add_folder_btn.setIcon(FluentIcon.FOLDER_ADD)
+        self.add_folder_btn.clicked.connect(self.add_folder)
+        bottom_layout.addWidget(self.add_folder_btn)
+
         self.clear_btn = PushButton("清空")
         self.clear_btn.setMinimumWidth(80)
         self.clear_btn.clicked.connect(self.clear_list)
@@ -273,41 +330,44 @@ class ImageCropPage(QWidget):
 
     def on_files_changed(self, files):
         """文件列表变化时的处理"""
-        if len(files) > 1:
-            self.file_list.set_files([files[0]])
-            InfoBar.warning(
-                title="提示",
-                content="图片分割只支持单个文件，已自动选择第一个文件",
-                orient=Qt.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=3000,
-                parent=self
-            )
-            return
-
         if files:
-            filename = os.path.basename(files[0])
-            self.image_file = files[0]
-            self.status_label.setText(f"已选择: {filename}")
+            if len(files) > 1:
+                self.status_label.setText(f"已选择 {len(files)} 张图片，将按预览中的区域批量分割")
+            else:
+                self.status_label.setText(f"已选择: {os.path.basename(files[0])}")
             self.crop_btn.setEnabled(True)
-            self.load_image(files[0])
+            if files[0] != self.image_file:
+                # 预览的图片变化时保留已绘制的区域（按比例换算到新图片上）
+                regions = self.collect_regions()
+                self.image_file = files[0]
+                self.load_image(files[0])
+                self.add_region_items(regions)
         else:
             self.image_file = None
             self.status_label.setText("请选择一张图片")
             self.crop_btn.setEnabled(False)
-            self.scene.clear()
+            self.clear_scene()
+
+    def clear_scene(self):
+        """清空预览场景，并停止图片的后台解码"""
+        if self.image_item is not None:
+            self.image_item.close()
+            self.image_item = None
+        self.scene.clear()
 
     def load_image(self, filepath: str):
         """加载图片到预览区域"""
         try:
-            pixmap = QPixmap(filepath)
-            self.scene.clear()
-            self.pixmap_item = self.scene.addPixmap(pixmap)
-            self.scene.setSceneRect(pixmap.rect())
+            # 大图先显示缩略图，放大时再按可见区域逐块加载
+            item = TiledImageItem(filepath)
+            self.clear_scene()
+            self.image_item = item
+            self.image_item.load_failed.connect(self.on_image_load_failed)
+            self.scene.addItem(self.image_item)
+            self.scene.setSceneRect(self.image_item.boundingRect())
 
             # 调整视图大小以适应图片
-            self.view.fitInView(self.pixmap_item, Qt.AspectRatioMode.KeepAspectRatio)
+            self.view.fit_item(self.image_item)
 
             # 添加提示文本
             if not self.scene.items():
@@ -326,6 +386,18 @@ class ImageCropPage(QWidget):
                 parent=self
             )
 
+    def on_image_load_failed(self, message: str):
+        """图片解码失败"""
+        InfoBar.error(
+            title="错误",
+            content=f"无法加载图片: {message}",
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
     def add_rectangle_region(self):
         """添加矩形分割区域"""
         if not self.image_file:
@@ -341,8 +413,8 @@ class ImageCropPage(QWidget):
             return
 
         # 获取图片尺寸
-        if hasattr(self, 'pixmap_item'):
-            rect = self.pixmap_item.boundingRect()
+        if self.image_item is not None:
+            rect = self.image_item.boundingRect()
             x, y = rect.width() / 4, rect.height() / 4
             w, h = rect.width() / 2, rect.height() / 2
         else:
@@ -350,13 +422,7 @@ class ImageCropPage(QWidget):
 
         # 创建矩形区域
         rect_item = QGraphicsRectItem(x, y, w, h)
-        rect_item.setPen(QPen(QColor("#0078D4"), 2, Qt.PenStyle.SolidLine))
-        rect_item.setBrush(QBrush(QColor(0, 120, 212, 30)))
-        rect_item.setFlag(QGraphicsRectItem.GraphicsItemFlag.ItemIsMovable, True)
-        rect_item.setFlag(QGraphicsRectItem.GraphicsItemFlag.ItemIsSelectable, True)
-        rect_item.setFlag(QGraphicsRectItem.GraphicsItemFlag.ItemSendsGeometryChanges, True)
-
-        self.scene.addItem(rect_item)
+        self.add_region_item(rect_item)
         self.current_mode = "rectangle"
 
         InfoBar.success(
@@ -384,8 +450,8 @@ class ImageCropPage(QWidget):
             return
 
         # 获取图片尺寸
-        if hasattr(self, 'pixmap_item'):
-            rect = self.pixmap_item.boundingRect()
+        if self.image_item is not None:
+            rect = self.image_item.boundingRect()
             x, y = rect.width() / 4, rect.height() / 4
             w, h = rect.width() / 2, rect.height() / 2
         else:
@@ -393,13 +459,7 @@ class ImageCropPage(QWidget):
 
         # 创建圆形区域
         ellipse_item = QGraphicsEllipseItem(x, y, w, h)
-        ellipse_item.setPen(QPen(QColor("#0078D4"), 2, Qt.PenStyle.SolidLine))
-        ellipse_item.setBrush(QBrush(QColor(0, 120, 212, 30)))
-        ellipse_item.setFlag(QGraphicsEllipseItem.GraphicsItemFlag.ItemIsMovable, True)
-        ellipse_item.setFlag(QGraphicsEllipseItem.GraphicsItemFlag.ItemIsSelectable, True)
-        ellipse_item.setFlag(QGraphicsEllipseItem.GraphicsItemFlag.ItemSendsGeometryChanges, True)
-
-        self.scene.addItem(ellipse_item)
+        self.add_region_item(ellipse_item)
         self.current_mode = "circle"
 
         InfoBar.success(
@@ -427,8 +487,8 @@ class ImageCropPage(QWidget):
             return
 
         # 获取图片尺寸
-        if hasattr(self, 'pixmap_item'):
-            rect = self.pixmap_item.boundingRect()
+        if self.image_item is not None:
+            rect = self.image_item.boundingRect()
             cx, cy = rect.width() / 2, rect.height() / 2
             size = min(rect.width(), rect.height()) / 3
         else:
@@ -442,13 +502,7 @@ class ImageCropPage(QWidget):
         ])
 
         polygon_item = QGraphicsPolygonItem(polygon)
-        polygon_item.setPen(QPen(QColor("#0078D4"), 2, Qt.PenStyle.SolidLine))
-        polygon_item.setBrush(QBrush(QColor(0, 120, 212, 30)))
-        polygon_item.setFlag(QGraphicsPolygonItem.GraphicsItemFlag.ItemIsMovable, True)
-        polygon_item.setFlag(QGraphicsPolygonItem.GraphicsItemFlag.ItemIsSelectable, True)
-        polygon_item.setFlag(QGraphicsPolygonItem.GraphicsItemFlag.ItemSendsGeometryChanges, True)
-
-        self.scene.addItem(polygon_item)
+        self.add_region_item(polygon_item)
         self.current_mode = "polygon"
 
         InfoBar.success(
@@ -461,17 +515,91 @@ class ImageCropPage(QWidget):
             parent=self
         )
 
+    def add_region_item(self, item):
+        """设置区域图形的样式并加入场景"""
+        pen = QPen(QColor("#0078D4"), 2, Qt.PenStyle.SolidLine)
+        # 线宽不随缩放变化，大图缩小显示时边框仍然可见
+        pen.setCosmetic(True)
+        item.setPen(pen)
+        item.setBrush(QBrush(QColor(0, 120, 212, 30)))
+        item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, True)
+        item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
+        item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemSendsGeometryChanges, True)
+        self.scene.addItem(item)
+
+    def add_region_items(self, regions: List[Dict[str, Any]]):
+        """按比例坐标在当前图片上绘制区域（载入模板、切换预览图片时使用）"""
+        if self.image_item is None:
+            return
+        rect = self.image_item.boundingRect()
+        img_width, img_height = rect.width(), rect.height()
+        for region in regions:
+            x, y, w, h = region['box']
+            if region['shape'] == 'polygon':
+                item = QGraphicsPolygonItem(QPolygonF([
+                    QPointF(px * img_width, py * img_height) for px, py in region['points']
+                ]))
+            elif region['shape'] == 'ellipse':
+                item = QGraphicsEllipseItem(x * img_width, y * img_height, w * img_width, h * img_height)
+            else:
+                item = QGraphicsRectItem(x * img_width, y * img_height, w * img_width, h * img_height)
+            self.add_region_item(item)
+
+    def collect_regions(self) -> List[Dict[str, Any]]:
+        """读取预览中的分割区域（按添加顺序），坐标转换为相对于图片宽高的比例"""
+        if self.image_item is None:
+            return []
+        img_rect = self.image_item.boundingRect()
+        img_width = img_rect.width()
+        img_height = img_rect.height()
+
+        # 圆形与多边形保留形状
+        regions = []
+        for item in self.scene.items(Qt.SortOrder.AscendingOrder):
+            if isinstance(item, (QGraphicsRectItem, QGraphicsEllipseItem)):
+                # 用形状本身的矩形，不含边框线宽
+                rect = item.mapRectToScene(item.rect())
+                regions.append({
+                    'shape': 'rectangle' if isinstance(item, QGraphicsRectItem) else 'ellipse',
+                    'box': (rect.x() / img_width, rect.y() / img_height,
+                            rect.width() / img_width, rect.height() / img_height)
+                })
+            elif isinstance(item, QGraphicsPolygonItem):
+                polygon = item.mapToScene(item.polygon())
+                rect = polygon.boundingRect()
+                regions.append({
+                    'shape': 'polygon',
+                    'box': (rect.x() / img_width, rect.y() / img_height,
+                            rect.width() / img_width, rect.height() / img_height),
+                    'points': [(p.x() / img_width, p.y() / img_height) for p in polygon]
+                })
+        self.crop_regions = regions
+        return regions
+
     def clear_regions(self):
         """清空所有分割区域"""
-        if not hasattr(self, 'pixmap_item'):
-            self.scene.clear()
+        if self.image_item is None:
+            self.clear_scene()
             self.crop_regions.clear()
             return
 
-        # 只清除形状，保留图片
+        self.remove_region_items()
+
+        InfoBar.info(
+            title="已清空",
+            content="所有分割区域已清空",
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=2000,
+            parent=self
+        )
+
+    def remove_region_items(self):
+        """只清除形状，保留图片"""
         items_to_remove = []
         for item in self.scene.items():
-            if item != self.pixmap_item:
+            if item != self.image_item:
                 items_to_remove.append(item)
 
         for item in items_to_remove:
@@ -479,16 +607,123 @@ class ImageCropPage(QWidget):
 
         self.crop_regions.clear()
 
-        InfoBar.info(
-            title="已清空",
-            content="所有分割区域已清空",
+    def save_template(self):
+        """把当前区域保存为模板"""
+        regions = self.collect_regions()
+        if not regions:
+            InfoBar.warning(
+                title="提示",
+                content="请先添加至少一个分割区域",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+            return
+
+        from PySide6.QtWidgets import QFileDialog
+        name = os.path.splitext(os.path.basename(self.image_file))[0]
+        default_path = os.path.join(os.path.dirname(self.image_file), f"{name}_crop_template.json")
+        path, _ = QFileDialog.getSaveFileName(self, "保存分割模板", default_path, "分割模板 (*.json)")
+        if not path:
+            return
+
+        try:
+            rect = self.image_item.boundingRect()
+            save_crop_template(path, regions, (int(rect.width()), int(rect.height())))
+        except Exception as e:
+            InfoBar.error(
+                title="错误",
+                content=f"无法保存模板: {str(e)}",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=5000,
+                parent=self
+            )
+            return
+
+        InfoBar.success(
+            title="已保存",
+            content=f"{len(regions)} 个区域已保存为模板: {os.path.basename(path)}",
             orient=Qt.Horizontal,
             isClosable=True,
             position=InfoBarPosition.TOP,
-            duration=2000,
+            duration=3000,
             parent=self
         )
 
+    def load_template(self):
+        """载入模板，替换当前区域"""
+        if self.image_item is None:
+            InfoBar.warning(
+                title="提示",
+                content="请先选择一张图片",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+            return
+
+        from PySide6.QtWidgets import QFileDialog
+        path, _ = QFileDialog.getOpenFileName(self, "载入分割模板", os.path.dirname(self.image_file), "分割模板 (*.json)")
+        if not path:
+            return
+
+        try:
+            template = load_crop_template(path)
+        except Exception as e:
+            InfoBar.error(
+                title="错误",
+                content=f"无法载入模板: {str(e)}",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=5000,
+                parent=self
+            )
+            return
+
+        self.remove_region_items()
+        self.add_region_items(template['regions'])
+        self.crop_regions = template['regions']
+
+        content = f"已载入 {len(template['regions'])} 个区域"
+        source_size = template['source_size']
+        rect = self.image_item.boundingRect()
+        if source_size and abs(source_size[0] / source_size[1] - rect.width() / rect.height()) > 0.01:
+            # 区域按比例保存，宽高比不同时形状会随图片拉伸
+            content += f"；模板来自 {source_size[0]}x{source_size[1]} 的图片，宽高比与当前图片不同"
+        InfoBar.success(
+            title="已载入",
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=3000,
+            parent=self
+        )
+
+    def add_folder(self):
+        """添加文件夹中的全部图片"""
+        from PySide6.QtWidgets import QFileDialog
+        dir_path = QFileDialog.getExistingDirectory(self, "选择图片文件夹")
+        if not dir_path:
+            return
+        if not self.file_list.add_files([dir_path]):
+            InfoBar.warning(
+                title="提示",
+                content="文件夹中没有可添加的图片",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+
     def clear_list(self):
         """清空列表"""
         if not self.file_list.get_files():
@@ -497,7 +732,7 @@ class ImageCropPage(QWidget):
         if w.exec():
             self.file_list.clear_files()
             self.image_file = None
-            self.scene.clear()
+            self.clear_scene()
             self.crop_regions.clear()
             self.status_label.setText("请选择一张图片")
             self.crop_btn.setEnabled(False)
@@ -524,12 +759,7 @@ class ImageCropPage(QWidget):
             )
             return
 
-        # 获取图片尺寸用于计算比例
-        if hasattr(self, 'pixmap_item'):
-            img_rect = self.pixmap_item.boundingRect()
-            img_width = img_rect.width()
-            img_height = img_rect.height()
-        else:
+        if self.image_item is None:
             InfoBar.warning(
                 title="提示",
                 content="请先选择一张图片",
@@ -541,34 +771,7 @@ class ImageCropPage(QWidget):
             )
             return
 
-        # 获取所有分割区域（只支持矩形）
-        regions = []
-        for item in self.scene.items():
-            if isinstance(item, QGraphicsRectItem):
-                # 获取矩形的边界，并转换为比例坐标
-                rect = item.sceneBoundingRect()
-                x = rect.x() / img_width
-                y = rect.y() / img_height
-                width = rect.width() / img_width
-                height = rect.height() / img_height
-                regions.append((x, y, width, height))
-            elif isinstance(item, QGraphicsEllipseItem):
-                # 圆形也使用外接矩形
-                rect = item.sceneBoundingRect()
-                x = rect.x() / img_width
-                y = rect.y() / img_height
-                width = rect.width() / img_width
-                height = rect.height() / img_height
-                regions.append((x, y, width, height))
-            # 多边形暂不支持，使用其边界框
-            elif isinstance(item, QGraphicsPolygonItem):
-                rect = item.sceneBoundingRect()
-                x = rect.x() / img_width
-                y = rect.y() / img_height
-                width = rect.width() / img_width
-                height = rect.height() / img_height
-                regions.append((x, y, width, height))
-
+        regions = self.collect_regions()
         if not regions:
             InfoBar.warning(
                 title="提示",
@@ -588,13 +791,29 @@ class ImageCropPage(QWidget):
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
 
-        self.thread = CropSplitThread(
-            image_files[0],
-            output_dir,
-            regions,
-            params['quality'],
-            params['output_format']
-        )
+        if len(image_files) > 1:
+            # 未指定输出目录时，每张图片输出到各自所在的目录
+            self.thread = BatchCropSplitThread(
+                image_files,
+                params['output_dir'],
+                regions,
+                params['quality'],
+                params['output_format'],
+                png_mode=params['png_mode'],
+                encoder_preset=params['encoder_preset'],
+                background=params['background']
+            )
+        else:
+            self.thread = CropSplitThread(
+                image_files[0],
+                output_dir,
+                regions,
+                params['quality'],
+                params['output_format'],
+                png_mode=params['png_mode'],
+                encoder_preset=params['encoder_preset'],
+                background=params['background']
+            )
         self.thread.progress.connect(self.progress_bar.setValue)
         self.thread.status.connect(lambda s: self.status_label.setText(s))
         self.thread.finished.connect(self.on_crop_finished)
@@ -604,13 +823,14 @@ class ImageCropPage(QWidget):
 
     def get_params(self):
         """获取参数"""
-        output_format = self.format_combo.currentText()
-        if output_format == "保持原格式":
-            output_format = None
+        output_format = OUTPUT_FORMAT_OPTIONS[self.format_combo.currentText()]
 
         return {
             'quality': self.quality_slider.value(),
             'output_format': output_format,
+            'png_mode': PNG_MODE_OPTIONS[self.png_mode_combo.currentText()],
+            'encoder_preset': ENCODER_PRESET_OPTIONS[self.encoder_preset_combo.currentText()],
+            'background': MASK_BACKGROUND_OPTIONS[self.mask_background_combo.currentText()],
             'output_dir': self.output_dir_edit.text().strip() or None
         }
 
@@ -619,12 +839,23 @@ class ImageCropPage(QWidget):
         self.crop_btn.setEnabled(True)
         self.progress_bar.setVisible(False)
 
-        filename = os.path.basename(self.file_list.get_files()[0])
-        self.status_label.setText(f"完成分割: {filename}")
+        failed = [r for r in results if 'error' in r]
+        blocks = [r for r in results if 'error' not in r]
+        image_count = len(self.file_list.get_files())
+
+        if image_count > 1:
+            self.status_label.setText(f"完成批量分割: {image_count - len(failed)}/{image_count} 张")
+            content = f"已将 {image_count - len(failed)} 张图片分割为 {len(blocks)} 个图片块，保存在各自的分割文件夹中"
+            if failed:
+                content += f"；{len(failed)} 张失败: " + "、".join(os.path.basename(r['input']) for r in failed[:3])
+        else:
+            filename = os.path.basename(self.file_list.get_files()[0])
+            self.status_label.setText(f"完成分割: {filename}")
+            content = f"已将图片分割为 {len(blocks)} 个图片块"
 
         InfoBar.success(
             title="完成",
-            content=f"已将图片分割为 {len(results)} 个图片块",
+            content=content,
             orient=Qt.Horizontal,
             isClosable=True,
             position=InfoBarPosition.TOP,
@@ -14,7 +14,10 @@ from qfluentwidgets import (
 
 from ..components.file_list_widget import FileListWidget
 from ..components.grid_split_params_card import GridSplitParamsCard
-from ...core.image_processor import GridSplitThread
+from ...core.image_processor import GridSplitThread, BatchGridSplitThread
+from ...core.tile_pyramid import TilePyramidThread
+from ...core.tile_dataset import TileDatasetThread
+from ...core.gutter_split import GutterSplitThread
 
 
 class ImageGridSplitPage(QWidget):
@@ -46,17 +49,15 @@ class ImageGridSplitPage(QWidget):
         title = TitleLabel("图片等分")
         layout.addWidget(title)
 
-        subtitle = CaptionLabel("选择一张图片，按指定行列数分割成多个图片块")
+        subtitle = CaptionLabel("选择一张或多张图片，按指定行列数分割成多个图片块，多张图片时并发处理")
         subtitle.setStyleSheet("color: #666;")
         layout.addWidget(subtitle)
 
         layout.addSpacing(8)
 
-        # 文件列表组件（只允许单个文件）
+        # 文件列表组件
         self.file_list = FileListWidget()
         self.file_list.files_changed.connect(self.on_files_changed)
-        # 限制只能选择一个文件
-        self.file_list.setAcceptDrops(True)
         layout.addWidget(self.file_list)
 
         # 参数设置卡片
@@ -84,7 +85,7 @@ class ImageGridSplitPage(QWidget):
         bottom_layout.setSpacing(16)
         bottom_layout.setContentsMargins(32, 16, 32, 16)
 
-        self.status_label = CaptionLabel("请选择一张图片")
+        self.status_label = CaptionLabel("请选择图片")
         self.status_label.setStyleSheet("color: #666;")
         bottom_layout.addWidget(self.status_label, 1)
 
@@ -104,35 +105,24 @@ class ImageGridSplitPage(QWidget):
     def on_files_changed(self, files):
         """文件列表变化时的处理"""
         if len(files) > 1:
-            # 如果选择了多个文件，只保留第一个
-            self.file_list.set_files([files[0]])
-            InfoBar.warning(
-                title="提示",
-                content="图片等分只支持单个文件，已自动选择第一个文件",
-                orient=Qt.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=3000,
-                parent=self
-            )
-            return
-
-        if files:
+            self.status_label.setText(f"已选择 {len(files)} 张图片，将批量等分")
+            self.split_btn.setEnabled(True)
+        elif files:
             filename = os.path.basename(files[0])
             self.status_label.setText(f"已选择: {filename}")
             self.split_btn.setEnabled(True)
         else:
-            self.status_label.setText("请选择一张图片")
+            self.status_label.setText("请选择图片")
             self.split_btn.setEnabled(False)
 
     def clear_list(self):
         """清空列表"""
         if not self.file_list.get_files():
             return
-        w = MessageBox("确认清空", "确定要清空图片吗？", self)
+        w = MessageBox("确认清空", "确定要清空所有图片吗？", self)
         if w.exec():
             self.file_list.clear_files()
-            self.status_label.setText("请选择一张图片")
+            self.status_label.setText("请选择图片")
             self.split_btn.setEnabled(False)
 
     def start_split(self):
@@ -141,19 +131,7 @@ class ImageGridSplitPage(QWidget):
         if not image_files:
             InfoBar.warning(
                 title="提示",
-                content="请先选择一张图片",
-                orient=Qt.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=3000,
-                parent=self
-            )
-            return
-
-        if len(image_files) > 1:
-            InfoBar.warning(
-                title="提示",
-                content="图片等分只支持单个文件",
+                content="请先选择图片",
                 orient=Qt.Horizontal,
                 isClosable=True,
                 position=InfoBarPosition.TOP,
@@ -165,6 +143,16 @@ class ImageGridSplitPage(QWidget):
         params = self.params_card.get_params()
         output_dir = params['output_dir'] or os.path.dirname(image_files[0])
 
+        if params['split_mode'] == 'pyramid':
+            self.start_pyramid(image_files, params)
+            return
+        if params['split_mode'] == 'tiles':
+            self.start_tiles(image_files, params)
+            return
+        if params['split_mode'] == 'gutter':
+            self.start_gutter(image_files, params)
+            return
+
         # 检查分割参数
         if params['x_splits'] == 1 and params['y_splits'] == 1:
             InfoBar.warning(
@@ -182,14 +170,35 @@ class ImageGridSplitPage(QWidget):
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
 
-        self.thread = GridSplitThread(
-            image_files[0],
-            output_dir,
-            params['x_splits'],
-            params['y_splits'],
-            params['quality'],
-            params['output_format']
-        )
+        if len(image_files) > 1:
+            # 未指定输出目录时，每张图片输出到各自所在的目录
+            self.thread = BatchGridSplitThread(
+                image_files,
+                params['output_dir'],
+                params['x_splits'],
+                params['y_splits'],
+                params['quality'],
+                params['output_format'],
+                png_mode=params['png_mode'],
+                encoder_preset=params['encoder_preset'],
+                skip_blank=params['skip_blank'],
+                blank_threshold=params['blank_threshold'],
+                dedupe=params['dedupe']
+            )
+        else:
+            self.thread = GridSplitThread(
+                image_files[0],
+                output_dir,
+                params['x_splits'],
+                params['y_splits'],
+                params['quality'],
+                params['output_format'],
+                png_mode=params['png_mode'],
+                encoder_preset=params['encoder_preset'],
+                skip_blank=params['skip_blank'],
+                blank_threshold=params['blank_threshold'],
+                dedupe=params['dedupe']
+            )
         self.thread.progress.connect(self.progress_bar.setValue)
         self.thread.status.connect(lambda s: self.status_label.setText(s))
         self.thread.finished.connect(self.on_split_finished)
@@ -197,18 +206,185 @@ class ImageGridSplitPage(QWidget):
         self.thread.overwrite_request.connect(self.on_overwrite_request)
         self.thread.start()
 
+    def start_pyramid(self, image_files, params):
+        """开始生成瓦片金字塔"""
+        self.split_btn.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+
+        self.thread = TilePyramidThread(
+            image_files,
+            params['output_dir'],
+            tile_size=params['tile_size'],
+            layout=params['pyramid_layout'],
+            overlap=params['overlap'],
+            quality=params['quality'],
+            output_format=params['output_format'],
+            png_mode=params['png_mode'],
+            encoder_preset=params['encoder_preset']
+        )
+        self.thread.progress.connect(self.progress_bar.setValue)
+        self.thread.status.connect(lambda s: self.status_label.setText(s))
+        self.thread.finished.connect(self.on_pyramid_finished)
+        self.thread.error.connect(self.on_split_error)
+        self.thread.start()
+
+    def on_pyramid_finished(self, results):
+        """瓦片金字塔生成完成"""
+        self.split_btn.setEnabled(True)
+        self.progress_bar.setVisible(False)
+
+        tiles = sum(r['tiles'] for r in results)
+        written = sum(r['written'] for r in results)
+        self.status_label.setText(f"完成瓦片金字塔: {len(results)} 张图片")
+        if len(results) == 1:
+            folder = os.path.basename(results[0]['output_folder'])
+            content = f"共 {results[0]['levels']} 级 {tiles} 块瓦片，更新 {written} 块，保存在文件夹: {folder}"
+        else:
+            content = f"{len(results)} 张图片共 {tiles} 块瓦片，更新 {written} 块，保存在各自的 _pyramid 文件夹中"
+
+        InfoBar.success(
+            title="完成",
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def start_tiles(self, image_files, params):
+        """开始切分固定尺寸瓦片"""
+        self.split_btn.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+
+        self.thread = TileDatasetThread(
+            image_files,
+            params['output_dir'],
+            tile_size=params['dataset_tile_size'],
+            stride=params['stride'],
+            edge_mode=params['edge_mode'],
+            quality=params['quality'],
+            output_format=params['output_format'],
+            png_mode=params['png_mode'],
+            encoder_preset=params['encoder_preset'],
+            container=params['container']
+        )
+        self.thread.progress.connect(self.progress_bar.setValue)
+        self.thread.status.connect(lambda s: self.status_label.setText(s))
+        self.thread.finished.connect(self.on_tiles_finished)
+        self.thread.error.connect(self.on_split_error)
+        self.thread.overwrite_request.connect(self.on_overwrite_request)
+        self.thread.start()
+
+    def on_tiles_finished(self, results):
+        """固定尺寸瓦片切分完成"""
+        self.split_btn.setEnabled(True)
+        self.progress_bar.setVisible(False)
+
+        tiles = sum(r['tiles'] for r in results)
+        self.status_label.setText(f"完成瓦片切分: {len(results)} 张图片")
+        folders = {r['output_folder'] for r in results}
+        if len(folders) == 1:
+            folder = os.path.basename(results[0]['output_folder'])
+            content = f"{len(results)} 张图片共 {tiles} 块瓦片，保存在文件夹: {folder}"
+        else:
+            content = f"{len(results)} 张图片共 {tiles} 块瓦片，保存在各自的 _tiles 文件夹中"
+
+        InfoBar.success(
+            title="完成",
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def start_gutter(self, image_files, params):
+        """开始按分隔带分割"""
+        self.split_btn.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+
+        self.thread = GutterSplitThread(
+            image_files,
+            params['output_dir'],
+            tolerance=params['gutter_tolerance'],
+            min_gutter=params['min_gutter'],
+            quality=params['quality'],
+            output_format=params['output_format'],
+            png_mode=params['png_mode'],
+            encoder_preset=params['encoder_preset']
+        )
+        self.thread.progress.connect(self.progress_bar.setValue)
+        self.thread.status.connect(lambda s: self.status_label.setText(s))
+        self.thread.finished.connect(self.on_gutter_finished)
+        self.thread.error.connect(self.on_split_error)
+        self.thread.overwrite_request.connect(self.on_overwrite_request)
+        self.thread.start()
+
+    def on_gutter_finished(self, results):
+        """按分隔带分割完成"""
+        self.split_btn.setEnabled(True)
+        self.progress_bar.setVisible(False)
+
+        images = len({r['input'] for r in results})
+        self.status_label.setText(f"完成分割: {images} 张图片")
+        if not results:
+            InfoBar.warning(
+                title="未检测到分隔带",
+                content="没有找到可切分的格子，可尝试调大颜色容差或调小最小间隔",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=5000,
+                parent=self
+            )
+            return
+
+        if images == 1:
+            folder = os.path.basename(results[0]['output_folder'])
+            content = f"已沿分隔带切出 {len(results)} 格，保存在文件夹: {folder}"
+        else:
+            content = f"{images} 张图片共切出 {len(results)} 格，保存在各自的 _panels 文件夹中"
+
+        InfoBar.success(
+            title="完成",
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
     def on_split_finished(self, results):
         """等分完成"""
         self.split_btn.setEnabled(True)
         self.progress_bar.setVisible(False)
 
-        filename = os.path.basename(self.file_list.get_files()[0])
-        output_folder = os.path.basename(results[0]['output_folder']) if results else ""
-        self.status_label.setText(f"完成等分: {filename}")
-        
+        failed = [r for r in results if 'error' in r]
+        blocks = [r for r in results if 'error' not in r and 'status' not in r]
+        blank_count = sum(1 for r in results if r.get('status') == 'blank')
+        duplicate_count = sum(1 for r in results if r.get('status') == 'duplicate')
+        image_count = len(self.file_list.get_files())
+
+        if image_count > 1:
+            self.status_label.setText(f"完成批量等分: {image_count - len(failed)}/{image_count} 张")
+            content = f"已将 {image_count - len(failed)} 张图片分割为 {len(blocks)} 个图片块，保存在各自的等分文件夹中"
+        else:
+            filename = os.path.basename(self.file_list.get_files()[0])
+            output_folder = os.path.basename(blocks[0]['output_folder']) if blocks else ""
+            self.status_label.setText(f"完成等分: {filename}")
+            content = f"已将图片分割为 {len(blocks)} 个图片块，保存在文件夹: {output_folder}"
+        if blank_count or duplicate_count:
+            content += f"\n跳过 {blank_count} 个空白块、{duplicate_count} 个重复块，对应关系见 manifest.json"
+
         InfoBar.success(
             title="完成",
-            content=f"已将图片分割为 {len(results)} 个图片块，保存在文件夹: {output_folder}",
+            content=content,
             orient=Qt.Horizontal,
             isClosable=True,
             position=InfoBarPosition.TOP,
@@ -216,6 +392,19 @@ class ImageGridSplitPage(QWidget):
             parent=self
         )
 
+        if failed:
+            names = "、".join(os.path.basename(r['input']) for r in failed[:3])
+            more = f" 等 {len(failed)} 张" if len(failed) > 3 else ""
+            InfoBar.warning(
+                title="部分失败",
+                content=f"{names}{more} 等分失败，详见日志",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=5000,
+                parent=self
+            )
+
     def on_split_error(self, error_msg):
         """等分错误"""
         self.split_btn.setEnabled(True)
@@ -234,5 +423,6 @@ class ImageGridSplitPage(QWidget):
     def on_overwrite_request(self, file_path):
         """处理文件覆盖请求"""
         filename = os.path.basename(file_path)
-        w = MessageBox("确认覆盖", f"文件 '{filename}' 已存在，是否要覆盖？", self)
+        kind = "文件夹" if os.path.isdir(file_path) else "文件"
+        w = MessageBox("确认覆盖", f"{kind} '{filename}' 已存在，是否要覆盖？", self)
         self.thread.set_overwrite_allowed(w.exec())
\ No newline at end of file
@@ -16,6 +16,7 @@ from qfluentwidgets import (
 from ..components.file_list_widget import FileListWidget
 from ..components.params_card import ResizeParamsCard
 from ...core.image_processor import ResizeThread
+from ...core.batch_planner import BatchPlanThread, summarize_plan
 
 
 class ImageResizePage(QWidget):
@@ -76,6 +77,12 @@ class ImageResizePage(QWidget):
         self.clear_btn.clicked.connect(self.clear_list)
         bottom_layout.addWidget(self.clear_btn)
 
+        self.plan_btn = PushButton("试运行")
+        self.plan_btn.setMinimumWidth(100)
+        self.plan_btn.setToolTip("只读取文件头并抽样编码少量图片，预估耗时、输出体积与内存占用，不写出文件")
+        self.plan_btn.clicked.connect(self.start_plan)
+        bottom_layout.addWidget(self.plan_btn)
+
         self.resize_btn = PrimaryPushButton("开始处理")
         self.resize_btn.setMinimumWidth(120)
         self.resize_btn.clicked.connect(self.start_resize)
@@ -142,7 +149,7 @@ class ImageResizePage(QWidget):
         params = self.params_card.get_params()
         output_dir = params['output_dir'] or os.path.dirname(image_files[0])
 
-        self.resize_btn.setEnabled(False)
+        self.set_buttons_enabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
 
@@ -151,7 +158,12 @@ class ImageResizePage(QWidget):
             output_dir,
             params['resize_mode'],
             params['quality'],
-            params['output_format']
+            params['output_format'],
+            png_mode=params['png_mode'],
+            encoder_preset=params['encoder_preset'],
+            resample=params['resample'],
+            fit_mode=params['fit_mode'],
+            container=params['container']
         )
         self.thread.progress.connect(self.progress_bar.setValue)
         self.thread.status.connect(lambda s: self.status_label.setText(s))
@@ -160,18 +172,111 @@ class ImageResizePage(QWidget):
         self.thread.overwrite_request.connect(self.on_overwrite_request)
         self.thread.start()
 
+    def start_plan(self):
+        """开始试运行"""
+        image_files = self.file_list.get_files()
+        if not image_files:
+            InfoBar.warning(
+                title="提示",
+                content="请先添加图片",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self
+            )
+            return
+
+        params = self.params_card.get_params()
+        output_dir = params['output_dir'] or os.path.dirname(image_files[0])
+
+        self.set_buttons_enabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+
+        # 处理线程逐张串行执行，按并行数 1 预估
+        self.plan_thread = BatchPlanThread(
+            image_files,
+            output_dir,
+            operation='resize',
+            resize_mode=params['resize_mode'],
+            quality=params['quality'],
+            output_format=params['output_format'],
+            png_mode=params['png_mode'],
+            encoder_preset=params['encoder_preset'],
+            resample=params['resample'],
+            fit_mode=params['fit_mode']
+        )
+        self.plan_thread.progress.connect(self.progress_bar.setValue)
+        self.plan_thread.status.connect(lambda s: self.status_label.setText(s))
+        self.plan_thread.finished.connect(self.on_plan_finished)
+        self.plan_thread.error.connect(self.on_plan_error)
+        self.plan_thread.start()
+
+    def on_plan_finished(self, plan):
+        """试运行完成"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText("试运行完成")
+
+        content = summarize_plan(plan, self.file_list.format_size)
+        if plan.get('disk_free') is not None and plan['output_bytes'] > plan['disk_free']:
+            InfoBar.warning(
+                title="磁盘空间不足",
+                content=content,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=-1,
+                parent=self
+            )
+            return
+        InfoBar.info(
+            title="试运行",
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=8000,
+            parent=self
+        )
+
+    def on_plan_error(self, error_msg):
+        """试运行错误"""
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText("试运行失败")
+        InfoBar.error(
+            title="错误",
+            content=error_msg,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=5000,
+            parent=self
+        )
+
+    def set_buttons_enabled(self, enabled):
+        """统一设置操作按钮状态"""
+        self.resize_btn.setEnabled(enabled)
+        self.plan_btn.setEnabled(enabled)
+
     def on_resize_finished(self, results):
         """处理完成"""
-        self.resize_btn.setEnabled(True)
+        self.set_buttons_enabled(True)
         self.progress_bar.setVisible(False)
         self.status_label.setText("处理完成")
         
         # 显示结果信息
         if results:
-            target_size = results[0]['new_size']
+            sizes = sorted({r['new_size'] for r in results})
+            size_text = f"统一尺寸为：{sizes[0]}" if len(sizes) == 1 else f"输出尺寸：{sizes[0]} 等 {len(sizes)} 种"
+            if 'index' in results[0]:
+                shards = len({r['output'] for r in results})
+                size_text += f"\n已写入 {shards} 个 .npy 分片，保存在文件夹: {os.path.basename(results[0]['output_folder'])}"
             InfoBar.success(
                 title="完成",
-                content=f"已处理 {len(results)} 张图片\n统一尺寸为：{target_size}",
+                content=f"已处理 {len(results)} 张图片\n{size_text}",
                 orient=Qt.Horizontal,
                 isClosable=True,
                 position=InfoBarPosition.TOP,
@@ -181,7 +286,7 @@ class ImageResizePage(QWidget):
 
     def on_resize_error(self, error_msg):
         """处理错误"""
-        self.resize_btn.setEnabled(True)
+        self.set_buttons_enabled(True)
         self.progress_bar.setVisible(False)
         self.status_label.setText("处理失败")
         InfoBar.error(
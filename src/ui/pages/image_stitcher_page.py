@@ -15,6 +15,7 @@ from qfluentwidgets import (
 
 from ..components.thumbnail_card import ThumbnailCard
 from ..components.params_card import StitchParamsCard
+from ..components.file_list_widget import IMAGE_EXTENSIONS
 from ...core.image_processor import StitchThread
 
 
@@ -37,7 +38,7 @@ class ImageStitcherPage(QWidget):
         title = TitleLabel("图片拼接")
         layout.addWidget(title)
 
-        subtitle = CaptionLabel("拖拽图片到下方区域，支持 PNG、JPG、JPEG、BMP、WEBP 格式")
+        subtitle = CaptionLabel("拖拽图片到下方区域，支持 PNG、JPG、JPEG、BMP、WEBP、TIFF、PPM、PGM 格式")
         subtitle.setStyleSheet("color: #666;")
         layout.addWidget(subtitle)
 
@@ -133,7 +134,7 @@ class ImageStitcherPage(QWidget):
         for file in files:
             if os.path.isfile(file):
                 ext = os.path.splitext(file)[1].lower()
-                if ext in ['.png', '.jpg', '.jpeg', '.bmp', '.webp']:
+                if ext in IMAGE_EXTENSIONS:
                     valid_files.append(file)
 
         if valid_files:
@@ -225,7 +226,10 @@ class ImageStitcherPage(QWidget):
             params['output_dir'],
             params['output_name'],
             params['is_horizontal'],
-            params['align_mode']
+            params['align_mode'],
+            png_mode=params['png_mode'],
+            encoder_preset=params['encoder_preset'],
+            output_format=params['output_format']
         )
         self.thread.progress.connect(self.progress_bar.setValue)
         self.thread.status.connect(lambda s: self.status_label.setText(s))
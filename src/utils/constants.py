@@ -5,7 +5,7 @@
 """
 
 # 支持的图片格式
-SUPPORTED_IMAGE_FORMATS = ['.png', '.jpg', '.jpeg', '.bmp', '.webp']
+SUPPORTED_IMAGE_FORMATS = ['.png', '.jpg', '.jpeg', '.bmp', '.webp', '.tif', '.tiff', '.ppm', '.pgm']
 
 # 图片格式映射
 IMAGE_FORMAT_MAP = {